@@ -0,0 +1,190 @@
+# address_benchmark.py
+"""
+Benchmark: vectorized address normalization (address_normalize.py) vs the
+row-wise implementation it replaced.
+
+Builds a synthetic results frame from address templates (UK and elsewhere,
+with and without postcodes, cities and countries, short and long) and runs
+both versions on copies of it. Reports the time of each, the speedup, and
+every row where the outputs differ. The legacy split of Address line 1
+(beatntrack_data_finder.cleanup_address_lines) is compared the same way.
+
+    python address_benchmark.py
+    python address_benchmark.py --rows 50000 --check     # exit 1 if outputs differ
+"""
+
+import argparse
+import json
+import random
+import re
+import time
+
+import pandas as pd
+
+from address_normalize import normalize_addresses, split_address_line1
+
+OUTPUT_COLUMNS = ["Full address", "Address line 1", "Address line 2", "City", "County",
+                  "Country", "Post code", "Country code"]
+
+STREETS = ["42-48 Charlbert Street", "3 Abbey Road", "96-98 Pentonville Road", "Unit 4, Trade Park",
+           "The Old Church", "12 High St", "Flat 2", "1 Infinite Loop", "Rue de Rivoli 5", "PO Box 17"]
+AREAS = ["St Johns Wood", "Islington", "Northern Quarter", "Digbeth", "Headingley", "Camden", "Soho", ""]
+CITIES = ["London", "Manchester", "Birmingham", "Leeds", "Letchworth Garden City", "Bristol",
+          "Glasgow", "Paris", "Cupertino", "Berlin"]
+POSTCODES = ["NW8 7BU", "NW8 9AY", "N1 9JB", "M4 1LE", "B5 6DY", "LS6 3BN", "SG6 3LA", "BS1 4DJ",
+             "G1 1AA", "75001", "CA 95014", "10115"]
+COUNTRIES = ["United Kingdom", "UK", "England", "Great Britain", "GB", "France", "United States",
+             "Germany", ""]
+
+
+def cleanup_address_lines_rowwise(df):
+    """The previous processing.cleanup_address_lines (per-row prints removed)."""
+    for i, row in df.iterrows():
+        full_address = str(row.get('Full address', '')).strip()
+        if not full_address:
+            continue
+
+        # 1. Ensure country is in full address
+        country = row.get('Country', '').strip()
+        if country and country.lower() not in full_address.lower():
+            if country.lower() in ['uk', 'gb']:
+                country = 'United Kingdom'
+            full_address = f"{full_address}, {country}"
+            df.at[i, 'Full address'] = full_address
+
+        # 2. Split components by comma
+        components = [comp.strip() for comp in full_address.split(',')]
+        if len(components) < 3:
+            continue  # Not enough components for valid address
+
+        # 3. Process components from end to start
+        for comp in reversed(components):
+            comp = comp.strip()
+            
+            # Check for postcode
+            if re.match(r'^[A-Z]{1,2}\d[A-Z\d]?\s*\d[A-Z]{2}$', comp, re.I):
+                df.at[i, 'Post code'] = comp
+                components.remove(comp)
+                continue
+                
+            # Check for country
+            if comp.lower() in ['united kingdom', 'uk', 'great britain', 'england']:
+                df.at[i, 'Country'] = 'United Kingdom'
+                components.remove(comp)
+                continue
+                
+            # Check for known cities
+            if any(city in comp.lower() for city in ['london', 'manchester', 'birmingham', 'leeds', 'letchworth']):
+                df.at[i, 'City'] = comp
+                components.remove(comp)
+                continue
+
+        # 4. Handle remaining components
+        if components:
+            # If 3 or more components remain, combine first two for Address line 1
+            if len(components) >= 3:
+                df.at[i, 'Address line 1'] = f"{components[0]}, {components[1]}"
+                if len(components) > 3:
+                    df.at[i, 'Address line 2'] = components[2]
+                # If city wasn't found earlier, use the last component
+                if not df.at[i, 'City']:
+                    df.at[i, 'City'] = components[-1]
+            # If 2 components remain
+            elif len(components) == 2:
+                df.at[i, 'Address line 1'] = components[0]
+                df.at[i, 'Address line 2'] = components[1]
+            # If only 1 component remains
+            elif len(components) == 1:
+                df.at[i, 'Address line 1'] = components[0]
+
+        # 5. Ensure Country and Country code are set correctly
+        if df.at[i, 'Country'] == 'United Kingdom':
+            df.at[i, 'Country code'] = 'GB'
+
+    return df
+
+
+def cleanup_address_line1_rowwise(df):
+    """The previous beatntrack_data_finder.cleanup_address_lines (prints removed)."""
+    for i, row in df.iterrows():
+        addr1 = str(row['Address line 1']).strip()
+        addr2 = str(row['Address line 2']).strip()
+        if ',' in addr1 and not addr2:
+            parts = [p.strip() for p in addr1.split(',')]
+            if len(parts) >= 2:
+                df.at[i, 'Address line 1'] = ', '.join(parts[:-1])
+                df.at[i, 'Address line 2'] = parts[-1]
+    return df
+
+
+def synthetic_frame(rows, seed=0):
+    rnd = random.Random(seed)
+    records = []
+    for _ in range(rows):
+        parts = [rnd.choice(STREETS)]
+        if rnd.random() < 0.6:
+            parts.append(rnd.choice(AREAS))
+        if rnd.random() < 0.8:
+            parts.append(rnd.choice(CITIES))
+        if rnd.random() < 0.7:
+            parts.append(rnd.choice(POSTCODES))
+        if rnd.random() < 0.4:
+            parts.append(rnd.choice(COUNTRIES))
+        full = ", ".join(p for p in parts) if rnd.random() < 0.95 else ""
+        line1 = rnd.choice(STREETS) + (", " + rnd.choice(AREAS) if rnd.random() < 0.5 else "")
+        records.append({
+            "Full address": full,
+            "Address line 1": line1,
+            "Address line 2": rnd.choice(["", "", "Floor 2"]),
+            "City": rnd.choice(["", "", "", "London"]),
+            "County": "",
+            "Country": rnd.choice(COUNTRIES),
+            "Post code": "",
+            "Country code": "",
+        })
+    return pd.DataFrame(records)
+
+
+def compare(name, reference, vectorized, frame, show=5):
+    expected, actual = frame.copy(), frame.copy()
+    started = time.perf_counter()
+    expected = reference(expected)
+    rowwise_s = time.perf_counter() - started
+    started = time.perf_counter()
+    actual = vectorized(actual)
+    vectorized_s = time.perf_counter() - started
+
+    cols = [c for c in OUTPUT_COLUMNS if c in expected.columns]
+    differs = (expected[cols].astype(str) != actual[cols].astype(str)).any(axis=1)
+    examples = [{"input": frame.loc[i, cols].to_dict(), "rowwise": expected.loc[i, cols].to_dict(),
+                 "vectorized": actual.loc[i, cols].to_dict()} for i in differs[differs].index[:show]]
+    return {
+        "stage": name,
+        "rows": len(frame),
+        "rowwise_ms": round(rowwise_s * 1000, 1),
+        "vectorized_ms": round(vectorized_s * 1000, 1),
+        "speedup": round(rowwise_s / vectorized_s, 1) if vectorized_s else None,
+        "mismatched_rows": int(differs.sum()),
+        "examples": examples,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Vectorized vs row-wise address normalization")
+    parser.add_argument("--rows", type=int, default=20000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--check", action="store_true", help="Exit 1 when the outputs differ")
+    args = parser.parse_args()
+
+    frame = synthetic_frame(args.rows, args.seed)
+    report = [
+        compare("cleanup_address_lines", cleanup_address_lines_rowwise, normalize_addresses, frame),
+        compare("split_address_line1", cleanup_address_line1_rowwise, split_address_line1, frame),
+    ]
+    print(json.dumps(report, indent=2))
+    if args.check and any(r["mismatched_rows"] for r in report):
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+# address_normalize.py
+"""
+Frame-wide address normalization.
+
+processing.cleanup_address_lines used to walk the frame with iterrows(),
+write cells one at a time with df.at, and print nine lines per row. Here the
+same rules run over the whole frame at once with pandas string methods and
+precompiled patterns:
+
+1. the Country is appended to Full address when it is missing from it
+   ("UK"/"GB" are written out as "United Kingdom")
+2. Full address is split on commas. Rows with fewer than three parts are
+   left alone.
+3. parts that are a UK postcode, a UK country name, or contain a known city
+   fill Post code, Country and City (the leftmost match wins). They are
+   then dropped.
+4. the remaining parts become Address line 1/2. With three or more left,
+   line 1 is the first two and the last is the City fallback.
+5. Country code is GB when the Country is the United Kingdom.
+
+    df = normalize_addresses(df)        # in place; returns df
+
+address_benchmark.py compares this with the row-wise version on speed and
+output. split_address_line1 and combine_address_fields are the frame-wide
+versions of the helpers in beatntrack_data_finder.py. combine_address_row
+is the single-row form that beatntrack's combine_into_single_address uses.
+"""
+
+import logging
+import re
+from itertools import chain
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+POSTCODE_PATTERN = re.compile(r"^[A-Z]{1,2}\d[A-Z\d]?\s*\d[A-Z]{2}$", re.IGNORECASE)
+UK_COUNTRY_NAMES = ["united kingdom", "uk", "great britain", "england"]
+CITY_HINTS = ["london", "manchester", "birmingham", "leeds", "letchworth"]
+CITY_HINT_PATTERN = re.compile("|".join(map(re.escape, CITY_HINTS)))
+COMMA_SPACING = re.compile(r"\s*,\s*")
+
+ADDRESS_FIELDS = ["Address line 1", "Address line 2", "City", "County", "Post code", "Country"]
+
+
+def text_column(df, col):
+    if col not in df.columns:
+        return pd.Series("", index=df.index, dtype=object)
+    return df[col].fillna("").astype(str)
+
+
+def set_cells(df, positions, col, values):
+    """Write values into rows at integer positions (works with any index)."""
+    if len(positions):
+        if col not in df.columns:
+            df[col] = ""
+        df.iloc[positions, df.columns.get_loc(col)] = np.asarray(values, dtype=object)
+
+
+def normalize_addresses(df):
+    """Split Full address into its components for every row; see the module docstring."""
+    if df.empty or "Full address" not in df.columns:
+        return df
+    full = text_column(df, "Full address").str.strip()
+    has_address = (full != "").to_numpy()
+    if not has_address.any():
+        return df
+
+    # 1. Country missing from the address
+    country = text_column(df, "Country").str.strip()
+    lower_country = country.str.lower()
+    missing = has_address & (country != "").to_numpy() & np.array(
+        [c not in f for c, f in zip(lower_country, full.str.lower())], dtype=bool)
+    if missing.any():
+        appended = country.where(~lower_country.isin(["uk", "gb"]), "United Kingdom")
+        full = full.where(~missing, full + ", " + appended)
+        set_cells(df, np.flatnonzero(missing), "Full address", full[missing])
+
+    # 2. Components, one per line: (row position, part)
+    parts = full[has_address].str.split(",")
+    counts = parts.str.len().to_numpy()
+    eligible = counts >= 3
+    rows = np.flatnonzero(has_address)[eligible]
+    if not len(rows):
+        return df
+    parts, counts = parts[eligible], counts[eligible]
+    comps = pd.Series(list(chain.from_iterable(parts)), dtype=object).str.strip()
+    comp_row = np.repeat(rows, counts)
+
+    # 3. Postcode, country and city parts
+    lower = comps.str.lower()
+    is_postcode = comps.str.match(POSTCODE_PATTERN).to_numpy()
+    is_country = ~is_postcode & lower.isin(UK_COUNTRY_NAMES).to_numpy()
+    is_city = ~is_postcode & ~is_country & lower.str.contains(CITY_HINT_PATTERN).to_numpy()
+
+    for mask, col in ((is_postcode, "Post code"), (is_city, "City")):
+        first = comps[mask].groupby(comp_row[mask]).first()
+        set_cells(df, first.index.to_numpy(), col, first.to_numpy())
+    set_cells(df, np.unique(comp_row[is_country]), "Country", "United Kingdom")
+
+    # 4. Address lines from what is left
+    rest_mask = ~(is_postcode | is_country | is_city)
+    rest = pd.DataFrame({"row": comp_row[rest_mask], "part": comps[rest_mask].to_numpy()})
+    rest["rank"] = rest.groupby("row").cumcount()
+    left = rest.groupby("row")["part"].agg(["size", "last"])
+    by_rank = rest.pivot(index="row", columns="rank", values="part").reindex(columns=[0, 1, 2])
+    left = left.join(by_rank)
+    n = left["size"]
+
+    many = left[n >= 3]
+    set_cells(df, many.index.to_numpy(), "Address line 1", many[0] + ", " + many[1])
+    more = left[n > 3]
+    set_cells(df, more.index.to_numpy(), "Address line 2", more[2])
+    if len(many):
+        city = text_column(df, "City").iloc[many.index.to_numpy()].to_numpy()
+        blank = city == ""
+        set_cells(df, many.index.to_numpy()[blank], "City", many["last"].to_numpy()[blank])
+    two = left[n == 2]
+    set_cells(df, two.index.to_numpy(), "Address line 1", two[0])
+    set_cells(df, two.index.to_numpy(), "Address line 2", two[1])
+    one = left[n == 1]
+    set_cells(df, one.index.to_numpy(), "Address line 1", one[0])
+
+    # 5. Country code
+    uk = rows[text_column(df, "Country").iloc[rows].to_numpy() == "United Kingdom"]
+    set_cells(df, uk, "Country code", "GB")
+
+    logger.debug(f"Normalized addresses for {len(rows)} rows")
+    return df
+
+
+def split_address_line1(df):
+    """
+    Where Address line 2 is empty and Address line 1 has a comma, move the
+    last comma-separated part of line 1 into line 2.
+    """
+    if df.empty:
+        return df
+    line1 = text_column(df, "Address line 1").str.strip()
+    line2 = text_column(df, "Address line 2").str.strip()
+    split = line1.str.contains(",", regex=False) & (line2 == "")
+    if split.any():
+        parts = line1[split].str.rpartition(",")
+        positions = np.flatnonzero(split.to_numpy())
+        # The parts of line 1 rejoined with ", ", as the row-wise version did
+        set_cells(df, positions, "Address line 1", parts[0].str.replace(COMMA_SPACING, ", ", regex=True).str.strip())
+        set_cells(df, positions, "Address line 2", parts[2].str.strip())
+    return df
+
+
+def combine_address_row(row, fields=ADDRESS_FIELDS):
+    """One row's non-empty fields joined with ", "."""
+    return ", ".join(v for v in (str(row.get(f, "")).strip() for f in fields) if v)
+
+
+def combine_address_fields(df, fields=ADDRESS_FIELDS):
+    """Series of single-line addresses: the non-empty fields joined with ", "."""
+    cols = [text_column(df, f).str.strip() for f in fields]
+    out = pd.Series("", index=df.index, dtype=object)
+    for col in cols:
+        sep = np.where((out != "") & (col != ""), ", ", "")
+        out = out + sep + col
+    return out
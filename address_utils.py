@@ -1,40 +1,18 @@
 import re
-
-def get_patterns_for_country(country):
-    """
-    Returns regex patterns for address validation based on country.
-    """
-    patterns = {
-        "UK": {
-            "phone": r"\b(?:(?:\+44)|(?:0))(?:\d\s?){9,10}\b",
-            "postcode": r"\b[A-Z]{1,2}\d[A-Z\d]?\s*\d[A-Z]{2}\b",
-            "address_keywords": r"\b(?:street|road|avenue|lane|drive|way|court|close)\b"
-        },
-        "US": {
-            "phone": r"\b(?:\+1|1?)[\s.-]?\(?\d{3}\)?[\s.-]?\d{3}[\s.-]?\d{4}\b",
-            "postcode": r"\b\d{5}(?:-\d{4})?\b",
-            "address_keywords": r"\b(?:street|road|avenue|lane|drive|way|court|close)\b"
-        }
-    }
-    return patterns.get(country.upper(), patterns["UK"])
+from regex import get_patterns_for_country
 
 def quick_extract_address(text, country="UK"):
     """
     Enhanced quick_extract_address function using country-specific regex patterns.
     """
     segments = text.splitlines()
-    # Retrieve regex patterns for the given country
+    # Compiled patterns for the given country, shared via the registry in regex.py
     patterns = get_patterns_for_country(country)
-    phone_pattern = patterns.get("phone", "")
-    postcode_pattern = patterns.get("postcode", "")
-    print(f"Debug: For country '{country}', phone_pattern: {phone_pattern}, postcode_pattern: {postcode_pattern}")
-    # Compile regex for postcode and keywords
-    postcode_regex = re.compile(postcode_pattern, re.IGNORECASE)
-    address_keyword_regex = re.compile(patterns.get("address_keywords", ""), re.IGNORECASE)
+    print(f"Debug: For country '{country}', using {patterns}")
     candidate_blocks = []
     # Iterate segments for a candidate address containing a valid postcode
     for i, segment in enumerate(segments):
-        if postcode_regex.search(segment):
+        if patterns.find_postcode(segment):
             block_segments = []
             # Collect prior segments if needed
             for j in range(max(0, i - 2), i):
@@ -53,7 +31,7 @@ def quick_extract_address(text, country="UK"):
     def is_valid_candidate(candidate, ctry):
         candidate_lower = candidate.lower()
         has_digit = bool(re.search(r'\d+', candidate))
-        has_keyword = bool(address_keyword_regex.search(candidate_lower))
+        has_keyword = patterns.has_keyword(candidate_lower)
         if ctry.upper() in ("UK", "GB"):
             return has_digit
         elif ctry.upper() in ("US", "USA", "UNITED STATES"):
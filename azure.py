@@ -2,14 +2,17 @@ import os
 import re
 import requests
 from dotenv import load_dotenv
+from http_client import api_session
+from countries import get_country_code
+from regex import get_patterns_for_country
+
+UK_PATTERNS = get_patterns_for_country("GB")
 
 load_dotenv()  # Ensure environment variables are loaded
 
 def is_postcode_valid(postcode):
-    # Modified regex: require exactly one space, ensuring proper full postcode (e.g. "LA2 9AN")
-    import re
-    pattern = re.compile(r'^[A-Z]{1,2}\d[A-Z\d]? \d[A-Z]{2}$', re.I)
-    return bool(postcode and pattern.match(postcode.strip()))
+    # Full UK postcode with exactly one space (e.g. "LA2 9AN"); see regex.UK_POSTCODE_FULL_REGEX
+    return UK_PATTERNS.is_postcode(postcode)
 
 def thorough_azure_lookup(entry):
     """Perform an Azure lookup using only Name, (City/State) and Country.
@@ -45,7 +48,7 @@ def thorough_azure_lookup(entry):
     query = ", ".join(query_parts)
     
     # Set countrySet based solely on the country provided.
-    params_country = "GB" if country.lower() in ["uk", "united kingdom", "great britain"] else entry.get("Country code", "GB")
+    params_country = get_country_code(country) or entry.get("Country code", "GB")
     
     params = {
         "api-version": "1.0",
@@ -58,7 +61,7 @@ def thorough_azure_lookup(entry):
 
     try:
         print(f"Azure lookup query: {query}")
-        r = requests.get(azure_url, params=params, timeout=10, headers={"Subscription-Key": azure_key})
+        r = api_session().get(azure_url, params=params, timeout=10, headers={"Subscription-Key": azure_key})
         print("Azure lookup status:", r.status_code)
         if r.status_code == 200:
             data = r.json()
@@ -23,6 +23,8 @@ from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.common.by import By
 import traceback  # Add this import
 from playwright.sync_api import sync_playwright  # Add this import
+from address_normalize import combine_address_row, split_address_line1
+from countries import fix_country_code, get_country_code
 
 # Define custom styles right after imports
 CUSTOM_STYLES = """
@@ -1175,44 +1177,16 @@ def extract_city_country_gpt(text):
     except:
         return {}
 
-###################################
-# 4b. Fix country code logic
-###################################
-def fix_country_code(row):
-    """
-    If 'Country code' is missing or incorrect, try to fix it based on row['Country'].
-    Preserve existing valid country codes.
-    """
-    country_str = (row['Country'] if pd.notnull(row['Country']) else "").strip().lower()
-    ccode_str = (row['Country code'] if pd.notnull(row['Country code']) else "").strip().upper()
-
-    # If there's already a valid country code that isn't "UK", keep it
-    if ccode_str and ccode_str != "UK":
-        return ccode_str
-
-    # Otherwise, determine the correct code
-    if country_str in ("united kingdom", "uk", "great britain", "england", "scotland", "wales"):
-        return "GB"
-    elif country_str in ("united states", "usa", "us", "america"):
-        return "US"
-    # Add more country mappings as needed
-    return ccode_str or ""
-
-
 ###################################
 # 5. "combine_into_single_address" 
 ###################################
 def combine_into_single_address(row):
     """
-    Combine subfields for the row into a single 'Full address' line.
+    Combine subfields into a single 'Full address' line.
     Specifically: [Address line 1, Address line 2, City, County, Post code, Country].
+    For a whole frame use address_normalize.combine_address_fields.
     """
-    parts = []
-    for field in ["Address line 1","Address line 2","City","County","Post code","Country"]:
-        val = str(row.get(field,"")).strip()
-        if val:
-            parts.append(val)
-    return ", ".join(parts)
+    return combine_address_row(row)
 
 
 ###################################
@@ -1517,24 +1491,8 @@ def process_row(i, row, df, s, final_type, gig_synonyms):
         print(f"⚠️ Error processing row {i + 1}: {e}")
 
 def cleanup_address_lines(df):
-    """Clean up address lines by properly splitting multi-line addresses"""
-    for i, row in df.iterrows():
-        addr1 = str(row['Address line 1']).strip()
-        addr2 = str(row['Address line 2']).strip()
-        
-        # Only process if Address line 1 has a comma and Address line 2 is empty
-        if ',' in addr1 and not addr2:
-            parts = [p.strip() for p in addr1.split(',')]
-            if len(parts) >= 2:
-                # Keep all parts except the last one in Address line 1
-                df.at[i, 'Address line 1'] = ', '.join(parts[:-1])
-                # Put the last part in Address line 2
-                df.at[i, 'Address line 2'] = parts[-1]
-                print(f"Split address for row {i}:")
-                print(f"Line 1: {df.at[i, 'Address line 1']}")
-                print(f"Line 2: {df.at[i, 'Address line 2']}")
-    
-    return df
+    """Clean up address lines by properly splitting multi-line addresses (whole frame at once)"""
+    return split_address_line1(df)
 
 # Update the display conversion to handle image arrays properly
 def ensure_string_format(value):
@@ -1692,12 +1650,7 @@ if uploaded_file is not None:
             if selected_country.strip():
                 for i in range(len(df)):
                     df.at[i, "Country"] = selected_country
-                    if selected_country.lower() in ("united kingdom", "uk", "great britain"):
-                        df.at[i, "Country code"] = "GB"
-                    elif selected_country.lower() in ("united states", "usa", "us"):
-                        df.at[i, "Country code"] = "US"
-                    else:
-                        df.at[i, "Country code"] = ""
+                    df.at[i, "Country code"] = get_country_code(selected_country)
 
                 if selected_country == "United States" and selected_state.strip():
                     for i in range(len(df)):
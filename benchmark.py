@@ -0,0 +1,431 @@
+# benchmark.py
+"""
+End-to-end throughput benchmark for the row pipeline (processing.process_rows).
+
+Replays the recorded sites in fixtures/sites/ from a local HTTP server (routed
+by Host header, so the real hostnames and their special cases still apply),
+answers GPT calls from gpt_stub.py, and scores the results against
+fixtures/golden.json.
+
+Reports rows/sec, per-stage latency, peak RSS and extraction accuracy:
+
+    python benchmark.py
+    python benchmark.py --repeat 5 --output bench.json
+    python benchmark.py --baseline bench.json --tolerance 0.2   # exit 1 on regression
+
+Golden values are compared exactly; lists are compared as sets; an expected
+value of "*" means "any non-empty value".
+"""
+
+import argparse
+import contextlib
+import json
+import os
+import re
+import resource
+import tempfile
+import threading
+import time
+from functools import wraps
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit, urlunsplit
+
+import pandas as pd
+import requests
+
+from http_client import connection_stats
+from politeness import PoliteAdapter, PolitenessScheduler, set_scheduler
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+SITES_DIR = os.path.join(FIXTURES_DIR, "sites")
+SEARCH_DIR = os.path.join(FIXTURES_DIR, "search")
+GOLDEN_PATH = os.path.join(FIXTURES_DIR, "golden.json")
+
+# Search endpoints answered from fixtures/search/<query-slug>.html
+SEARCH_HOSTS = {"html.duckduckgo.com", "lite.duckduckgo.com"}
+SEARCH_PATHS = ("/html", "/lite")
+
+# Pipeline stages timed inside processing.process_row
+STAGES = [
+    "try_url_variants",
+    "extract_footer_content",
+    "extract_contact_info",
+    "find_contact_page_url",
+    "get_contact_page_text",
+    "extract_address_fields_gpt",
+    "get_address_and_phone_from_duckduckgo",
+    "quick_extract_images",
+    "find_all_images_500",
+    "try_fetch_image",
+    "find_social_links",
+]
+
+IMAGE_BYTES = 150_000  # big enough to pass the >100KB image checks
+
+
+########################################################################
+# Corpus server
+########################################################################
+
+def bare_host(host):
+    host = (host or "").split(":")[0].lower()
+    return host[4:] if host.startswith("www.") else host
+
+
+def corpus_hosts():
+    sites = {name for name in os.listdir(SITES_DIR) if os.path.isdir(os.path.join(SITES_DIR, name))}
+    return sites | SEARCH_HOSTS
+
+
+def query_slug(query):
+    return re.sub(r"[^a-z0-9]+", "-", query.lower()).strip("-")
+
+
+class CorpusHandler(BaseHTTPRequestHandler):
+    """
+    Serves fixtures/sites/<host>/<path>.html; images are synthesized.
+    Search requests (/html or /lite with ?q=) are answered from
+    fixtures/search/, whatever the Host, so the server can also stand in
+    for DDG_HTML_URL / DDG_LITE_URL on its own.
+    """
+
+    def log_message(self, format, *args):
+        pass
+
+    def resolve(self):
+        site = os.path.join(SITES_DIR, bare_host(self.headers.get("Host")))
+        parts = urlsplit(self.path)
+        path = parts.path.strip("/")
+        if not os.path.isdir(site):
+            if parts.path.startswith(SEARCH_PATHS):
+                query = parse_qs(parts.query).get("q", [""])[0]
+                candidate = os.path.join(SEARCH_DIR, query_slug(query) + ".html")
+                return "search", candidate if os.path.isfile(candidate) else None
+            return None, None
+        if path.lower().endswith((".jpg", ".jpeg", ".png", ".webp", ".gif")):
+            return "image", path
+        candidate = os.path.join(site, (path or "index") + ".html")
+        if os.path.isfile(candidate):
+            return "html", candidate
+        return None, None
+
+    def respond(self, with_body):
+        kind, target = self.resolve()
+        if kind == "html" or (kind == "search" and target):
+            with open(target, "rb") as f:
+                body = f.read()
+            content_type = "text/html; charset=utf-8"
+        elif kind == "search":
+            body = b"<html><body><div class='no-results'>No results.</div></body></html>"
+            content_type = "text/html; charset=utf-8"
+        elif kind == "image":
+            body = b"\xff\xd8\xff\xe0" + b"\0" * (IMAGE_BYTES - 4)
+            content_type = "image/jpeg"
+        else:
+            body = b"<html><body>Not found</body></html>"
+            content_type = "text/html; charset=utf-8"
+        self.send_response(200 if kind else 404)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if with_body:
+            self.wfile.write(body)
+
+    def do_GET(self):
+        self.respond(True)
+
+    def do_HEAD(self):
+        self.respond(False)
+
+
+class CorpusAdapter(PoliteAdapter):
+    """
+    Transport adapter that sends corpus hosts (http or https) to the local
+    corpus server and refuses everything else, keeping the run hermetic.
+    With scheduled=True requests also go through the politeness scheduler,
+    like the row session does in the app.
+    """
+
+    def __init__(self, server_address, hosts, scheduled=True, **kwargs):
+        self.server_address = server_address
+        self.hosts = hosts
+        self.scheduled = scheduled
+        super().__init__(**kwargs)
+
+    def transport_send(self, request, **kwargs):
+        parts = urlsplit(request.url)
+        if bare_host(parts.hostname) not in self.hosts:
+            raise requests.ConnectionError(f"{parts.hostname} is not in the benchmark corpus")
+        host, port = self.server_address
+        request.headers["Host"] = parts.hostname
+        request.url = urlunsplit(("http", f"{host}:{port}", parts.path or "/", parts.query, ""))
+        kwargs["verify"] = False
+        return super().transport_send(request, **kwargs)
+
+    def send(self, request, **kwargs):
+        if self.scheduled:
+            return super().send(request, **kwargs)
+        return self.transport_send(request, **kwargs)
+
+
+@contextlib.contextmanager
+def corpus_routing(server_address):
+    """
+    Route every HTTP client the pipeline uses through the corpus by swapping
+    the transport in http_client's session factory; the shared sessions,
+    cloudscraper and the search client all pick it up. The DNS precheck
+    treats corpus hosts as live and everything else as NXDOMAIN. Browser-based
+    helpers are disabled since the corpus is static HTML.
+    """
+    import dns_cache
+    import http_client
+    import render_pool
+    import scraper
+
+    hosts = corpus_hosts()
+
+    def corpus_adapter(polite, **pool_kwargs):
+        return CorpusAdapter(server_address, hosts, scheduled=polite, **pool_kwargs)
+
+    async def corpus_resolver(host):
+        # The corpus is the whole internet as far as the run is concerned
+        return dns_cache.OK if bare_host(host) in hosts else dns_cache.NXDOMAIN
+
+    saved = scraper.get_contact_text_selenium, render_pool.RENDER_POOL_SIZE
+    http_client.set_adapter_factory(corpus_adapter)
+    dns_cache.set_resolver(corpus_resolver)
+    scraper.get_contact_text_selenium = lambda url: None
+    render_pool.RENDER_POOL_SIZE = 0
+    try:
+        yield http_client.shared_session()
+    finally:
+        scraper.get_contact_text_selenium, render_pool.RENDER_POOL_SIZE = saved
+        dns_cache.set_resolver(None)
+        http_client.set_adapter_factory(None)
+
+
+########################################################################
+# Stage timing
+########################################################################
+
+class StageTimer:
+    def __init__(self):
+        self.samples = {}
+        self.lock = threading.Lock()
+
+    def wrap(self, name, fn):
+        @wraps(fn)
+        def timed(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                with self.lock:
+                    self.samples.setdefault(name, []).append(time.perf_counter() - started)
+        return timed
+
+    def summary(self):
+        out = {}
+        for name, values in self.samples.items():
+            values = sorted(values)
+            out[name] = {
+                "calls": len(values),
+                "total_s": round(sum(values), 3),
+                "mean_ms": round(1000 * sum(values) / len(values), 1),
+                "p95_ms": round(1000 * values[int(0.95 * (len(values) - 1))], 1),
+            }
+        return out
+
+
+@contextlib.contextmanager
+def timed_stages(timer):
+    import processing
+    saved = {}
+    for name in STAGES:
+        if hasattr(processing, name):
+            saved[name] = getattr(processing, name)
+            setattr(processing, name, timer.wrap(name, saved[name]))
+    try:
+        yield
+    finally:
+        for name, fn in saved.items():
+            setattr(processing, name, fn)
+
+
+########################################################################
+# Scoring
+########################################################################
+
+def field_matches(expected, actual):
+    if expected == "*":
+        return bool(str(actual or "").strip())
+    if isinstance(expected, list):
+        return isinstance(actual, list) and set(expected) == set(actual)
+    return str(expected).strip() == str(actual if actual is not None else "").strip()
+
+
+def score(df, golden):
+    per_field = {}
+    mismatches = []
+    for i, case in enumerate(golden):
+        for field, expected in case["expected"].items():
+            actual = df.at[i, field]
+            ok = field_matches(expected, actual)
+            hits, total = per_field.get(field, (0, 0))
+            per_field[field] = (hits + ok, total + 1)
+            if not ok:
+                mismatches.append({"URL": case["URL"], "field": field, "expected": expected, "actual": actual})
+    hits = sum(h for h, _ in per_field.values())
+    total = sum(t for _, t in per_field.values())
+    return {
+        "accuracy": round(hits / total, 4) if total else 1.0,
+        "fields": {f: round(h / t, 4) for f, (h, t) in sorted(per_field.items())},
+        "mismatches": mismatches,
+    }
+
+
+########################################################################
+# Runner
+########################################################################
+
+def load_golden(path=GOLDEN_PATH, repeat=1):
+    with open(path, "r", encoding="utf-8") as f:
+        golden = json.load(f)
+    return golden * repeat
+
+
+def build_frame(golden):
+    from processing import initialize_dataframe
+    df = pd.DataFrame([{"URL": c["URL"], "Name": c["Name"], "Type": c["Type"]} for c in golden])
+    df = initialize_dataframe(df)
+    for i, case in enumerate(golden):
+        df.at[i, "Type"] = case["Type"]
+        df.at[i, "Country"] = "United Kingdom"
+    return df
+
+
+def run_benchmark(repeat=1, golden_path=GOLDEN_PATH, gpt_latency_ms=0, verbose=False, workers=None):
+    from gpt_stub import point_openai_at, start_stub_server
+    import fetch_strategy
+    import processing
+    import search_cache
+    import text_store
+    from state_manager import StateManager
+
+    golden = load_golden(golden_path, repeat)
+    df = build_frame(golden)
+    timer = StageTimer()
+
+    corpus = ThreadingHTTPServer(("127.0.0.1", 0), CorpusHandler)
+    threading.Thread(target=corpus.serve_forever, daemon=True).start()
+    stub, base_url = start_stub_server(latency_ms=gpt_latency_ms)
+    point_openai_at(base_url)
+    # Cold caches every run, so results don't depend on previous runs
+    scratch = tempfile.TemporaryDirectory(prefix="bnt-bench-")
+    search_cache.set_search_cache(search_cache.SearchCache(os.path.join(scratch.name, "search.sqlite3")))
+    strategies = fetch_strategy.StrategyStore(os.path.join(scratch.name, "fetch_strategy.sqlite3"))
+    fetch_strategy.set_strategy_store(strategies)
+    texts = text_store.TextStore(os.path.join(scratch.name, "texts.sqlite3"))
+    text_store.set_text_store(texts)
+    scheduler = PolitenessScheduler()
+    set_scheduler(scheduler)
+    workers = workers or processing.SCRAPE_WORKERS
+
+    # The pipeline prints per-row debug output; keep the report readable
+    quiet = contextlib.nullcontext() if verbose else contextlib.redirect_stdout(open(os.devnull, "w"))
+    try:
+        with quiet, corpus_routing(corpus.server_address) as session, timed_stages(timer):
+            started = time.perf_counter()
+            # Golden rows carry their own Type, so group by it for the engine
+            escalation = {}
+            for final_type, part in df.groupby("Type", sort=False):
+                part = part.copy()
+                processing.process_rows(part, session, final_type, StateManager.gig_synonyms, workers=workers)
+                for key, value in part.attrs.get("escalation", {}).items():
+                    if key != "escalation_rate":
+                        escalation[key] = escalation.get(key, 0) + value
+                for col in part.columns:
+                    for i in part.index:
+                        df.at[i, col] = part.at[i, col]
+            elapsed = time.perf_counter() - started
+            pages = escalation.get("contact_pages", 0)
+            escalation["escalation_rate"] = round(escalation.get("escalated", 0) / pages, 3) if pages else 0.0
+            connections = connection_stats()
+    finally:
+        corpus.shutdown()
+        stub.shutdown()
+        search_cache.set_search_cache(None)
+        fetch_strategy.set_strategy_store(None)
+        text_store.set_text_store(None)
+        set_scheduler(None)
+        scratch.cleanup()
+
+    return {
+        "rows": len(df),
+        "workers": workers,
+        "politeness": scheduler.stats(),
+        "connections": connections,
+        "fetch_strategy": dict(strategies.stats),
+        "escalation": escalation,
+        "text_store": dict(texts.stats),
+        "elapsed_s": round(elapsed, 3),
+        "rows_per_s": round(len(df) / elapsed, 3) if elapsed else 0.0,
+        # ru_maxrss is KiB on Linux
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        "stages": timer.summary(),
+        **score(df, golden),
+    }
+
+
+def check_regression(report, baseline, tolerance):
+    """Return a list of regressions versus a previous report."""
+    problems = []
+    if report["rows_per_s"] < baseline["rows_per_s"] * (1 - tolerance):
+        problems.append(f"rows/sec {report['rows_per_s']} < baseline {baseline['rows_per_s']}")
+    if report["accuracy"] < baseline["accuracy"]:
+        problems.append(f"accuracy {report['accuracy']} < baseline {baseline['accuracy']}")
+    if report["peak_rss_mb"] > baseline["peak_rss_mb"] * (1 + tolerance):
+        problems.append(f"peak RSS {report['peak_rss_mb']}MB > baseline {baseline['peak_rss_mb']}MB")
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay the site corpus through process_row")
+    parser.add_argument("--repeat", type=int, default=1, help="Replay the corpus N times")
+    parser.add_argument("--golden", default=GOLDEN_PATH)
+    parser.add_argument("--gpt-latency-ms", type=float, default=0)
+    parser.add_argument("--output", help="Write the JSON report here")
+    parser.add_argument("--baseline", help="Previous report to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    parser.add_argument("--workers", type=int, default=None, help="Rows in parallel (default SCRAPE_WORKERS)")
+    parser.add_argument("--verbose", action="store_true", help="Show the pipeline's own output")
+    parser.add_argument("--serve", type=int, metavar="PORT",
+                        help="Only run the fixture server (e.g. for DDG_HTML_URL=http://127.0.0.1:PORT/html/)")
+    args = parser.parse_args()
+
+    if args.serve is not None:
+        server = ThreadingHTTPServer(("127.0.0.1", args.serve), CorpusHandler)
+        print(f"Fixture server on http://127.0.0.1:{server.server_address[1]}")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        return
+
+    report = run_benchmark(args.repeat, args.golden, args.gpt_latency_ms, args.verbose, args.workers)
+    print(json.dumps(report, indent=2, default=str))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, default=str)
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            problems = check_regression(report, json.load(f), args.tolerance)
+        for p in problems:
+            print(f"REGRESSION: {p}")
+        if problems:
+            raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
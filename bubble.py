@@ -2,7 +2,77 @@ import streamlit as st
 import requests
 import pandas as pd
 from requests.exceptions import RequestException
+import os
 from urllib.parse import urljoin
+from http_client import api_session
+from bubble_upload import describe_report, upload_records
+from sync_ledger import BUBBLE_SYNC_DRY_RUN, describe_plan, get_sync_ledger
+from text_store import is_ref, resolve_text
+
+# Overridable so uploads can be pointed at bubble_stub.py
+BUBBLE_URL = os.getenv("BUBBLE_URL", "https://beatntrack.world/api/1.1/wf/bntdata")
+BUBBLE_INIT_URL = os.getenv("BUBBLE_INIT_URL", "https://majorlabl.bubbleapps.io/version-test/api/1.1/wf/bntdata/initialize")
+
+# ScrapedText is a text_store reference; "1" sends the page text itself
+BUBBLE_INCLUDE_TEXT = os.getenv("BUBBLE_INCLUDE_TEXT", "0") == "1"
+
+def bubble_images(images):
+    """AllImages as the array Bubble expects"""
+    if isinstance(images, str):
+        if "||" in images:  # Our custom separator
+            return images.split("||")
+        if "," in images:  # Comma separator
+            return [url.strip() for url in images.split(",")]
+        return [images] if images else []
+    return images if isinstance(images, list) else []
+
+def bubble_records(df):
+    """Rows as Bubble records, with AllImages always sent as an array"""
+    df = df.copy()
+    df["AllImages"] = [bubble_images(v) for v in df.get("AllImages", pd.Series([""] * len(df), index=df.index))]
+    if "ScrapedText" in df.columns:
+        if BUBBLE_INCLUDE_TEXT:
+            df["ScrapedText"] = df["ScrapedText"].map(resolve_text)
+        else:
+            df["ScrapedText"] = df["ScrapedText"].map(lambda v: "" if is_ref(v) else v)
+    return df.to_dict(orient="records")
+
+def sync_records(records, url, resend=False, dry_run=BUBBLE_SYNC_DRY_RUN, seen=None):
+    """
+    Upload only the records that are new or changed since they were last
+    sent to url (sync_ledger); `resend` uploads them all. With `dry_run`
+    nothing is sent. `seen` is shared by the chunks of one sheet (see
+    SyncLedger.plan). Returns (level, message) pairs.
+    """
+    ledger = get_sync_ledger()
+    plan = ledger.plan(records, url, seen)
+    if dry_run:
+        return [("info", describe_plan(plan, dry_run=True))]
+    changed = records if resend else plan.changed
+    if not changed:
+        return [("info", f"Nothing new to send to Bubble; {plan.unchanged} records unchanged since the last send")]
+    report = upload_records(changed, url, resend=resend, on_sent=lambda rows: ledger.mark_sent(rows, url, plan.keys))
+    return [("caption", describe_plan(plan)), describe_report(report)]
+
+def send_to_bubble(df, initialize=True, resend=False, dry_run=BUBBLE_SYNC_DRY_RUN, seen=None):
+    """
+    Upload new and changed rows to the production endpoint in chunks
+    (sync_records) and (with `initialize`) post a 5-row sample to the
+    initialize endpoint. No Streamlit calls, so background jobs can use it;
+    returns (level, message) pairs for the UI to show. Jobs sending a sheet
+    chunk by chunk pass one `seen` dict for all of its chunks.
+    """
+    messages = sync_records(bubble_records(df), BUBBLE_URL, resend=resend, dry_run=dry_run, seen=seen)
+    try:
+        if initialize and not dry_run:
+            resp = api_session().post(BUBBLE_INIT_URL, json=bubble_records(df.head(5)), timeout=10)
+            if resp.status_code == 200:
+                messages.append(("success", "Bubble initialization success! Check your Bubble workflow to confirm."))
+            else:
+                messages.append(("error", f"Bubble initialization endpoint returned {resp.status_code}: {resp.text}"))
+    except RequestException as e:
+        messages.append(("error", f"Error contacting Bubble: {e}"))
+    return messages
 
 def bubble_initialize_button():
     """
@@ -16,11 +86,11 @@ def bubble_initialize_button():
     df = st.session_state["df"].copy()
     sample = df.head(5).to_dict(orient="records")
 
-    init_url = "https://majorlabl.bubbleapps.io/version-test/api/1.1/wf/bntdata/initialize"
+    init_url = BUBBLE_INIT_URL
     st.info(f"Sending up to 5 sample rows to {init_url} for Bubble initialization...")
 
     try:
-        resp = requests.post(init_url, json=sample, timeout=10)
+        resp = api_session().post(init_url, json=sample, timeout=10)
         if resp.status_code == 200:
             st.success("Bubble initialization success! Check your Bubble workflow to confirm.")
         else:
@@ -28,42 +98,25 @@ def bubble_initialize_button():
     except RequestException as e:
         st.error(f"Error contacting Bubble initialize endpoint: {e}")
 
-def bubble_send_final_button():
-    """Enhanced Bubble integration that properly handles arrays"""
+def bubble_send_final_button(resend=False, dry_run=BUBBLE_SYNC_DRY_RUN):
+    """
+    Upload new and changed rows to the production endpoint in chunks.
+    Records already sent unchanged are skipped unless `resend`, so pressing
+    the button again after a failure resumes the upload.
+    """
     if st.session_state.get("df") is None:
         st.warning("No data to summarize or fill. Please scrape first.")
         return
 
-    df = st.session_state["df"].copy()
-    
-    # Ensure arrays are properly formatted for Bubble
-    for i, row in df.iterrows():
-        # Convert AllImages to proper array if it's a string
-        if isinstance(row['AllImages'], str):
-            if '||' in row['AllImages']:  # Our custom separator
-                df.at[i, 'AllImages'] = row['AllImages'].split('||')
-            elif ',' in row['AllImages']:  # Comma separator
-                df.at[i, 'AllImages'] = [url.strip() for url in row['AllImages'].split(',')]
-            else:
-                df.at[i, 'AllImages'] = [row['AllImages']] if row['AllImages'] else []
-        
-        # Ensure it's a list
-        if not isinstance(row['AllImages'], list):
-            df.at[i, 'AllImages'] = []
-
-    records = df.to_dict(orient="records")
+    records = bubble_records(st.session_state["df"])
 
-    bubble_url = "https://beatntrack.world/api/1.1/wf/bntdata"
-    st.info(f"Sending all rows to {bubble_url} ...")
+    bubble_url = BUBBLE_URL
+    st.info(f"Syncing {len(records)} rows with {bubble_url} ...")
 
-    try:
-        resp = requests.post(bubble_url, json=records, timeout=20)
-        if resp.status_code == 200:
-            st.success("Data successfully sent to Bubble production endpoint!")
-        else:
-            st.error(f"Bubble returned {resp.status_code}: {resp.text}")
-    except RequestException as e:
-        st.error(f"Error contacting Bubble production endpoint: {e}")
+    with st.spinner("Uploading to Bubble..."):
+        messages = sync_records(records, bubble_url, resend=resend, dry_run=dry_run)
+    for level, message in messages:
+        getattr(st, level)(message)
 
 # Example usage (for testing purposes):
 if __name__ == "__main__":
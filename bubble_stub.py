@@ -0,0 +1,198 @@
+# bubble_stub.py
+"""
+Local stub of the Bubble workflow endpoint, for exercising bubble_upload
+offline.
+
+Accepts POST /api/1.1/wf/<name> (and .../initialize) with JSON or gzip
+bodies. Records are kept in memory, and a repeated Idempotency-Key is
+acknowledged without storing the chunk twice. Latency, 5xx/429 failures
+and a failing first N requests can be injected. GET /stats reports counts.
+Point the app at it with:
+
+    BUBBLE_URL=http://127.0.0.1:8788/api/1.1/wf/bntdata
+
+Usage:
+    python bubble_stub.py serve --port 8788 --rate-500 0.1
+    python bubble_stub.py demo --records 5000 --rate-500 0.2
+"""
+
+import argparse
+import gzip
+import json
+import random
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class StubConfig:
+    def __init__(self, latency_ms=0, rate_500=0.0, rate_429=0.0, fail_first=0, seed=None):
+        self.latency_ms = latency_ms
+        self.rate_500 = rate_500
+        self.rate_429 = rate_429
+        self.fail_first = fail_first
+        self.random = random.Random(seed)
+        self.keys = set()
+        self.records = []
+        self.stats = {"requests": 0, "chunks": 0, "records": 0, "duplicates": 0,
+                      "failed": 0, "gzip": 0, "bytes": 0}
+        self.lock = threading.Lock()
+
+    def bump(self, key, n=1):
+        with self.lock:
+            self.stats[key] += n
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    config = None  # set by make_server()
+
+    def log_message(self, format, *args):
+        pass
+
+    def send_json(self, status, payload, headers=None):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for k, v in (headers or {}).items():
+            self.send_header(k, v)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path.rstrip("/").endswith("/stats"):
+            self.send_json(200, self.config.stats)
+        else:
+            self.send_json(404, {"status": "error", "message": "not found"})
+
+    def do_POST(self):
+        cfg = self.config
+        if "/api/1.1/wf/" not in self.path:
+            self.send_json(404, {"status": "error", "message": "not found"})
+            return
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        cfg.bump("requests")
+        cfg.bump("bytes", len(body))
+
+        if cfg.latency_ms:
+            time.sleep(cfg.latency_ms / 1000.0)
+        with cfg.lock:
+            fail = cfg.stats["requests"] <= cfg.fail_first
+            roll = cfg.random.random()
+        if fail or roll < cfg.rate_500:
+            cfg.bump("failed")
+            self.send_json(500, {"status": "error", "message": "stub failure"})
+            return
+        if roll < cfg.rate_500 + cfg.rate_429:
+            cfg.bump("failed")
+            self.send_json(429, {"status": "error", "message": "rate limited"}, headers={"Retry-After": "0"})
+            return
+
+        if self.headers.get("Content-Encoding") == "gzip":
+            cfg.bump("gzip")
+            body = gzip.decompress(body)
+        try:
+            records = json.loads(body or b"[]")
+        except ValueError:
+            self.send_json(400, {"status": "error", "message": "invalid JSON"})
+            return
+        records = records if isinstance(records, list) else [records]
+
+        key = self.headers.get("Idempotency-Key")
+        with cfg.lock:
+            duplicate = bool(key) and key in cfg.keys
+            if duplicate:
+                cfg.stats["duplicates"] += 1
+            else:
+                if key:
+                    cfg.keys.add(key)
+                cfg.records.extend(records)
+                cfg.stats["chunks"] += 1
+                cfg.stats["records"] += len(records)
+        self.send_json(200, {"status": "success", "response": {"duplicate": duplicate}})
+
+
+def make_server(host="127.0.0.1", port=0, **options):
+    """Create (but don't start) a stub server. Port 0 picks a free port."""
+    config = StubConfig(**options)
+    handler = type("BoundStubHandler", (StubHandler,), {"config": config})
+    return ThreadingHTTPServer((host, port), handler)
+
+
+def start_stub_server(host="127.0.0.1", port=0, **options):
+    """
+    Start the stub in a daemon thread.
+    Returns (server, url of the bntdata workflow); call server.shutdown() when done.
+    """
+    server = make_server(host, port, **options)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://{server.server_address[0]}:{server.server_address[1]}/api/1.1/wf/bntdata"
+    return server, url
+
+
+def demo(url, total=1000, chunk_rows=100, concurrency=4):
+    """
+    Upload synthetic records with a scratch ledger, rerunning (up to three
+    times) while chunks fail. With --rate-500/--fail-first each rerun resumes
+    the same run and posts only the chunks not yet acknowledged.
+    """
+    from bubble_upload import AckLedger, BubbleUploader
+
+    records = [{"Name": f"Venue {n}", "URL": f"https://venue{n}.example", "AllImages": []} for n in range(total)]
+    with tempfile.TemporaryDirectory() as tmp:
+        uploader = BubbleUploader(AckLedger(f"{tmp}/acks.sqlite3"), chunk_rows=chunk_rows,
+                                  concurrency=concurrency, retries=1, backoff=0.05)
+        runs = []
+        for _ in range(3):
+            started = time.perf_counter()
+            report = uploader.upload(records, url)
+            report["elapsed_s"] = round(time.perf_counter() - started, 3)
+            report["errors"] = len(report["errors"])
+            runs.append(report)
+            if not report["failed"]:
+                break
+    return runs
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bubble workflow endpoint stub")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    for name in ("serve", "demo"):
+        p = sub.add_parser(name)
+        p.add_argument("--host", default="127.0.0.1")
+        p.add_argument("--port", type=int, default=8788 if name == "serve" else 0)
+        p.add_argument("--latency-ms", type=float, default=0)
+        p.add_argument("--rate-500", type=float, default=0.0, help="Probability of answering 500")
+        p.add_argument("--rate-429", type=float, default=0.0, help="Probability of answering 429")
+        p.add_argument("--fail-first", type=int, default=0, help="Fail the first N requests")
+        p.add_argument("--seed", type=int, default=None)
+        if name == "demo":
+            p.add_argument("--records", type=int, default=1000)
+            p.add_argument("--chunk-rows", type=int, default=100)
+            p.add_argument("--concurrency", type=int, default=4)
+
+    args = parser.parse_args()
+    options = dict(latency_ms=args.latency_ms, rate_500=args.rate_500, rate_429=args.rate_429,
+                   fail_first=args.fail_first, seed=args.seed)
+
+    if args.command == "serve":
+        server = make_server(args.host, args.port, **options)
+        print(f"Bubble stub listening on http://{args.host}:{server.server_address[1]}/api/1.1/wf/bntdata")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+    else:
+        server, url = start_stub_server(args.host, args.port, **options)
+        try:
+            report = {"runs": demo(url, args.records, args.chunk_rows, args.concurrency),
+                      "server": dict(server.RequestHandlerClass.config.stats)}
+            print(json.dumps(report, indent=2))
+        finally:
+            server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,298 @@
+# bubble_upload.py
+"""
+Chunked, resumable uploads to the Bubble workflow endpoint.
+
+Every record used to go in one JSON POST with a 20 s timeout. Big imports
+hit the timeout, and one transient failure lost the whole batch. Now the
+records are split into chunks and posted with bounded concurrency:
+
+    report = upload_records(records, BUBBLE_URL)
+    report["sent"], report["skipped"], report["failed"]
+
+- each chunk body is gzip-compressed (Content-Encoding: gzip). If the
+  endpoint answers 415, the upload falls back to plain JSON.
+- each upload is a run with its own id. Each chunk carries an
+  Idempotency-Key header: a hash of the run id and the chunk's JSON. A
+  retried or resumed chunk therefore has the same key. The same records sent
+  in a later run get new keys, so a record reverted to an earlier version is
+  still delivered.
+- connection errors, timeouts, 429 and 5xx are retried with exponential
+  backoff and jitter, honouring Retry-After. Other 4xx fail at once.
+- each acknowledged chunk is recorded against its run in an ack ledger
+  (CACHE_DIR/bubble_sync.sqlite3). If an upload fails or is stopped,
+  running the same records again resumes that run and skips its
+  acknowledged chunks. A run that completes is cleared, and unfinished runs
+  expire after BUBBLE_ACK_TTL_HOURS. Pass resend=True to start a fresh run.
+  on_sent is only called for chunks posted by the current call.
+
+bubble_stub.py serves a local stand-in for the endpoint to test against.
+
+Settings (environment):
+    BUBBLE_CHUNK_ROWS    records per request (default 200)
+    BUBBLE_CONCURRENCY   concurrent requests (default 4)
+    BUBBLE_RETRIES       retries per chunk (default 4)
+    BUBBLE_BACKOFF       first retry delay in seconds; doubles each time (default 1.0)
+    BUBBLE_TIMEOUT       per-request timeout in seconds (default 60)
+    BUBBLE_GZIP          "0" sends uncompressed JSON (default "1")
+    BUBBLE_ACK_TTL_HOURS how long an unfinished upload can be resumed (default 72)
+"""
+
+import gzip
+import hashlib
+import json
+import logging
+import os
+import random
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from requests.exceptions import RequestException
+
+from config import CACHE_DIR
+from http_client import api_session
+from politeness import parse_retry_after
+
+logger = logging.getLogger(__name__)
+
+BUBBLE_CHUNK_ROWS = int(os.getenv("BUBBLE_CHUNK_ROWS", "200"))
+BUBBLE_CONCURRENCY = int(os.getenv("BUBBLE_CONCURRENCY", "4"))
+BUBBLE_RETRIES = int(os.getenv("BUBBLE_RETRIES", "4"))
+BUBBLE_BACKOFF = float(os.getenv("BUBBLE_BACKOFF", "1.0"))
+BUBBLE_TIMEOUT = float(os.getenv("BUBBLE_TIMEOUT", "60"))
+BUBBLE_GZIP = os.getenv("BUBBLE_GZIP", "1") == "1"
+BUBBLE_ACK_TTL = float(os.getenv("BUBBLE_ACK_TTL_HOURS", "72")) * 3600
+
+RETRY_STATUSES = {408, 429, 500, 502, 503, 504}
+MAX_BACKOFF = 60.0
+
+
+def encode_chunk(records):
+    """Canonical JSON for a chunk, so identical chunks hash identically."""
+    return json.dumps(records, sort_keys=True, ensure_ascii=False, default=str).encode("utf-8")
+
+
+def idempotency_key(run, body):
+    return hashlib.sha256(run.encode("utf-8") + b"\n" + body).hexdigest()
+
+
+def upload_digest(url, bodies):
+    """Identifies an upload by target and content, to find an unfinished run to resume."""
+    digest = hashlib.sha256(url.encode("utf-8"))
+    for body in bodies:
+        digest.update(hashlib.sha256(body).digest())
+    return digest.hexdigest()
+
+
+def chunked(records, size):
+    for start in range(0, len(records), size):
+        yield records[start:start + size]
+
+
+class AckLedger:
+    """Unfinished upload runs and their acknowledged chunks, in SQLite (WAL mode)."""
+
+    def __init__(self, path=None, ttl=BUBBLE_ACK_TTL):
+        self.path = path or os.path.join(CACHE_DIR, "bubble_sync.sqlite3")
+        self.ttl = ttl
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        with self.connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS upload_runs ("
+                " digest TEXT PRIMARY KEY, run TEXT, url TEXT, started REAL)"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS chunk_acks ("
+                " key TEXT PRIMARY KEY, url TEXT, rows INTEGER, status INTEGER, acked REAL)"
+            )
+            if "run" not in {row[1] for row in conn.execute("PRAGMA table_info(chunk_acks)")}:
+                conn.execute("ALTER TABLE chunk_acks ADD COLUMN run TEXT")
+            # Acks from before runs existed cannot be tied to one
+            conn.execute("DELETE FROM chunk_acks WHERE run IS NULL")
+        self.expire()
+
+    def connect(self):
+        return sqlite3.connect(self.path, timeout=30)
+
+    def acked(self, keys):
+        keys = list(keys)
+        found = set()
+        with self.connect() as conn:
+            for start in range(0, len(keys), 500):
+                batch = keys[start:start + 500]
+                marks = ",".join("?" * len(batch))
+                found.update(k for (k,) in conn.execute(f"SELECT key FROM chunk_acks WHERE key IN ({marks})", batch))
+        return found
+
+    def record(self, key, url, rows, status, run):
+        with self.connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO chunk_acks (key, url, rows, status, acked, run) VALUES (?, ?, ?, ?, ?, ?)",
+                (key, url, rows, status, time.time(), run),
+            )
+
+    def start(self, digest, url, fresh=False):
+        """Run id for an upload: the unfinished run with this digest, or a new one."""
+        with self.connect() as conn:
+            row = conn.execute("SELECT run FROM upload_runs WHERE digest = ?", (digest,)).fetchone()
+            if row is not None and not fresh:
+                return row[0]
+            if row is not None:
+                conn.execute("DELETE FROM chunk_acks WHERE run = ?", (row[0],))
+            run = uuid.uuid4().hex
+            conn.execute("INSERT OR REPLACE INTO upload_runs (digest, run, url, started) VALUES (?, ?, ?, ?)",
+                         (digest, run, url, time.time()))
+            return run
+
+    def finish(self, run):
+        """A completed run has nothing to resume."""
+        with self.connect() as conn:
+            conn.execute("DELETE FROM chunk_acks WHERE run = ?", (run,))
+            conn.execute("DELETE FROM upload_runs WHERE run = ?", (run,))
+
+    def expire(self):
+        cutoff = time.time() - self.ttl
+        with self.connect() as conn:
+            stale = [run for (run,) in conn.execute("SELECT run FROM upload_runs WHERE started < ?", (cutoff,))]
+            conn.executemany("DELETE FROM chunk_acks WHERE run = ?", [(run,) for run in stale])
+            conn.execute("DELETE FROM upload_runs WHERE started < ?", (cutoff,))
+
+    def forget(self, url=None):
+        """Drop unfinished runs (for one URL, or all), so their chunks are sent again."""
+        with self.connect() as conn:
+            if url:
+                conn.execute("DELETE FROM chunk_acks WHERE url = ?", (url,))
+                conn.execute("DELETE FROM upload_runs WHERE url = ?", (url,))
+            else:
+                conn.execute("DELETE FROM chunk_acks")
+                conn.execute("DELETE FROM upload_runs")
+
+
+class BubbleUploader:
+    def __init__(self, ledger=None, session=None, chunk_rows=BUBBLE_CHUNK_ROWS,
+                 concurrency=BUBBLE_CONCURRENCY, retries=BUBBLE_RETRIES,
+                 backoff=BUBBLE_BACKOFF, timeout=BUBBLE_TIMEOUT, use_gzip=BUBBLE_GZIP):
+        self.ledger = ledger or AckLedger()
+        self.session = session
+        self.chunk_rows = max(1, chunk_rows)
+        self.concurrency = max(1, concurrency)
+        self.retries = retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.use_gzip = use_gzip
+
+    def delay(self, attempt, retry_after=None):
+        if retry_after is not None:
+            return min(retry_after, MAX_BACKOFF)
+        return min(self.backoff * 2 ** attempt, MAX_BACKOFF) * random.uniform(0.5, 1.0)
+
+    def post(self, url, key, body):
+        """POST one chunk with retries; returns (status or None, error or None)."""
+        session = self.session or api_session()
+        status, error = None, None
+        for attempt in range(self.retries + 1):
+            compressed = self.use_gzip
+            headers = {"Content-Type": "application/json", "Idempotency-Key": key}
+            if compressed:
+                headers["Content-Encoding"] = "gzip"
+            data = gzip.compress(body) if compressed else body
+            retry_after = None
+            try:
+                resp = session.post(url, data=data, headers=headers, timeout=self.timeout)
+            except RequestException as e:
+                status, error = None, str(e)
+            else:
+                status = resp.status_code
+                if status < 300:
+                    return status, None
+                error = f"{status}: {resp.text[:200]}"
+                if status == 415 and compressed:
+                    logger.info("Bubble endpoint rejected gzip bodies; sending plain JSON")
+                    self.use_gzip = False
+                    continue
+                if status not in RETRY_STATUSES:
+                    return status, error
+                retry_after = parse_retry_after(resp.headers.get("Retry-After"))
+            if attempt < self.retries:
+                time.sleep(self.delay(attempt, retry_after))
+        return status, error
+
+    def upload(self, records, url, resend=False, stop_event=None, on_sent=None):
+        """
+        Post records to url in chunks. Returns a report with chunk counts
+        (chunks, sent, skipped, failed), rows sent, bytes and error messages.
+        Chunks acknowledged by an earlier, unfinished attempt at the same
+        upload are skipped. on_sent(rows) is called with the records of each
+        chunk this call posted successfully, never for skipped chunks.
+        """
+        batches = [(rows, encode_chunk(rows)) for rows in chunked(list(records), self.chunk_rows)]
+        run = self.ledger.start(upload_digest(url, [body for _, body in batches]), url, fresh=resend)
+        chunks = [(idempotency_key(run, body), rows, body) for rows, body in batches]
+        done = self.ledger.acked(key for key, _, _ in chunks)
+
+        report = {"chunks": len(chunks), "sent": 0, "skipped": 0, "failed": 0,
+                  "rows": 0, "bytes": 0, "errors": []}
+        lock = threading.Lock()
+
+        def send(chunk):
+            key, rows, body = chunk
+            if stop_event is not None and stop_event.is_set():
+                return
+            status, error = self.post(url, key, body)
+            with lock:
+                if error is None:
+                    self.ledger.record(key, url, len(rows), status, run)
+                    if on_sent is not None:
+                        on_sent(rows)
+                    report["sent"] += 1
+                    report["rows"] += len(rows)
+                    report["bytes"] += len(body)
+                else:
+                    report["failed"] += 1
+                    report["errors"].append(error)
+
+        pending = [c for c in chunks if c[0] not in done]
+        report["skipped"] = len(chunks) - len(pending)
+        with ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+            list(pool.map(send, pending))
+        if report["failed"]:
+            logger.warning(f"Bubble upload to {url}: {report['failed']} of {len(chunks)} chunks failed")
+        elif report["sent"] + report["skipped"] == len(chunks):
+            self.ledger.finish(run)
+        return report
+
+
+_uploader = None
+_uploader_lock = threading.Lock()
+
+
+def get_bubble_uploader():
+    global _uploader
+    with _uploader_lock:
+        if _uploader is None:
+            _uploader = BubbleUploader()
+        return _uploader
+
+
+def set_bubble_uploader(uploader):
+    """Swap the process-wide uploader (e.g. one pointed at bubble_stub)."""
+    global _uploader
+    with _uploader_lock:
+        _uploader = uploader
+
+
+def upload_records(records, url, resend=False, stop_event=None, on_sent=None):
+    return get_bubble_uploader().upload(records, url, resend=resend, stop_event=stop_event, on_sent=on_sent)
+
+
+def describe_report(report):
+    """(level, message) for an upload report."""
+    summary = (f"{report['sent']} of {report['chunks']} chunks sent ({report['rows']} records)"
+               + (f", {report['skipped']} already acknowledged" if report["skipped"] else ""))
+    if report["failed"]:
+        return "error", (f"Bubble upload incomplete: {summary}, {report['failed']} failed "
+                         f"(last error {report['errors'][-1]}). Send again to resume.")
+    return "success", f"Data successfully sent to Bubble production endpoint: {summary}."
@@ -1,12 +1,32 @@
 # config.py
 import os
 from dotenv import load_dotenv
-import openai
+
+from lazy import lazy_import
 
 load_dotenv()
 
 AZURE_MAPS_KEY = os.getenv("AZURE_MAPS_KEY")
 BING_KEY = os.getenv("BING_KEY")
 OPENAI_KEY = os.getenv("OPENAI_API_KEY")
+# Optional OpenAI-compatible endpoint, e.g. the local stub: http://127.0.0.1:8787/v1
+OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL")
+
+# Local caches and stores (search results, fetch strategies, ...)
+CACHE_DIR = os.getenv("BNT_CACHE_DIR", ".cache")
+
+# Rows processed in parallel; per-site pacing is handled by politeness.py
+SCRAPE_WORKERS = int(os.getenv("SCRAPE_WORKERS", "4"))
+
+
+def configure_openai(module):
+    """Applied when openai is first used (it is imported lazily, see lazy.py)."""
+    # Keep a key/base URL someone set before first use (gpt_stub.point_openai_at)
+    module.api_key = OPENAI_KEY or module.api_key  # Make sure the OpenAI key is set
+    if OPENAI_BASE_URL:
+        module.base_url = OPENAI_BASE_URL.rstrip("/") + "/"
+        # gpt_stub.py ignores credentials, but the client refuses to start without one
+        module.api_key = module.api_key or "stub"
+
 
-openai.api_key = OPENAI_KEY  # Make sure the OpenAI key is set
+openai = lazy_import("openai", on_load=configure_openai)
@@ -2,8 +2,29 @@
 """
 This module provides a list of countries and their ISO Alpha-2 codes.
 You can import and use them for dropdowns, lookups, etc.
+
+Lookups go through COUNTRY_INDEX, built once at import: normalized names,
+common variants ("UK", "USA", "Holland", "Ivory Coast", ...), alpha2 and
+alpha3 codes all map to the alpha2 code, so a lookup is one dict access.
+Values that miss the index fall back to the closest known name
+(difflib); results are cached, so repeated values stay O(1).
+
+    get_country_code("U.K.")          # "GB"
+    get_country_code("Untied States") # "US" (fuzzy)
+    fix_country_code(row)             # Country code for a results row
+
+Settings (environment):
+    COUNTRY_FUZZY_CUTOFF   similarity (0-1) a fuzzy match needs (default 0.85)
 """
 
+import difflib
+import os
+import re
+import unicodedata
+from functools import lru_cache
+
+COUNTRY_FUZZY_CUTOFF = float(os.getenv("COUNTRY_FUZZY_CUTOFF", "0.85"))
+
 COUNTRY_DATA = [
     {"name": "Afghanistan", "alpha2": "AF"},
     {"name": "Albania", "alpha2": "AL"},
@@ -201,13 +222,146 @@ COUNTRY_DATA = [
     {"name": "Zimbabwe", "alpha2": "ZW"}
 ]
 
-def get_country_code(country_name: str) -> str:
+
+ALPHA3 = {
+    "AF": "AFG", "AL": "ALB", "DZ": "DZA", "AD": "AND", "AO": "AGO", "AG": "ATG", "AR": "ARG", "AM": "ARM",
+    "AU": "AUS", "AT": "AUT", "AZ": "AZE", "BS": "BHS", "BH": "BHR", "BD": "BGD", "BB": "BRB", "BY": "BLR",
+    "BE": "BEL", "BZ": "BLZ", "BJ": "BEN", "BT": "BTN", "BO": "BOL", "BA": "BIH", "BW": "BWA", "BR": "BRA",
+    "BN": "BRN", "BG": "BGR", "BF": "BFA", "BI": "BDI", "CI": "CIV", "CV": "CPV", "KH": "KHM", "CM": "CMR",
+    "CA": "CAN", "CF": "CAF", "TD": "TCD", "CL": "CHL", "CN": "CHN", "CO": "COL", "KM": "COM", "CD": "COD",
+    "CG": "COG", "CR": "CRI", "HR": "HRV", "CU": "CUB", "CY": "CYP", "CZ": "CZE", "DK": "DNK", "DJ": "DJI",
+    "DM": "DMA", "DO": "DOM", "EC": "ECU", "EG": "EGY", "SV": "SLV", "GQ": "GNQ", "ER": "ERI", "EE": "EST",
+    "SZ": "SWZ", "ET": "ETH", "FJ": "FJI", "FI": "FIN", "FR": "FRA", "GA": "GAB", "GM": "GMB", "GE": "GEO",
+    "DE": "DEU", "GH": "GHA", "GR": "GRC", "GD": "GRD", "GT": "GTM", "GN": "GIN", "GW": "GNB", "GY": "GUY",
+    "HT": "HTI", "HN": "HND", "HU": "HUN", "IS": "ISL", "IN": "IND", "ID": "IDN", "IR": "IRN", "IQ": "IRQ",
+    "IE": "IRL", "IL": "ISR", "IT": "ITA", "JM": "JAM", "JP": "JPN", "JO": "JOR", "KZ": "KAZ", "KE": "KEN",
+    "KI": "KIR", "KP": "PRK", "KR": "KOR", "XK": "XKX", "KW": "KWT", "KG": "KGZ", "LA": "LAO", "LV": "LVA",
+    "LB": "LBN", "LS": "LSO", "LR": "LBR", "LY": "LBY", "LI": "LIE", "LT": "LTU", "LU": "LUX", "MK": "MKD",
+    "MG": "MDG", "MW": "MWI", "MY": "MYS", "MV": "MDV", "ML": "MLI", "MT": "MLT", "MH": "MHL", "MR": "MRT",
+    "MU": "MUS", "MX": "MEX", "MD": "MDA", "MC": "MCO", "MN": "MNG", "ME": "MNE", "MA": "MAR", "MZ": "MOZ",
+    "MM": "MMR", "NA": "NAM", "NR": "NRU", "NP": "NPL", "NL": "NLD", "NZ": "NZL", "NI": "NIC", "NE": "NER",
+    "NG": "NGA", "NO": "NOR", "OM": "OMN", "PK": "PAK", "PW": "PLW", "PA": "PAN", "PG": "PNG", "PY": "PRY",
+    "PE": "PER", "PH": "PHL", "PL": "POL", "PT": "PRT", "QA": "QAT", "RO": "ROU", "RU": "RUS", "RW": "RWA",
+    "KN": "KNA", "LC": "LCA", "VC": "VCT", "WS": "WSM", "SM": "SMR", "ST": "STP", "SA": "SAU", "SN": "SEN",
+    "RS": "SRB", "SC": "SYC", "SL": "SLE", "SG": "SGP", "SK": "SVK", "SI": "SVN", "SB": "SLB", "SO": "SOM",
+    "ZA": "ZAF", "SS": "SSD", "ES": "ESP", "LK": "LKA", "SD": "SDN", "SR": "SUR", "SE": "SWE", "CH": "CHE",
+    "SY": "SYR", "TW": "TWN", "TJ": "TJK", "TZ": "TZA", "TH": "THA", "TL": "TLS", "TG": "TGO", "TO": "TON",
+    "TT": "TTO", "TN": "TUN", "TR": "TUR", "TM": "TKM", "TV": "TUV", "UG": "UGA", "UA": "UKR", "AE": "ARE",
+    "GB": "GBR", "US": "USA", "UY": "URY", "UZ": "UZB", "VU": "VUT", "VE": "VEN", "VN": "VNM", "YE": "YEM",
+    "ZM": "ZMB", "ZW": "ZWE",
+}
+
+# Variants people (and GPT) write instead of the names above
+COUNTRY_ALIASES = {
+    "GB": ["UK", "Great Britain", "Britain", "England", "Scotland", "Wales", "Northern Ireland",
+           "United Kingdom of Great Britain and Northern Ireland"],
+    "US": ["USA", "America", "United States of America"],
+    "AE": ["UAE", "Emirates"],
+    "NL": ["Holland", "The Netherlands"],
+    "KR": ["South Korea", "Republic of Korea", "Korea, Republic of"],
+    "KP": ["North Korea"],
+    "RU": ["Russian Federation"],
+    "CZ": ["Czechia"],
+    "CI": ["Ivory Coast", "Cote d'Ivoire"],
+    "CD": ["DR Congo", "DRC", "Democratic Republic of the Congo", "Congo-Kinshasa"],
+    "CG": ["Congo", "Republic of the Congo", "Congo-Brazzaville"],
+    "MM": ["Myanmar", "Burma"],
+    "CV": ["Cape Verde"],
+    "SZ": ["Swaziland"],
+    "MK": ["Macedonia"],
+    "KN": ["Saint Kitts and Nevis"],
+    "LC": ["Saint Lucia"],
+    "VC": ["Saint Vincent and the Grenadines"],
+    "TL": ["East Timor"],
+    "TR": ["Turkiye"],
+    "BN": ["Brunei"],
+    "LA": ["Lao PDR"],
+    "SY": ["Syrian Arab Republic"],
+    "VN": ["Viet Nam"],
+    "IR": ["Iran, Islamic Republic of"],
+    "MD": ["Republic of Moldova"],
+    "TZ": ["United Republic of Tanzania"],
+    "IE": ["Republic of Ireland", "Eire"],
+    "DE": ["Deutschland"],
+    "ES": ["Espana"],
+    "CH": ["Schweiz", "Suisse"],
+}
+
+_NON_ALNUM = re.compile(r"[^a-z0-9]+")
+_DOTTED = re.compile(r"(?<=\b[a-z])\.")
+
+
+def normalize_country(value) -> str:
+    """Index key for a country string: no accents, case, punctuation or leading "the"."""
+    text = unicodedata.normalize("NFKD", str(value or "")).encode("ascii", "ignore").decode().lower()
+    text = _DOTTED.sub("", text.replace("&", " and "))  # "U.S.A." -> "usa"
+    words = _NON_ALNUM.sub(" ", text).split()
+    if words[:1] == ["the"]:
+        words = words[1:]
+    return " ".join("st" if w == "saint" else w for w in words)
+
+
+def _build_index():
+    index = {}
+    for entry in COUNTRY_DATA:
+        code = entry["alpha2"]
+        index[normalize_country(code)] = code
+        index[normalize_country(ALPHA3[code])] = code
+    # Names win over codes that happen to spell the same thing
+    for entry in COUNTRY_DATA:
+        index[normalize_country(entry["name"])] = entry["alpha2"]
+    for code, aliases in COUNTRY_ALIASES.items():
+        for alias in aliases:
+            index[normalize_country(alias)] = code
+    return index
+
+
+COUNTRY_INDEX = _build_index()
+COUNTRY_NAMES = {entry["alpha2"]: entry["name"] for entry in COUNTRY_DATA}
+# Fuzzy matching only considers names and aliases; short codes match too easily
+_FUZZY_KEYS = [key for key in COUNTRY_INDEX if len(key) > 3]
+
+
+@lru_cache(maxsize=4096)
+def lookup_country(value, fuzzy=True) -> str:
+    """Alpha2 code for a country name, variant or code; "" when nothing matches."""
+    key = normalize_country(value)
+    code = COUNTRY_INDEX.get(key)
+    if code or not fuzzy or len(key) <= 3:
+        return code or ""
+    match = difflib.get_close_matches(key, _FUZZY_KEYS, n=1, cutoff=COUNTRY_FUZZY_CUTOFF)
+    return COUNTRY_INDEX[match[0]] if match else ""
+
+
+def get_country_code(country_name: str, fuzzy: bool = True) -> str:
     """
     Given a country name, returns the 2-letter ISO alpha2 code (like 'US' or 'GB').
-    Returns an empty string if not found in the list.
+    Common variants, alpha2/alpha3 codes and (with fuzzy) near-misspellings are
+    accepted. Returns an empty string if not found.
     """
-    # Basic approach: look for exact match in the dictionary
-    for entry in COUNTRY_DATA:
-        if entry["name"].lower().strip() == country_name.lower().strip():
-            return entry["alpha2"]
-    return ""  # Fallback if not found
+    return lookup_country(str(country_name or ""), fuzzy)
+
+
+def country_name(code: str) -> str:
+    """Display name for an alpha2 code (or any value get_country_code accepts)."""
+    return COUNTRY_NAMES.get(get_country_code(code, fuzzy=False), "")
+
+
+def alpha3(code: str) -> str:
+    return ALPHA3.get(get_country_code(code, fuzzy=False), "")
+
+
+def _text(value):
+    return "" if value is None or value != value else str(value).strip()  # None/NaN -> ""
+
+
+def fix_country_code(row):
+    """
+    If 'Country code' is missing or incorrect in a row, attempts to fix it based on the 'Country' field.
+    A recognised code is kept ("UK" and alpha3 codes become their alpha2 code).
+    """
+    ccode_str = _text(row.get("Country code")).upper()
+    code = COUNTRY_INDEX.get(normalize_country(ccode_str)) if ccode_str else None
+    if code:
+        return code
+    return lookup_country(_text(row.get("Country"))) or ccode_str
@@ -0,0 +1,248 @@
+# dns_cache.py
+"""
+DNS stage for the row pipeline.
+
+1. A TTL cache in front of socket.getaddrinfo (install()), so the many
+   connections made per site resolve each host once.
+2. precheck(domains): resolve every input domain up front, concurrently,
+   with asyncio. Domains where neither "example.com" nor "www.example.com"
+   exists (NXDOMAIN) are reported dead, so the engine can skip them instead
+   of walking every URL variant, cloudscraper and the proxy.
+
+dnspython's async resolver is used when it is installed (it tells NXDOMAIN
+apart from timeouts reliably); otherwise loop.getaddrinfo is used.
+Timeouts and server failures are never treated as dead, only as "error".
+
+Settings (environment):
+    DNS_CACHE              "0" to leave socket.getaddrinfo alone (default on)
+    DNS_CACHE_TTL          seconds to keep a successful lookup (default 300)
+    DNS_NEGATIVE_TTL       seconds to keep a failed lookup (default 60)
+    DNS_PRECHECK_TIMEOUT   per-lookup timeout in seconds (default 5)
+    DNS_CONCURRENCY        lookups in flight during precheck (default 50)
+"""
+
+import asyncio
+import logging
+import os
+import socket
+import threading
+import time
+from urllib.parse import urlsplit
+
+try:
+    import dns.asyncresolver
+    import dns.exception
+    import dns.resolver
+except ImportError:  # optional; fall back to the system resolver
+    dns = None
+
+logger = logging.getLogger(__name__)
+
+DNS_CACHE_ENABLED = os.getenv("DNS_CACHE", "1") != "0"
+DNS_CACHE_TTL = float(os.getenv("DNS_CACHE_TTL", "300"))
+DNS_NEGATIVE_TTL = float(os.getenv("DNS_NEGATIVE_TTL", "60"))
+DNS_PRECHECK_TIMEOUT = float(os.getenv("DNS_PRECHECK_TIMEOUT", "5"))
+DNS_CONCURRENCY = int(os.getenv("DNS_CONCURRENCY", "50"))
+
+OK, NXDOMAIN, ERROR = "ok", "nxdomain", "error"
+DEAD_DOMAIN_ERROR = "DNS: domain does not resolve"
+
+# getaddrinfo error codes that mean "this name does not exist"
+_NONAME_ERRNOS = {socket.EAI_NONAME, getattr(socket, "EAI_NODATA", socket.EAI_NONAME)}
+
+_original_getaddrinfo = socket.getaddrinfo
+
+
+def bare_domain(url):
+    """Hostname of a URL or bare domain, without a leading www."""
+    url = str(url or "").strip()
+    if "://" not in url:
+        url = "http://" + url
+    try:
+        host = (urlsplit(url).hostname or "").lower().rstrip(".")
+    except ValueError:
+        return ""
+    return host[4:] if host.startswith("www.") else host
+
+
+class DNSCache:
+    """
+    getaddrinfo results keyed by (host, family, type, proto, flags). The port
+    is patched into cached addresses on the way out, so lookups for :80 and
+    :443 share an entry. Failures are cached (shorter) as the original error.
+    """
+
+    def __init__(self, ttl=DNS_CACHE_TTL, negative_ttl=DNS_NEGATIVE_TTL):
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.entries = {}
+        self.lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0}
+
+    @staticmethod
+    def key(host, family=0, type=0, proto=0, flags=0):
+        return (str(host).lower(), int(family), int(type), int(proto), int(flags))
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None and key[1]:
+                # An unspecified-family entry can answer a specific family
+                entry = self.entries.get((key[0], 0) + key[2:])
+                if entry and not isinstance(entry[1], Exception):
+                    entry = (entry[0], [a for a in entry[1] if a[0] == key[1]])
+            if entry is None or entry[0] < time.monotonic():
+                self.stats["misses"] += 1
+                return None
+            self.stats["hits"] += 1
+            return entry[1]
+
+    def put(self, key, value):
+        ttl = self.negative_ttl if isinstance(value, Exception) else self.ttl
+        with self.lock:
+            self.entries[key] = (time.monotonic() + ttl, value)
+
+    def getaddrinfo(self, host, port, family=0, type=0, proto=0, flags=0):
+        # Only plain hostnames with numeric ports are cached
+        if not isinstance(host, str) or not (port is None or isinstance(port, int)):
+            return _original_getaddrinfo(host, port, family, type, proto, flags)
+        key = self.key(host, family, type, proto, flags)
+        cached = self.get(key)
+        if cached is None:
+            try:
+                cached = _original_getaddrinfo(host, port, family, type, proto, flags)
+            except socket.gaierror as e:
+                if e.errno in _NONAME_ERRNOS:
+                    self.put(key, e)
+                raise
+            self.put(key, cached)
+        if isinstance(cached, Exception):
+            raise cached
+        return [with_port(info, port) for info in cached]
+
+
+def with_port(info, port):
+    family, type_, proto, canonname, sockaddr = info
+    if port is None:
+        return info
+    return (family, type_, proto, canonname, (sockaddr[0], port) + tuple(sockaddr[2:]))
+
+
+_cache = DNSCache()
+_installed = False
+_install_lock = threading.Lock()
+_resolver = None
+
+
+def get_dns_cache():
+    return _cache
+
+
+def install():
+    """Route socket.getaddrinfo through the cache (idempotent)."""
+    global _installed
+    with _install_lock:
+        if _installed or not DNS_CACHE_ENABLED:
+            return
+        socket.getaddrinfo = _cache.getaddrinfo
+        _installed = True
+
+
+def uninstall():
+    global _installed
+    with _install_lock:
+        socket.getaddrinfo = _original_getaddrinfo
+        _installed = False
+
+
+def set_resolver(resolver):
+    """
+    Replace the precheck resolver: an async callable host -> OK/NXDOMAIN/ERROR.
+    The benchmark uses this so its corpus defines which domains exist.
+    """
+    global _resolver
+    _resolver = resolver
+
+
+async def resolve_with_dnspython(host, timeout):
+    resolver = dns.asyncresolver.Resolver()
+    resolver.lifetime = timeout
+    try:
+        await resolver.resolve(host, "A")
+        return OK
+    except dns.resolver.NXDOMAIN:
+        return NXDOMAIN
+    except dns.resolver.NoAnswer:
+        return OK  # the name exists, just without an A record
+    except (dns.exception.Timeout, dns.resolver.NoNameservers):
+        return ERROR
+
+
+async def resolve_with_system(host, timeout):
+    loop = asyncio.get_running_loop()
+    try:
+        infos = await asyncio.wait_for(
+            loop.getaddrinfo(host, 443, type=socket.SOCK_STREAM), timeout)
+    except asyncio.TimeoutError:
+        return ERROR
+    except socket.gaierror as e:
+        if e.errno in _NONAME_ERRNOS:
+            _cache.put(_cache.key(host, 0, socket.SOCK_STREAM), e)
+            return NXDOMAIN
+        return ERROR
+    # Warm the cache for the connections that follow
+    _cache.put(_cache.key(host, 0, socket.SOCK_STREAM), infos)
+    return OK
+
+
+async def resolve_host(host, timeout=DNS_PRECHECK_TIMEOUT):
+    if _resolver is not None:
+        return await _resolver(host)
+    if dns is not None:
+        return await resolve_with_dnspython(host, timeout)
+    return await resolve_with_system(host, timeout)
+
+
+async def precheck_async(domains, concurrency=DNS_CONCURRENCY, timeout=DNS_PRECHECK_TIMEOUT):
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(host):
+        async with semaphore:
+            try:
+                return host, await resolve_host(host, timeout)
+            except Exception as e:
+                logger.debug(f"DNS precheck failed for {host}: {e}")
+                return host, ERROR
+
+    hosts = sorted({h for d in domains if d for h in (d, f"www.{d}")})
+    return dict(await asyncio.gather(*(one(h) for h in hosts)))
+
+
+def precheck(domains, concurrency=DNS_CONCURRENCY, timeout=DNS_PRECHECK_TIMEOUT):
+    """
+    Resolve bare domains (and their www. variants) concurrently.
+    Returns {domain: OK | NXDOMAIN | ERROR}; a domain is NXDOMAIN only when
+    both names are.
+    """
+    domains = {bare_domain(d) for d in domains} - {""}
+    if not domains:
+        return {}
+    started = time.perf_counter()
+    results = asyncio.run(precheck_async(domains, concurrency, timeout))
+    out = {}
+    for domain in domains:
+        pair = (results.get(domain), results.get(f"www.{domain}"))
+        if OK in pair:
+            out[domain] = OK
+        elif pair == (NXDOMAIN, NXDOMAIN):
+            out[domain] = NXDOMAIN
+        else:
+            out[domain] = ERROR
+    dead = sum(1 for v in out.values() if v == NXDOMAIN)
+    if dead == len(out) and dead >= 3:
+        # Every name "missing" looks like a broken resolver, not dead sites
+        logger.warning("DNS precheck: every domain failed to resolve; not skipping any")
+        out = dict.fromkeys(out, ERROR)
+        dead = 0
+    logger.info(f"DNS precheck: {len(out)} domains, {dead} dead, {time.perf_counter() - started:.2f}s")
+    return out
@@ -6,21 +6,12 @@ import os
 import logging
 from urllib.parse import quote
 
-# Selenium imports
-from selenium import webdriver
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.common.exceptions import TimeoutException, WebDriverException
-from webdriver_manager.chrome import ChromeDriverManager
-
-# User agent rotation
-from fake_useragent import UserAgent
-
 # Custom regex functions
-from regex import get_postcode_regex, get_phone_regex, get_patterns_for_country
+from regex import get_patterns_for_country
+
+import search_client
+import search_cache
+from politeness import polite
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -28,6 +19,12 @@ logger = logging.getLogger(__name__)
 
 def initialize_driver():
     """Initialize Chrome driver with Streamlit cloud compatibility"""
+    # Browser-only dependencies, imported here so the HTTP search path doesn't load them
+    from fake_useragent import UserAgent
+    from selenium import webdriver
+    from selenium.webdriver.chrome.options import Options
+    from selenium.webdriver.chrome.service import Service
+    from webdriver_manager.chrome import ChromeDriverManager
     ua = UserAgent()
     chrome_options = Options()
     chrome_options.add_argument(f'user-agent={ua.random}')
@@ -72,13 +69,42 @@ def initialize_driver():
 
 def extract_address_from_results(driver):
     """Extract address information from DuckDuckGo search results"""
+    from selenium.webdriver.common.by import By
     results = driver.find_elements(By.CLASS_NAME, "result__body")
     text = "\n".join(result.text for result in results)
     return text
 
-def get_address_from_duckduckgo(business_name, country="United Kingdom"):
-    # Add random delay between requests
-    time.sleep(random.uniform(2, 5))
+def get_address_from_duckduckgo(business_name, country="United Kingdom", session=None):
+    """
+    Returns the raw text of the search results for the business (title,
+    snippet and URL per result), or None if nothing was found.
+    Uses the HTTP-only search client behind the persistent search cache;
+    the browser is an opt-in fallback.
+    """
+    search_query = f"{business_name} {country} address contact"
+    logger.info(f"Starting DuckDuckGo search for: {business_name}")
+    try:
+        results = search_cache.cached_search(search_query, session=session)
+    except Exception as e:
+        logger.error(f"Error in DuckDuckGo search: {str(e)}")
+        results = []
+
+    if results:
+        return search_client.results_to_text(results)
+
+    if search_client.SEARCH_BROWSER_FALLBACK:
+        logger.info("HTTP search returned nothing; falling back to the browser")
+        return get_address_from_duckduckgo_browser(business_name, country)
+
+    logger.warning("No address found in results")
+    return None
+
+def get_address_from_duckduckgo_browser(business_name, country="United Kingdom"):
+    """Selenium fallback: slow (boots Chrome), only used when SEARCH_BROWSER_FALLBACK=1"""
+    from selenium.common.exceptions import TimeoutException
+    from selenium.webdriver.common.by import By
+    from selenium.webdriver.support import expected_conditions as EC
+    from selenium.webdriver.support.ui import WebDriverWait
     driver = None
     try:
         logger.info(f"Starting DuckDuckGo search for: {business_name}")
@@ -92,7 +118,8 @@ def get_address_from_duckduckgo(business_name, country="United Kingdom"):
         url = f"https://duckduckgo.com/?q={quote(search_query)}"
         
         logger.info(f"Navigating to: {url}")
-        driver.get(url)
+        with polite(url):
+            driver.get(url)
         
         # Wait for results with explicit logging
         try:
@@ -105,15 +132,10 @@ def get_address_from_duckduckgo(business_name, country="United Kingdom"):
         # Extract and validate address
         address_data = extract_address_from_results(driver)
         
-        if not address_data:
+        if not address_data.strip():
             logger.warning("No address found in results")
             return None
             
-        # Validate extracted data
-        if not any(address_data.values()):
-            logger.warning("Address extracted but all fields are empty")
-            return None
-            
         logger.info(f"Successfully found address: {address_data}")
         return address_data
         
@@ -138,27 +160,20 @@ def extract_companies_house_data(text):
         return addr_text
     return None
 
-def get_address_and_phone_from_duckduckgo(name, country_selected):
+def get_address_and_phone_from_duckduckgo(name, country_selected, session=None):
     """Returns data in a format compatible with main processing"""
-    address_text = get_address_from_duckduckgo(name)
+    address_text = get_address_from_duckduckgo(name, country_selected, session=session)
     if not address_text:
         return {}, []
     
-    # Get patterns from regex.py
-    from regex import get_patterns_for_country
+    # Compiled patterns from the registry in regex.py
     patterns = get_patterns_for_country(country_selected)
-    postcode_pattern = patterns["postcode"]
-    phone_pattern = patterns["phone"]
     
     # First try Companies House format
     companies_house_addr = extract_companies_house_data(address_text)
     if companies_house_addr:
         address_lines = [line.strip() for line in companies_house_addr.split(',')]
-        postcode = ""
-        if postcode_pattern:
-            postcode_match = re.search(postcode_pattern, companies_house_addr)
-            if postcode_match:
-                postcode = postcode_match.group(0).strip()
+        postcode = patterns.find_postcode(companies_house_addr)
         
         address_dict = {
             "Full address": ", ".join(address_lines),
@@ -199,7 +214,7 @@ def get_address_and_phone_from_duckduckgo(name, country_selected):
                     
                 # Add line if it looks like an address component
                 if any(word in next_line.lower() for word in ['street', 'road', 'london', 'uk', 'united kingdom']) or \
-                   (postcode_pattern and re.search(postcode_pattern, next_line)):
+                   patterns.find_postcode(next_line):
                     address_block.append(next_line)
                     line_count += 1
                     if line_count >= 3:  # Stop after collecting 3 address lines
@@ -222,24 +237,14 @@ def get_address_and_phone_from_duckduckgo(name, country_selected):
     }
     
     # Extract postcode if pattern available
-    if postcode_pattern:
-        for line in best_address:
-            postcode_match = re.search(postcode_pattern, line)
-            if postcode_match:
-                address_dict["Post code"] = postcode_match.group(0).strip()
-                break
+    for line in best_address:
+        postcode = patterns.find_postcode(line)
+        if postcode:
+            address_dict["Post code"] = postcode
+            break
     
-    # Extract phones (existing code)
-    phones = []
-    if phone_pattern:
-        phone_matches = re.findall(phone_pattern, address_text)
-        for match in phone_matches:
-            if isinstance(match, tuple):
-                phone = next((p for p in match if p), '')
-            else:
-                phone = match
-            if phone.strip():
-                phones.append(phone.strip())
+    # Extract phones (whole matches; findall returned only the first group)
+    phones = patterns.find_phones(address_text)
     
     print(f"DuckDuckGo found address: {address_dict}")
     print(f"DuckDuckGo found phones: {phones}")
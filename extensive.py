@@ -1,21 +1,21 @@
 import re
-from regex import get_address_patterns
+from regex import get_patterns_for_country as get_country_patterns
+
+ADDRESS_INDICATORS = {
+    "GB": {
+        "street_indicators": ['street', 'road', 'avenue', 'lane', 'drive', 'way', 'plaza', 'boulevard', 'alley', 'route'],
+        "building_indicators": ['building', 'suite', 'unit', 'floor', 'apt', 'apartment', 'office', 'room', 'house', 'tower', 'center', 'centre']
+    }
+}
 
 def get_patterns_for_country(country_code):
     """Return address patterns for a specific country."""
-    patterns = {
-        "GB": {
-            "street_indicators": ['street', 'road', 'avenue', 'lane', 'drive', 'way', 'plaza', 'boulevard', 'alley', 'route'],
-            "building_indicators": ['building', 'suite', 'unit', 'floor', 'apt', 'apartment', 'office', 'room', 'house', 'tower', 'center', 'centre']
-        }
-    }
-    return patterns.get(country_code, patterns["GB"])
+    return ADDRESS_INDICATORS.get(country_code, ADDRESS_INDICATORS["GB"])
 
 def validate_postcode(postcode, country_code):
-    """Validate postcode format for different countries."""
-    if not postcode:
+    """Validate postcode format for different countries (regex.PATTERN_REGISTRY)."""
+    if not postcode or not get_country_patterns(country_code).is_postcode(postcode):
         return False
-    # Basic validation - can be extended for different country formats
     return postcode.strip()
 
 def is_valid_address(text, postcode, country_code="GB"):
@@ -27,12 +27,7 @@ def is_valid_address(text, postcode, country_code="GB"):
 
     # Get country-specific patterns
     patterns = get_patterns_for_country(country_code)
-    # Get patterns from regex.py
-    patterns = get_address_patterns().get(country_code, get_address_patterns()["GB"])
-    
-    # Get country-specific patterns
-    address_patterns = get_address_patterns()
-    street_indicators = address_patterns[country_code]["street_indicators"]
+    street_indicators = patterns["street_indicators"]
     building_indicators = patterns.get("building_indicators", [
         'building', 'suite', 'unit', 'floor', 'apt', 'apartment',
         'office', 'room', 'house', 'tower', 'center', 'centre'
@@ -1,10 +1,24 @@
 # extraction.py
 
+import os
 import re
-import phonenumbers
+import threading
 from bs4 import BeautifulSoup
-from urllib.parse import urljoin
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from urllib.parse import urljoin, urlsplit, urlunsplit
 import requests
+from http_client import shared_session
+from lazy import lazy_import
+from regex import PATTERN_REGISTRY
+
+phonenumbers = lazy_import("phonenumbers")
+
+# Candidate pages fetched at once per site (the politeness scheduler still paces each host)
+CONTACT_FETCH_WORKERS = int(os.getenv("CONTACT_FETCH_WORKERS", "4"))
+
+UK_PATTERNS = PATTERN_REGISTRY["GB"]
+
+CONTACT_SKIP = ['.jpg', '.png', '.pdf', 'login', 'signup', 'cart']
 
 ###############################
 # URL Helper (used by some functions)
@@ -183,25 +197,17 @@ def find_contact_page_url(soup, base_url):
     if candidates:
         return candidates[0][0]
     
-    # Add fallback paths
-    domain = base_url.rstrip('/')
-    for path in ['/contact-us', '/contact', '/visit', '/directions', '/find-us']:
-        full_url = build_absolute_url(path, base_url)
-        try:
-            r = requests.get(full_url, timeout=5)
-            if r.status_code == 200:
-                return full_url
-        except Exception:
-            continue
-            
-    return None
+    # Add fallback paths (probed concurrently, first in this order wins)
+    fallback_paths = ['/contact-us', '/contact', '/visit', '/directions', '/find-us']
+    return first_live_url([build_absolute_url(path, base_url) for path in fallback_paths])
 
 def find_all_contact_pages(soup, base_url):
     """
     Find all pages that might contain contact/address information.
-    Returns a list of URLs to check.
+    Returns a list of URLs to check, best first: links ranked by how strongly
+    their href/text match the keywords, then the blind fallback paths.
     """
-    contact_pages = set()
+    scores = {}
     contact_keywords = [
         'contact', 'address', 'location', 'directions', 'find-us', 'findus',
         'visit', 'where', 'about', 'info', 'reach'
@@ -213,16 +219,24 @@ def find_all_contact_pages(soup, base_url):
         text = a_tag.get_text(separator=' ', strip=True).lower()
         
         # Skip obvious non-contact pages
-        if any(x in href for x in ['.jpg', '.png', '.pdf', 'login', 'signup', 'cart']):
+        if any(x in href for x in CONTACT_SKIP):
             continue
             
-        # Check both href and text for contact keywords
-        if any(keyword in href or keyword in text for keyword in contact_keywords):
+        # Score both href (3) and text (2) matches; 'contact' counts double
+        score = 0
+        for keyword in contact_keywords:
+            weight = 2 if keyword == 'contact' else 1
+            if keyword in href:
+                score += 3 * weight
+            if keyword in text:
+                score += 2 * weight
+        if score:
             full_url = build_absolute_url(href, base_url)
-            contact_pages.add(full_url)
+            scores[full_url] = max(score, scores.get(full_url, 0))
+    
+    ranked = sorted(scores, key=lambda u: (-scores[u], u))
     
     # Add common fallback paths
-    domain = base_url.rstrip('/')
     fallback_paths = [
         '/contact', '/contact-us', '/directions',
         '/visit', '/find-us', '/location',
@@ -231,12 +245,18 @@ def find_all_contact_pages(soup, base_url):
     ]
     
     for path in fallback_paths:
-        contact_pages.add(build_absolute_url(path, base_url))
+        url = build_absolute_url(path, base_url)
+        if url not in scores:
+            ranked.append(url)
     
-    return sorted(list(contact_pages))
+    return ranked
 
 def scrape_all_contact_pages(session, urls, base_url):
-    """Visit each potential contact page and extract information."""
+    """
+    Visit the potential contact pages (ranked, as from find_all_contact_pages)
+    concurrently. Returns the best-ranked page that contains a UK postcode,
+    otherwise the combined text of every page found.
+    """
     all_text = []
     
     # Special handling for PRS Music
@@ -265,25 +285,106 @@ def scrape_all_contact_pages(session, urls, base_url):
             print(f"Error scraping PRS contact page: {e}")
     
     # Regular scraping for other sites
+    texts = {}
+
+    def page_text(r):
+        if r.url not in texts:
+            texts[r.url] = BeautifulSoup(r.text, 'html.parser').get_text(separator=' ', strip=True)
+        return texts[r.url]
+
+    # If we find what looks like an address, that page wins and the rest are cancelled
+    hit, pages = fetch_ranked(session, urls, accept=lambda r: UK_PATTERNS.has_postcode(page_text(r)))
+    if hit:
+        print(f"Found address in: {hit[0]}")
+        return page_text(hit[1])
+    
+    # Return combined text from all pages if no clear address was found
+    all_text.extend(page_text(r) for _, r in pages)
+    return "\n=====\n".join(all_text)
+
+###############################
+# Concurrent Candidate Fetching
+###############################
+
+def normalize_page_url(url):
+    """Key for deduplicating pages: no fragment, lowercase host, no trailing slash."""
+    parts = urlsplit(url)
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), parts.path.rstrip('/') or '/', parts.query, ''))
+
+def fetch_ranked(session, urls, accept=None, workers=CONTACT_FETCH_WORKERS, timeout=10):
+    """
+    Fetch candidate URLs concurrently, best-ranked first.
+
+    accept(response) decides whether a 200 page is a hit (default: any 200).
+    Returns (hit, pages):
+      hit   - (url, response) for the best-ranked accepted page, or None
+      pages - [(url, response)] for every 200 page fetched, in rank order,
+              with pages that redirected to the same final URL dropped
+    As soon as a page is accepted, lower-ranked fetches that haven't started
+    are cancelled, and we return once every better-ranked page has answered.
+    """
+    seen = set()
+    ranked = []
     for url in urls:
+        key = normalize_page_url(url)
+        if key not in seen:
+            seen.add(key)
+            ranked.append(url)
+    if not ranked:
+        return None, []
+
+    lock = threading.Lock()
+    best = [len(ranked)]  # rank of the best hit so far
+
+    def fetch(rank, url):
+        with lock:
+            if rank > best[0]:
+                return None  # a better page already answered
         try:
             print(f"Checking potential contact page: {url}")
-            r = session.get(url, timeout=10, verify=False)
-            if r.status_code == 200:
-                soup = BeautifulSoup(r.text, 'html.parser')
-                text = soup.get_text(separator=' ', strip=True)
-                all_text.append(text)
-                
-                # If we find what looks like an address, prioritize this page
-                if re.search(r'[A-Z]{1,2}\d[A-Z\d]?\s*\d[A-Z]{2}', text):  # UK postcode
-                    print(f"Found address in: {url}")
-                    return text
+            return session.get(url, timeout=timeout, verify=False)
         except Exception as e:
             print(f"Error scraping {url}: {e}")
+            return None
+
+    pool = ThreadPoolExecutor(max_workers=max(1, min(workers, len(ranked))))
+    futures = {pool.submit(fetch, rank, url): rank for rank, url in enumerate(ranked)}
+    responses = {}
+    try:
+        for future in as_completed(futures):
+            rank = futures[future]
+            r = future.result()
+            if r is not None and r.status_code == 200:
+                responses[rank] = r
+                if rank < best[0] and (accept is None or accept(r)):
+                    with lock:
+                        best[0] = rank
+                    for other, other_rank in futures.items():
+                        if other_rank > rank:
+                            other.cancel()
+            if best[0] < len(ranked) and all(f.done() for f, k in futures.items() if k < best[0]):
+                break
+    finally:
+        # Don't wait for in-flight lower-ranked fetches; they finish in the background
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    pages = []
+    final_urls = set()
+    for rank in sorted(responses):
+        if rank > best[0]:
+            break
+        key = normalize_page_url(responses[rank].url or ranked[rank])
+        if key in final_urls:
             continue
-    
-    # Return combined text from all pages if no clear address was found
-    return "\n=====\n".join(all_text)
+        final_urls.add(key)
+        pages.append((ranked[rank], responses[rank]))
+    hit = (ranked[best[0]], responses[best[0]]) if best[0] < len(ranked) else None
+    return hit, pages
+
+def first_live_url(urls, session=None, timeout=5):
+    """Best-ranked URL that answers 200, probing the candidates concurrently."""
+    hit, _ = fetch_ranked(session or shared_session(), urls, timeout=timeout)
+    return hit[0] if hit else None
 
 ###############################
 # Special and Quick Extraction
@@ -317,12 +418,11 @@ def quick_extract_address(text):
     Fast initial pass to find a multi-line UK address block with context.
     Returns the extracted address string or None if not found.
     """
-    postcode_re = re.compile(r'\b[A-Z]{1,2}\d{1,2}\s?\d[A-Z]{2}\b', re.IGNORECASE)
     street_keywords = [' street', ' road', ' ave', ' avenue', ' lane', ' drive', ' court']
     lines = text.splitlines()
     address_blocks = []
     for i, line in enumerate(lines):
-        if postcode_re.search(line) and any(kw in line.lower() for kw in street_keywords):
+        if UK_PATTERNS.find_postcode(line) and any(kw in line.lower() for kw in street_keywords):
             block = [line.strip()]
             if i > 0 and len(lines[i-1].split()) <= 6:
                 block.insert(0, lines[i-1].strip())
@@ -0,0 +1,142 @@
+# fetch_strategy.py
+"""
+Per-domain memory of which fetch tier worked, persisted across runs.
+
+try_url_variants escalates through tiers, cheapest first:
+
+    requests  ->  cloudscraper  ->  proxy
+
+A site that only answers through the proxy used to pay for every failed
+tier on every run. The store remembers the tier (and URL variant) that
+succeeded and how long it took, and the next run starts there. Every
+FETCH_REPROBE_EVERY uses, or after FETCH_REPROBE_DAYS, the cheaper tiers are
+tried first again in case the site has dropped its protection.
+
+Settings (environment):
+    FETCH_REPROBE_EVERY   re-probe cheaper tiers after this many uses (default 10)
+    FETCH_REPROBE_DAYS    ...or when the record is this old (default 7)
+"""
+
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+from config import CACHE_DIR
+
+logger = logging.getLogger(__name__)
+
+FETCH_REPROBE_EVERY = int(os.getenv("FETCH_REPROBE_EVERY", "10"))
+FETCH_REPROBE_DAYS = float(os.getenv("FETCH_REPROBE_DAYS", "7"))
+
+TIERS = ["requests", "cloudscraper", "proxy"]
+
+
+def domain_key(domain):
+    domain = (domain or "").lower().strip().strip("/")
+    for prefix in ("https://", "http://", "www."):
+        if domain.startswith(prefix):
+            domain = domain[len(prefix):]
+    return domain.split("/")[0]
+
+
+class StrategyStore:
+    def __init__(self, path=None, reprobe_every=FETCH_REPROBE_EVERY, reprobe_days=FETCH_REPROBE_DAYS):
+        self.path = path or os.path.join(CACHE_DIR, "fetch_strategy.sqlite3")
+        self.reprobe_every = reprobe_every
+        self.reprobe_age = reprobe_days * 86400
+        self.lock = threading.Lock()
+        self.stats = {"remembered": 0, "reprobes": 0, "unknown": 0, "skipped_tiers": 0}
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        with self.connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS fetch_strategy ("
+                " domain TEXT PRIMARY KEY, tier TEXT, url TEXT, latency_ms REAL,"
+                " successes INTEGER DEFAULT 0, failures INTEGER DEFAULT 0,"
+                " uses_since_probe INTEGER DEFAULT 0, probed REAL, updated REAL)"
+            )
+
+    def connect(self):
+        return sqlite3.connect(self.path, timeout=30)
+
+    def get(self, domain):
+        with self.connect() as conn:
+            conn.row_factory = sqlite3.Row
+            row = conn.execute("SELECT * FROM fetch_strategy WHERE domain = ?", (domain_key(domain),)).fetchone()
+        return dict(row) if row else None
+
+    def bump(self, key, n=1):
+        with self.lock:
+            self.stats[key] += n
+
+    def plan(self, domain, tiers=TIERS):
+        """
+        Order to try the tiers in for this domain, and the remembered URL (or None).
+        Known domains start at their remembered tier, then fall through the
+        more expensive ones, and only then the cheaper ones. When a re-probe
+        is due the full ladder is used, cheapest first.
+        """
+        record = self.get(domain)
+        if record is None or record["tier"] not in tiers:
+            self.bump("unknown")
+            return list(tiers), None
+        tier = record["tier"]
+        idx = tiers.index(tier)
+        due = (record["uses_since_probe"] >= self.reprobe_every
+               or time.time() - (record["probed"] or 0) > self.reprobe_age)
+        if idx and due:
+            self.bump("reprobes")
+            logger.info(f"{domain_key(domain)}: re-probing cheaper tiers before {tier}")
+            return list(tiers), record["url"]
+        self.bump("remembered")
+        self.bump("skipped_tiers", idx)
+        return [tier] + tiers[idx + 1:] + tiers[:idx], record["url"]
+
+    def record_success(self, domain, tier, url, latency_ms, probed=False):
+        """probed=True when the cheaper tiers were tried (and failed) first."""
+        key = domain_key(domain)
+        now = time.time()
+        with self.connect() as conn:
+            previous = conn.execute(
+                "SELECT tier, uses_since_probe, probed FROM fetch_strategy WHERE domain = ?", (key,)
+            ).fetchone()
+            if previous is None or probed or previous[0] != tier:
+                uses, probed_at = 0, now
+            else:
+                uses, probed_at = previous[1] + 1, previous[2]
+            conn.execute(
+                "INSERT INTO fetch_strategy (domain, tier, url, latency_ms, successes, failures,"
+                " uses_since_probe, probed, updated) VALUES (?, ?, ?, ?, 1, 0, ?, ?, ?)"
+                " ON CONFLICT(domain) DO UPDATE SET tier = excluded.tier, url = excluded.url,"
+                " latency_ms = excluded.latency_ms, successes = successes + 1,"
+                " uses_since_probe = excluded.uses_since_probe, probed = excluded.probed,"
+                " updated = excluded.updated",
+                (key, tier, url, latency_ms, uses, probed_at, now),
+            )
+
+    def record_failure(self, domain, tier):
+        with self.connect() as conn:
+            conn.execute(
+                "UPDATE fetch_strategy SET failures = failures + 1, updated = ? WHERE domain = ? AND tier = ?",
+                (time.time(), domain_key(domain), tier),
+            )
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_strategy_store():
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = StrategyStore()
+        return _store
+
+
+def set_strategy_store(store):
+    """Swap the process-wide store (e.g. a throwaway one for benchmarks)."""
+    global _store
+    with _store_lock:
+        _store = store
@@ -1,10 +1,11 @@
 import streamlit as st
 import pandas as pd
 import logging
+from results_store import write_results
 
 def finalize_data(df):
     """
-    Finalizes the data by updating the session state and saving the DataFrame to a CSV file.
+    Finalizes the data by updating the session state and saving the DataFrame to a Parquet file.
     """
     try:
         # Ensure the Description column exists
@@ -25,9 +26,9 @@ def finalize_data(df):
         st.session_state.df = df
         st.session_state.processing_complete = True
 
-        # Save to CSV
-        df.to_csv('final_data.csv', index=False)
-        logging.info("Final CSV saved successfully")
+        # Save to Parquet (lists and text round-trip exactly; CSV is only for downloads)
+        write_results(df, 'final_data.parquet')
+        logging.info("Final results saved successfully")
 
         # Update the display using the persistent container
         st.session_state.display_container.dataframe(df, use_container_width=True)
@@ -1,11 +1,13 @@
 # gpt_helpers.py
 
 import json
-import openai
 import re
 import pandas as pd
 from typing import Dict, List
 import logging
+from config import openai  # lazy; applies OPENAI_API_KEY / OPENAI_BASE_URL on first use
+from resources import register_resource, resource
+from countries import fix_country_code  # ui and processing import it from here
 
 # Set up logging at the top of the file
 logging.basicConfig(
@@ -208,6 +210,16 @@ def extract_name_gpt(text):
 
 # --- GPT-based City/Country Extraction ---
 
+def load_geotext():
+    """GeoText builds its gazetteer index when imported; the class is kept as a warm resource."""
+    from geotext import GeoText
+    return GeoText
+
+register_resource("geotext", load_geotext)
+
+def geotext_places(text):
+    return resource("geotext")(text)
+
 def extract_city_country_gpt(text):
     """
     First attempts to extract the city and country using GeoText.
@@ -215,8 +227,7 @@ def extract_city_country_gpt(text):
     Returns a dictionary with keys "City" and "Country".
     """
     try:
-        from geotext import GeoText
-        places = GeoText(text)
+        places = geotext_places(text)
         if places.cities or places.countries:
             return {"City": places.cities[0] if places.cities else "",
                     "Country": places.countries[0] if places.countries else ""}
@@ -290,19 +301,3 @@ def merge_contacts(existing_contacts: Dict[str, List[str]],
         "emails": list(set(existing_contacts.get("emails", []) + new_contacts.get("emails", []))),
         "phones": list(set(existing_contacts.get("phones", []) + new_contacts.get("phones", [])))
     }
-
-# --- Helper Functions ---
-
-def fix_country_code(row):
-    """
-    If 'Country code' is missing or incorrect in a row, attempts to fix it based on the 'Country' field.
-    """
-    country_str = (row['Country'] if pd.notnull(row['Country']) else "").strip().lower()
-    ccode_str = (row['Country code'] if pd.notnull(row['Country code']) else "").strip().upper()
-    if ccode_str and ccode_str != "UK":
-        return ccode_str
-    if country_str in ("united kingdom", "uk", "great britain", "england", "scotland", "wales"):
-        return "GB"
-    elif country_str in ("united states", "usa", "us", "america"):
-        return "US"
-    return ccode_str or ""
@@ -1,9 +1,12 @@
+import os
 import openai
 import json
 
 class GPTService:
-    def __init__(self, api_key):
-        openai.api_key = api_key
+    def __init__(self, api_key, base_url=None):
+        # base_url defaults to OPENAI_BASE_URL so the service can be pointed at gpt_stub.py
+        base_url = base_url or os.getenv("OPENAI_BASE_URL")
+        self.client = openai.OpenAI(api_key=api_key or ("stub" if base_url else None), base_url=base_url)
 
     def generate_gpt_description(self, text):
         prompt = (
@@ -17,7 +20,7 @@ class GPTService:
             + "\n\nMusic Map Description:"
         )
         try:
-            response = openai.ChatCompletion.create(
+            response = self.client.chat.completions.create(
                 model="gpt-3.5-turbo",
                 messages=[
                     {"role": "system", "content": "You are a helpful assistant."},
@@ -67,7 +70,7 @@ class GPTService:
 
         """
         try:
-            response = openai.ChatCompletion.create(
+            response = self.client.chat.completions.create(
                 model="gpt-3.5-turbo",
                 messages=[
                     {"role": "system", "content": "You are a helpful assistant."},
@@ -0,0 +1,299 @@
+# gpt_stub.py
+"""
+Local OpenAI-compatible stub server for exercising the GPT paths offline.
+
+Serves POST /v1/chat/completions from recorded fixtures, with optional
+latency and 429 injection. Point the app at it with:
+
+    OPENAI_BASE_URL=http://127.0.0.1:8787/v1
+
+Usage:
+    python gpt_stub.py serve --port 8787 --latency-ms 200 --rate-429 0.05
+    python gpt_stub.py replay --concurrency 8 --requests 200
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import random
+import statistics
+import threading
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DEFAULT_FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "gpt", "default.json")
+
+
+def request_key(messages):
+    """Stable key for a chat request, used for recorded (exact) fixtures."""
+    blob = json.dumps(messages, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+
+class FixtureStore:
+    """
+    Fixture file layout:
+    {
+      "recorded": {"<sha256 of messages>": "<assistant content>"},
+      "rules": [{"match": "substring of the last user message", "content": "...",
+                  "within": "optional marker; only text after it is searched"}]
+    }
+    Exact recordings win; otherwise the first matching rule is used. "within"
+    keeps a rule from firing on the worked examples inside the prompt itself.
+    """
+
+    def __init__(self, path=DEFAULT_FIXTURES):
+        self.path = path
+        self.lock = threading.Lock()
+        self.data = {"recorded": {}, "rules": []}
+        if path and os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                self.data.update(json.load(f))
+
+    def lookup(self, messages):
+        recorded = self.data.get("recorded", {}).get(request_key(messages))
+        if recorded is not None:
+            return recorded
+        prompt = (messages[-1].get("content", "") if messages else "").lower()
+        for rule in self.data.get("rules", []):
+            text = prompt
+            marker = rule.get("within", "").lower()
+            if marker:
+                if marker not in text:
+                    continue
+                text = text.rsplit(marker, 1)[1]
+            if rule.get("match", "").lower() in text:
+                return rule.get("content", "")
+        return None
+
+    def record(self, messages, content):
+        with self.lock:
+            self.data.setdefault("recorded", {})[request_key(messages)] = content
+            with open(self.path, "w", encoding="utf-8") as f:
+                json.dump(self.data, f, indent=2, ensure_ascii=False)
+
+
+class StubConfig:
+    def __init__(self, fixtures, latency_ms=0, jitter_ms=0, rate_429=0.0,
+                 seed=None, upstream=None, record=False):
+        self.fixtures = fixtures
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.rate_429 = rate_429
+        self.random = random.Random(seed)
+        self.upstream = upstream
+        self.record = record
+        self.stats = {"requests": 0, "served": 0, "rate_limited": 0, "misses": 0, "recorded": 0}
+        self.stats_lock = threading.Lock()
+
+    def bump(self, key):
+        with self.stats_lock:
+            self.stats[key] += 1
+
+
+def forward_upstream(upstream, body):
+    """Send a miss to a real OpenAI-compatible endpoint (record mode)."""
+    req = urllib.request.Request(
+        upstream.rstrip("/") + "/chat/completions",
+        data=json.dumps(body).encode("utf-8"),
+        headers={
+            "Content-Type": "application/json",
+            "Authorization": f"Bearer {os.getenv('OPENAI_API_KEY', '')}",
+        },
+    )
+    with urllib.request.urlopen(req, timeout=60) as resp:
+        data = json.loads(resp.read().decode("utf-8"))
+    return data["choices"][0]["message"]["content"]
+
+
+def completion_payload(model, content):
+    return {
+        "id": f"chatcmpl-stub-{int(time.time() * 1000)}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [{
+            "index": 0,
+            "message": {"role": "assistant", "content": content},
+            "finish_reason": "stop",
+        }],
+        "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+    }
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    config = None  # set by make_server()
+
+    def log_message(self, format, *args):
+        pass
+
+    def send_json(self, status, payload, headers=None):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for k, v in (headers or {}).items():
+            self.send_header(k, v)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path.rstrip("/").endswith("/stats"):
+            self.send_json(200, self.config.stats)
+        else:
+            self.send_json(404, {"error": {"message": "not found"}})
+
+    def do_POST(self):
+        cfg = self.config
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            self.send_json(404, {"error": {"message": "not found"}})
+            return
+        length = int(self.headers.get("Content-Length", 0))
+        body = json.loads(self.rfile.read(length) or b"{}")
+        cfg.bump("requests")
+
+        delay = cfg.latency_ms + (cfg.random.uniform(0, cfg.jitter_ms) if cfg.jitter_ms else 0)
+        if delay:
+            time.sleep(delay / 1000.0)
+
+        if cfg.rate_429 and cfg.random.random() < cfg.rate_429:
+            cfg.bump("rate_limited")
+            self.send_json(429, {"error": {"message": "Rate limit reached (stub)", "type": "requests"}},
+                           headers={"Retry-After": "1"})
+            return
+
+        messages = body.get("messages", [])
+        content = cfg.fixtures.lookup(messages)
+        if content is None and cfg.record and cfg.upstream:
+            try:
+                content = forward_upstream(cfg.upstream, body)
+                cfg.fixtures.record(messages, content)
+                cfg.bump("recorded")
+            except Exception as e:
+                print(f"Upstream record error: {e}")
+        if content is None:
+            cfg.bump("misses")
+            content = ""
+        cfg.bump("served")
+        self.send_json(200, completion_payload(body.get("model", "gpt-3.5-turbo"), content))
+
+
+def make_server(host="127.0.0.1", port=0, fixtures_path=DEFAULT_FIXTURES, **options):
+    """Create (but don't start) a stub server. Port 0 picks a free port."""
+    config = StubConfig(FixtureStore(fixtures_path), **options)
+    handler = type("BoundStubHandler", (StubHandler,), {"config": config})
+    return ThreadingHTTPServer((host, port), handler)
+
+
+def start_stub_server(host="127.0.0.1", port=0, **options):
+    """
+    Start the stub in a daemon thread.
+    Returns (server, base_url); call server.shutdown() when done.
+    """
+    server = make_server(host, port, **options)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://{server.server_address[0]}:{server.server_address[1]}/v1"
+    return server, base_url
+
+
+def point_openai_at(base_url):
+    """Route the module-level openai client (used by gpt_helpers) to base_url."""
+    import openai
+    # The module-level client joins paths onto base_url verbatim, so it needs the slash
+    openai.base_url = base_url.rstrip("/") + "/"
+    if not openai.api_key:
+        openai.api_key = "stub"
+
+
+########################################################################
+# Replay harness
+########################################################################
+
+REPLAY_TEXTS = [
+    "RAK STUDIOS 42-48 Charlbert Street, St Johns Wood, London NW8 7BU. Tel 020 7586 2012. info@rakstudios.co.uk",
+    "Abbey Road Studios | 3 Abbey Road | St. John's Wood London NW8 9AY | tel: +44 (0)20 7266 7000",
+    "The Lexington, 96-98 Pentonville Road, London N1 9JB. Live music seven nights a week.",
+]
+
+
+def replay(base_url, concurrency=8, total=100):
+    """Fire the gpt_helpers functions concurrently at base_url and report latency."""
+    import gpt_helpers  # imports config, which applies the env settings first
+    point_openai_at(base_url)
+
+    calls = [
+        gpt_helpers.generate_gpt_description,
+        gpt_helpers.extract_address_fields_gpt,
+        gpt_helpers.extract_contacts_gpt,
+        gpt_helpers.extract_name_gpt,
+    ]
+
+    def one(n):
+        fn = calls[n % len(calls)]
+        started = time.perf_counter()
+        fn(REPLAY_TEXTS[n % len(REPLAY_TEXTS)])
+        return time.perf_counter() - started
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        latencies = sorted(pool.map(one, range(total)))
+    elapsed = time.perf_counter() - started
+
+    report = {
+        "requests": total,
+        "concurrency": concurrency,
+        "elapsed_s": round(elapsed, 3),
+        "req_per_s": round(total / elapsed, 2) if elapsed else 0.0,
+        "p50_ms": round(statistics.median(latencies) * 1000, 1),
+        "p95_ms": round(latencies[int(0.95 * (len(latencies) - 1))] * 1000, 1),
+    }
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="OpenAI-compatible stub server for offline GPT runs")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    for name in ("serve", "replay"):
+        p = sub.add_parser(name)
+        p.add_argument("--host", default="127.0.0.1")
+        p.add_argument("--port", type=int, default=8787 if name == "serve" else 0)
+        p.add_argument("--fixtures", default=DEFAULT_FIXTURES)
+        p.add_argument("--latency-ms", type=float, default=0)
+        p.add_argument("--jitter-ms", type=float, default=0)
+        p.add_argument("--rate-429", type=float, default=0.0, help="Probability of answering 429")
+        p.add_argument("--seed", type=int, default=None)
+        if name == "serve":
+            p.add_argument("--upstream", default=None, help="Real endpoint to record misses from")
+            p.add_argument("--record", action="store_true")
+        else:
+            p.add_argument("--concurrency", type=int, default=8)
+            p.add_argument("--requests", type=int, default=100)
+
+    args = parser.parse_args()
+    options = dict(latency_ms=args.latency_ms, jitter_ms=args.jitter_ms,
+                   rate_429=args.rate_429, seed=args.seed)
+
+    if args.command == "serve":
+        server = make_server(args.host, args.port, args.fixtures,
+                             upstream=args.upstream, record=args.record, **options)
+        print(f"GPT stub listening on http://{args.host}:{server.server_address[1]}/v1")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+    else:
+        server, base_url = start_stub_server(args.host, args.port, fixtures_path=args.fixtures, **options)
+        try:
+            report = replay(base_url, args.concurrency, args.requests)
+            report["server"] = dict(server.RequestHandlerClass.config.stats)
+            print(json.dumps(report, indent=2))
+        finally:
+            server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+# http_client.py
+"""
+One place to build HTTP sessions, so every caller shares tuned connection
+pools instead of opening a fresh connection (and TLS handshake) per request.
+
+    shared_session()   scraping traffic: paced by politeness.py
+    api_session()      first-party APIs (Bubble, Azure Maps): pooled, not paced
+
+Both sessions:
+- keep connections alive, with per-host pools sized to SCRAPE_WORKERS
+- retry connection errors and 500/502/504 with backoff at the transport
+  level (429/503 are left to the politeness scheduler)
+- advertise gzip/deflate, plus br when the brotli package is installed (it
+  is in requirements.txt); requests only decodes br when brotli is present
+
+The sessions live in the resource registry (resources.py) as
+"http.scrape" and "http.api", so they survive Streamlit reruns and can be
+closed explicitly. connection_stats() reports how often connections were
+reused.
+
+Settings (environment):
+    HTTP_RETRIES     transport-level retries (default 2)
+    HTTP_BACKOFF     urllib3 backoff factor in seconds (default 0.5)
+    HTTP_POOL_HOSTS  host pools kept open per session (default 50)
+"""
+
+import os
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.request import ACCEPT_ENCODING
+from urllib3.util.retry import Retry
+
+from config import SCRAPE_WORKERS
+from politeness import SCRAPE_MAX_CONCURRENCY, USER_AGENT, PoliteAdapter
+from resources import get_resource_registry, register_resource, resource
+
+HTTP_RETRIES = int(os.getenv("HTTP_RETRIES", "2"))
+HTTP_BACKOFF = float(os.getenv("HTTP_BACKOFF", "0.5"))
+HTTP_POOL_HOSTS = int(os.getenv("HTTP_POOL_HOSTS", "50"))
+
+DEFAULT_HEADERS = {
+    "User-Agent": USER_AGENT,
+    "Accept-Encoding": ACCEPT_ENCODING,  # "gzip,deflate" or "gzip,deflate,br"
+    "Connection": "keep-alive",
+}
+
+_adapter_factory = None
+_adapters_lock = threading.Lock()
+_all_adapters = []
+
+SESSION_RESOURCES = ("http.scrape", "http.api")
+
+
+def retry_policy(retries=HTTP_RETRIES, backoff=HTTP_BACKOFF):
+    return Retry(
+        total=retries,
+        connect=retries,
+        read=retries,
+        status=retries,
+        backoff_factor=backoff,
+        status_forcelist=(500, 502, 504),
+        allowed_methods=frozenset({"GET", "HEAD", "OPTIONS"}),
+        raise_on_status=False,
+    )
+
+
+def set_adapter_factory(factory):
+    """
+    Replace the transport used by new sessions; factory(polite, **pool_kwargs)
+    returns an HTTPAdapter. The benchmark uses this to route everything to
+    its corpus server. Existing shared sessions are dropped.
+    """
+    global _adapter_factory
+    with _adapters_lock:
+        _adapter_factory = factory
+        _all_adapters.clear()
+    # Outside the lock: building a session takes the resource lock, then this one
+    for name in SESSION_RESOURCES:
+        get_resource_registry().close(name)
+
+
+def make_adapter(polite=True, workers=SCRAPE_WORKERS):
+    pool_kwargs = {
+        "pool_connections": HTTP_POOL_HOSTS,
+        # Enough per-host slots that parallel rows never discard connections
+        "pool_maxsize": max(workers, SCRAPE_MAX_CONCURRENCY),
+        "max_retries": retry_policy(),
+    }
+    if _adapter_factory is not None:
+        adapter = _adapter_factory(polite, **pool_kwargs)
+    elif polite:
+        adapter = PoliteAdapter(**pool_kwargs)
+    else:
+        adapter = HTTPAdapter(**pool_kwargs)
+    with _adapters_lock:
+        _all_adapters.append(adapter)
+    return adapter
+
+
+def mount_adapters(session, polite=True, workers=SCRAPE_WORKERS):
+    """Fit an existing session (e.g. a cloudscraper one) with a pooled adapter."""
+    adapter = make_adapter(polite, workers)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def build_session(polite=True, workers=SCRAPE_WORKERS):
+    session = mount_adapters(requests.Session(), polite, workers)
+    session.headers.update(DEFAULT_HEADERS)
+    return session
+
+
+register_resource("http.scrape", lambda: build_session(polite=True), close=requests.Session.close)
+register_resource("http.api", lambda: build_session(polite=False), close=requests.Session.close)
+
+
+def shared_session():
+    """Process-wide session for scraping; requests are paced per host."""
+    return resource("http.scrape")
+
+
+def api_session():
+    """Process-wide session for our own API endpoints; pooled, not paced."""
+    return resource("http.api")
+
+
+def connection_stats():
+    """
+    Connections opened vs requests sent across every adapter built here.
+    reuse_ratio is the share of requests that went over an existing connection.
+    """
+    connections = requests_sent = 0
+    hosts = set()
+    with _adapters_lock:
+        adapters = list(_all_adapters)
+    for adapter in adapters:
+        for key in list(adapter.poolmanager.pools.keys()):
+            pool = adapter.poolmanager.pools.get(key)
+            if pool is None:
+                continue
+            hosts.add(pool.host)
+            connections += pool.num_connections
+            requests_sent += pool.num_requests
+    return {
+        "hosts": len(hosts),
+        "connections": connections,
+        "requests": requests_sent,
+        "reuse_ratio": round(1 - connections / requests_sent, 3) if requests_sent else 0.0,
+    }
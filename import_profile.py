@@ -0,0 +1,114 @@
+# import_profile.py
+"""
+Startup import profile and budget check.
+
+Runs `python -X importtime -c "import ui"` in fresh interpreters and reports
+per-module import time: the slowest modules by cumulative time, and self time
+summed per top-level package. With --check it also fails (exit 1) when:
+
+- the median startup import exceeds the budget (IMPORT_BUDGET_MS), or
+- one of the deferred dependencies (DEFERRED_MODULES) is imported at
+  startup again. They are imported at first use; see lazy.py.
+
+Usage:
+    python import_profile.py                  # report for "import ui"
+    python import_profile.py --check          # report, exit 1 on regression
+    python import_profile.py --module processing --runs 5 --top 30
+
+Settings (environment):
+    IMPORT_BUDGET_MS   startup import budget in milliseconds (default 1500)
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from collections import defaultdict
+
+IMPORT_BUDGET_MS = float(os.getenv("IMPORT_BUDGET_MS", "1500"))
+
+DEFERRED_MODULES = [
+    "openai", "selenium.webdriver", "playwright.async_api", "PIL.Image", "geotext",
+    "phonenumbers", "cloudscraper", "webdriver_manager", "fake_useragent",
+]
+
+
+def parse_importtime(stderr):
+    """[(module, self_us, cumulative_us, depth)] from -X importtime output."""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        depth = (len(name) - len(name.lstrip(" "))) // 2
+        rows.append((name.strip(), int(self_us), int(cumulative_us), depth))
+    return rows
+
+
+def profile_once(module):
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True, cwd=os.path.dirname(os.path.abspath(__file__)),
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{result.stderr[-2000:]}")
+    return parse_importtime(result.stderr)
+
+
+def profile(module="ui", runs=3, top=20):
+    totals, samples = [], []
+    for _ in range(runs):
+        rows = profile_once(module)
+        # Top-level entries (depth 0) are everything the interpreter imported for the statement
+        totals.append(sum(cumulative for _, _, cumulative, depth in rows if depth == 0) / 1000)
+        samples.append(rows)
+    rows = samples[totals.index(statistics.median_low(totals))]
+
+    packages = defaultdict(float)
+    for name, self_us, _, _ in rows:
+        packages[name.split(".")[0]] += self_us / 1000
+    loaded = {name for name, _, _, _ in rows}
+    return {
+        "module": module,
+        "runs": runs,
+        "total_ms": round(statistics.median(totals), 1),
+        "min_ms": round(min(totals), 1),
+        "modules": len(rows),
+        "slowest": [{"module": name, "cumulative_ms": round(cumulative / 1000, 1), "self_ms": round(self_us / 1000, 1)}
+                    for name, self_us, cumulative, _ in sorted(rows, key=lambda r: -r[2])[:top]],
+        "packages_ms": {name: round(ms, 1) for name, ms in sorted(packages.items(), key=lambda kv: -kv[1])[:top]},
+        "deferred_loaded": [name for name in DEFERRED_MODULES if name in loaded],
+    }
+
+
+def check(report, budget_ms=IMPORT_BUDGET_MS):
+    """Problems with a profile report; empty when it is within budget."""
+    problems = []
+    if report["total_ms"] > budget_ms:
+        problems.append(f"import {report['module']} took {report['total_ms']} ms (budget {budget_ms:g} ms)")
+    for name in report["deferred_loaded"]:
+        problems.append(f"{name} is imported at startup; import it at first use (see lazy.py)")
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Startup import profile")
+    parser.add_argument("--module", default="ui", help="Module to import (default ui)")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--top", type=int, default=20)
+    parser.add_argument("--budget-ms", type=float, default=IMPORT_BUDGET_MS)
+    parser.add_argument("--check", action="store_true", help="Exit 1 when over budget or a deferred module loads")
+    args = parser.parse_args()
+
+    report = profile(args.module, args.runs, args.top)
+    report["budget_ms"] = args.budget_ms
+    report["problems"] = check(report, args.budget_ms)
+    print(json.dumps(report, indent=2))
+    if args.check and report["problems"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
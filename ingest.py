@@ -0,0 +1,113 @@
+# ingest.py
+"""
+Streaming CSV ingestion for big input sheets.
+
+Reading a 50k-row directory dump with read_csv(StringIO(text)) and then
+adding ~25 empty object columns to it kept several copies of the sheet in
+memory. Here the upload is spooled to disk once, and only its header is
+read for the mapping UI. The scrape job then reads the file in chunks:
+
+    for chunk in iter_chunks(path, mapping, overwrite={"Type": "Venues"}):
+        ...process the chunk...
+        writer.write(chunk)      # appended to the results file, then dropped
+
+Only the mapped source columns are parsed (usecols, as strings), and each
+chunk gets the output columns when it is read. Memory stays at about one
+chunk however long the input is.
+
+Finished chunks go to a results_store.ResultsWriter.
+
+Settings (environment):
+    INGEST_CHUNK_ROWS     rows per chunk (default 500)
+    INGEST_LOAD_MAX_ROWS  results up to this size are loaded into the app
+                          after a run; bigger ones are offered as a download
+                          (default 5000)
+"""
+
+import hashlib
+import os
+import shutil
+
+import pandas as pd
+
+from config import CACHE_DIR
+
+INGEST_CHUNK_ROWS = int(os.getenv("INGEST_CHUNK_ROWS", "500"))
+INGEST_LOAD_MAX_ROWS = int(os.getenv("INGEST_LOAD_MAX_ROWS", "5000"))
+
+OUTPUT_COLUMNS = [
+    "AllImages", "InstagramURL", "FacebookURL", "TwitterURL",
+    "LinkedInURL", "YoutubeURL", "TiktokURL", "EmailContacts",
+    "PhoneContacts", "ScrapedText", "Description", "Error",
+    "Type", "Sub Type", "GigListingURL",
+    "Full address", "Address line 1", "Address line 2",
+    "City", "County", "Country", "Post code", "Country code",
+    "Name", "State"
+]
+
+READ_OPTIONS = {"dtype": str, "keep_default_na": False, "encoding": "utf-8", "encoding_errors": "replace"}
+
+
+def spool_upload(uploaded_file, directory=None):
+    """
+    Copy an uploaded file to CACHE_DIR/uploads in blocks, named by content
+    hash, so reruns reuse it. Returns the path.
+    """
+    directory = directory or os.path.join(CACHE_DIR, "uploads")
+    os.makedirs(directory, exist_ok=True)
+    digest = hashlib.sha1()
+    uploaded_file.seek(0)
+    for block in iter(lambda: uploaded_file.read(1 << 20), b""):
+        digest.update(block)
+    path = os.path.join(directory, f"{digest.hexdigest()[:16]}.csv")
+    if not os.path.exists(path):
+        uploaded_file.seek(0)
+        with open(path + ".tmp", "wb") as out:
+            shutil.copyfileobj(uploaded_file, out, 1 << 20)
+        os.replace(path + ".tmp", path)
+    uploaded_file.seek(0)
+    return path
+
+
+def read_columns(path):
+    """Header only."""
+    return list(pd.read_csv(path, nrows=0, **READ_OPTIONS).columns)
+
+
+def count_rows(path, column=None, chunksize=50000):
+    """Data rows in the file, reading a single column."""
+    column = column or read_columns(path)[0]
+    return sum(len(chunk) for chunk in pd.read_csv(path, usecols=[column], chunksize=chunksize, **READ_OPTIONS))
+
+
+def prepare_chunk(chunk, overwrite=None, fill=None):
+    """
+    Add the missing output columns, then set the `overwrite` values on every
+    row and the `fill` values on rows where that cell is empty.
+    """
+    for col in OUTPUT_COLUMNS:
+        if col not in chunk.columns:
+            chunk[col] = ""
+    for col, value in (overwrite or {}).items():
+        chunk[col] = value
+    for col, value in (fill or {}).items():
+        chunk[col] = chunk[col].where(chunk[col].astype(str).str.strip() != "", value)
+    return chunk
+
+
+def iter_chunks(path, mapping, overwrite=None, fill=None, chunksize=INGEST_CHUNK_ROWS):
+    """
+    Yield the input as DataFrames of up to `chunksize` rows, with columns
+    renamed by `mapping` ({expected column: source column}) and prepared by
+    prepare_chunk. The index runs on across chunks (0..n-1 over the file).
+    """
+    available = set(read_columns(path))
+    mapped = {expected: source for expected, source in (mapping or {}).items() if source in available}
+    offset = 0
+    reader = pd.read_csv(path, usecols=sorted(set(mapped.values())), chunksize=chunksize, **READ_OPTIONS)
+    for raw in reader:
+        chunk = pd.DataFrame(index=pd.RangeIndex(offset, offset + len(raw)))
+        for expected, source in mapped.items():
+            chunk[expected] = raw[source].to_numpy()
+        offset += len(raw)
+        yield prepare_chunk(chunk, overwrite, fill)
@@ -0,0 +1,397 @@
+# jobs.py
+"""
+Background scrape and enrichment jobs.
+
+Streamlit runs the script on a thread that is torn down by every rerun,
+widget interaction or browser disconnect, so a scrape run inline in ui.main
+died with it. Jobs are submitted here instead: a process-wide JobManager
+runs them on its own worker threads and persists their state to SQLite
+(CACHE_DIR/jobs.sqlite3) and their frames to CACHE_DIR/jobs/. The UI keeps
+only a job id in session_state and polls, so a job survives reruns, and
+several users can queue jobs at the same time.
+
+    manager = get_job_manager()
+    job_id = manager.submit("scrape", source=path, mapping={...}, final_type="Venues", gig_synonyms=[...])
+    job = manager.get(job_id)          # status, done/total, messages, ...
+    df = manager.load_result(job_id)   # partial while running, final once done
+
+Scrape jobs stream their input file in chunks (see ingest.py) and append
+each finished chunk to CACHE_DIR/jobs/<id>.result.parquet, so a job's memory
+does not grow with the sheet. Frames are stored with results_store.
+
+Jobs that were queued or running when the process stopped are marked
+"interrupted" at startup; whatever they had saved stays loadable.
+
+Settings (environment):
+    JOB_WORKERS            jobs run at the same time (default 2)
+    JOB_SNAPSHOT_SECONDS   how often a running job saves partial results (default 5)
+"""
+
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+from bubble import send_to_bubble
+from config import CACHE_DIR
+from fetch_strategy import domain_key
+from http_client import connection_stats, shared_session
+from ingest import count_rows, iter_chunks
+from processing import cleanup_address_lines, enrich_rows, process_rows
+from progress_view import DisplayBuffer
+from results_store import ResultsWriter, export_csv, read_results, write_results
+from venue_repository import get_venue_repository
+
+logger = logging.getLogger(__name__)
+
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+JOB_SNAPSHOT_SECONDS = float(os.getenv("JOB_SNAPSHOT_SECONDS", "5"))
+
+QUEUED, RUNNING, DONE, FAILED, CANCELLED, INTERRUPTED = (
+    "queued", "running", "done", "failed", "cancelled", "interrupted")
+ACTIVE_STATUSES = (QUEUED, RUNNING)
+
+
+class JobContext:
+    """
+    What a running job uses to report progress, messages and partial results.
+    `view` is the job's live display table (see progress_view.py).
+    """
+
+    def __init__(self, manager, job_id, cancel_event, view):
+        self.manager = manager
+        self.job_id = job_id
+        self.cancel_event = cancel_event
+        self.view = view
+        self.messages = []
+        self.last_snapshot = 0.0
+
+    @property
+    def cancelled(self):
+        return self.cancel_event.is_set()
+
+    def progress(self, done, total, stage=None):
+        fields = {"done": done, "total": total}
+        if stage:
+            fields["stage"] = stage
+        self.manager.update(self.job_id, **fields)
+
+    def message(self, level, text):
+        """level is a Streamlit status call: info, success, warning or error."""
+        self.messages.append([level, text])
+        self.manager.update(self.job_id, messages=json.dumps(self.messages))
+
+    def snapshot(self, df, force=False):
+        """Save partial results, at most every JOB_SNAPSHOT_SECONDS unless forced."""
+        now = time.monotonic()
+        if force or now - self.last_snapshot >= JOB_SNAPSHOT_SECONDS:
+            self.manager.save_frame(self.job_id, "result", df)
+            self.last_snapshot = now
+
+
+def run_enrich_job(ctx, df, **_):
+    """GPT descriptions and missing City/Country."""
+    def on_row_done(i, done, total):
+        ctx.view.update(df, i)
+        ctx.progress(done, total, "enrich")
+        ctx.snapshot(df)
+
+    enrich_rows(df, on_row_done=on_row_done, stop_event=ctx.cancel_event)
+    if not ctx.cancelled:
+        ctx.message("success", "GPT enhancement complete!")
+    return df
+
+
+def merge_escalation(totals, summary):
+    for key, value in (summary or {}).items():
+        if key != "escalation_rate":
+            totals[key] = totals.get(key, 0) + value
+    pages = totals.get("contact_pages", 0)
+    totals["escalation_rate"] = round(totals.get("escalated", 0) / pages, 3) if pages else 0.0
+    return totals
+
+
+def is_blank(value):
+    if isinstance(value, list):
+        return not value
+    return value is None or not str(value).strip() or str(value) == "nan"
+
+
+def fill_blank_cells(chunk, i, values):
+    """Copy values into row i's empty cells only; the row's own data and URL are kept."""
+    for col, value in values.items():
+        if col in chunk.columns and col != "URL" and is_blank(chunk.at[i, col]):
+            chunk.at[i, col] = value
+
+
+def skip_known_rows(chunk, repository):
+    """
+    Rows that need no scraping: sites already in the repository (their empty
+    cells are filled from it) and repeats of an earlier row in the chunk.
+    Returns (skip, repeats), repeats mapping a row to the row it repeats.
+    """
+    keys = chunk["URL"].map(domain_key)
+    known = repository.lookup(keys)
+    skip, repeats, first = set(), {}, {}
+    for i, key in keys.items():
+        if not key:
+            continue
+        if key in known:
+            fill_blank_cells(chunk, i, known[key])
+            skip.add(i)
+        elif key in first:
+            repeats[i] = first[key]
+            skip.add(i)
+        else:
+            first[key] = i
+    return skip, repeats
+
+
+def run_scrape_job(ctx, df, final_type, gig_synonyms, autopilot=False,
+                   source=None, mapping=None, overwrite=None, fill=None, skip_known=False):
+    """
+    Scrape every row of `source` (a CSV read through ingest.iter_chunks with
+    `mapping`, `overwrite` and `fill`) or of `df`, one chunk at a time. Each
+    finished chunk is cleaned up, with autopilot also enriched and sent to
+    Bubble, then appended to the job's results file.
+
+    Scraped rows are saved to the venue repository. With `skip_known`, sites
+    already there (and repeated URLs) are filled in instead of scraped.
+    """
+    if df is not None:
+        chunks, total = [df], len(df)
+    else:
+        chunks, total = iter_chunks(source, mapping, overwrite, fill), count_rows(source)
+    ctx.progress(0, total, "scrape")
+    with ResultsWriter(ctx.manager.frame_path(ctx.job_id, "result")) as writer:
+        scrape_chunks(ctx, chunks, total, writer, final_type, gig_synonyms, autopilot, skip_known)
+    return None
+
+
+def scrape_chunks(ctx, chunks, total, writer, final_type, gig_synonyms, autopilot, skip_known):
+    session = shared_session()
+    repository = get_venue_repository()
+    escalation = {}
+    skipped = 0
+    sync_seen = {}  # Bubble sync keys number repeats across the whole sheet, not per chunk
+
+    for chunk in chunks:
+        if ctx.cancelled:
+            break
+        skip, repeats = skip_known_rows(chunk, repository) if skip_known else (set(), {})
+        skipped += len(skip)
+        ctx.view.refresh(chunk)
+        finished = writer.rows
+
+        def on_row_done(i, done, _, chunk=chunk):
+            if str(chunk.at[i, "Error"]).startswith("Processing error"):
+                ctx.message("error", f"Error processing row {i + 1}: {chunk.at[i, 'Error']}")
+            ctx.view.update(chunk, i)
+            ctx.progress(finished + done, total, "scrape")
+
+        process_rows(chunk, session, final_type, gig_synonyms,
+                     on_row_done=on_row_done, stop_event=ctx.cancel_event, skip=skip)
+        for i, original in repeats.items():
+            fill_blank_cells(chunk, i, chunk.loc[original].to_dict())
+        merge_escalation(escalation, chunk.attrs.get("escalation"))
+        chunk = cleanup_address_lines(chunk)
+        if autopilot and not ctx.cancelled:
+            ctx.progress(finished + len(chunk), total, "enrich")
+            enrich_rows(chunk, on_row_done=lambda i, *_: ctx.view.update(chunk, i),
+                        stop_event=ctx.cancel_event)
+            for level, text in send_to_bubble(chunk, initialize=finished == 0, seen=sync_seen):
+                ctx.message(level, text)
+        repository.upsert_frame(chunk.drop(index=list(skip)))
+        writer.write(chunk)
+
+    if ctx.cancelled:
+        return
+    ctx.message("success", "Processing complete!")
+    if skipped:
+        ctx.message("caption", f"{skipped} rows were already known or repeated and were not scraped again")
+    if autopilot:
+        ctx.message("success", "GPT enhancement complete!")
+    conn = connection_stats()
+    ctx.message("caption", f"HTTP: {conn['requests']} requests over {conn['connections']} connections "
+                           f"({conn['reuse_ratio']:.0%} reused)")
+    if escalation.get("contact_pages"):
+        ctx.message("caption", f"Contact pages: {escalation['static']} static, {escalation['escalated']} "
+                               f"sent to the browser ({escalation['escalation_rate']:.0%} escalation)")
+
+
+JOB_KINDS = {
+    "scrape": run_scrape_job,
+    "enrich": run_enrich_job,
+}
+
+
+class JobManager:
+    def __init__(self, path=None, workers=JOB_WORKERS):
+        self.path = path or os.path.join(CACHE_DIR, "jobs.sqlite3")
+        self.frame_dir = os.path.join(os.path.dirname(os.path.abspath(self.path)), "jobs")
+        os.makedirs(self.frame_dir, exist_ok=True)
+        self.executor = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="job")
+        self.cancel_events = {}
+        self.views = {}
+        self.lock = threading.Lock()
+        with self.connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                " id TEXT PRIMARY KEY, kind TEXT, status TEXT, stage TEXT, params TEXT,"
+                " done INTEGER DEFAULT 0, total INTEGER DEFAULT 0, messages TEXT DEFAULT '[]',"
+                " error TEXT, created REAL, started REAL, finished REAL, updated REAL)"
+            )
+        self.mark_interrupted()
+
+    def connect(self):
+        return sqlite3.connect(self.path, timeout=30)
+
+    def mark_interrupted(self):
+        """Jobs left queued/running by a previous process will never finish."""
+        now = time.time()
+        with self.connect() as conn:
+            cur = conn.execute(
+                "UPDATE jobs SET status = ?, error = ?, finished = ?, updated = ? WHERE status IN (?, ?)",
+                (INTERRUPTED, "The app restarted before this job finished", now, now, *ACTIVE_STATUSES),
+            )
+        if cur.rowcount:
+            logger.warning(f"Marked {cur.rowcount} unfinished job(s) as interrupted")
+
+    # -- frames ---------------------------------------------------------
+
+    def frame_path(self, job_id, name, ext="parquet"):
+        return os.path.join(self.frame_dir, f"{job_id}.{name}.{ext}")
+
+    def save_frame(self, job_id, name, df):
+        write_results(df, self.frame_path(job_id, name))
+
+    def load_frame(self, job_id, name):
+        path = self.frame_path(job_id, name)
+        if not os.path.exists(path):
+            return None
+        return read_results(path)
+
+    def load_result(self, job_id):
+        """Saved results: partial for enrich jobs while they run, final once done."""
+        return self.load_frame(job_id, "result")
+
+    def result_csv(self, job_id):
+        """Results exported as CSV (made once, on first request), or None."""
+        path = self.frame_path(job_id, "result")
+        if not os.path.exists(path):
+            return None
+        csv_path = self.frame_path(job_id, "result", "csv")
+        if not os.path.exists(csv_path):
+            export_csv(path, csv_path)
+        return csv_path
+
+    def display_buffer(self, job_id):
+        """Live DisplayBuffer of a running job, or None."""
+        return self.views.get(job_id)
+
+    # -- state ----------------------------------------------------------
+
+    def update(self, job_id, **fields):
+        fields["updated"] = time.time()
+        assignments = ", ".join(f"{key} = ?" for key in fields)
+        with self.lock, self.connect() as conn:
+            conn.execute(f"UPDATE jobs SET {assignments} WHERE id = ?", (*fields.values(), job_id))
+
+    def get(self, job_id):
+        if not job_id:
+            return None
+        with self.connect() as conn:
+            conn.row_factory = sqlite3.Row
+            row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._decode(row) if row else None
+
+    def list(self, limit=20):
+        """Most recent jobs first."""
+        with self.connect() as conn:
+            conn.row_factory = sqlite3.Row
+            rows = conn.execute("SELECT * FROM jobs ORDER BY created DESC LIMIT ?", (limit,)).fetchall()
+        return [self._decode(row) for row in rows]
+
+    @staticmethod
+    def _decode(row):
+        job = dict(row)
+        job["params"] = json.loads(job["params"] or "{}")
+        job["messages"] = json.loads(job["messages"] or "[]")
+        return job
+
+    # -- running --------------------------------------------------------
+
+    def submit(self, kind, df=None, **params):
+        """
+        Queue a job over a copy of `df`, or over what its params point at
+        (a scrape's `source` file). Params must be JSON-serialisable.
+        """
+        if kind not in JOB_KINDS:
+            raise ValueError(f"Unknown job kind: {kind}")
+        job_id = uuid.uuid4().hex[:12]
+        if df is not None:
+            self.save_frame(job_id, "input", df)
+        now = time.time()
+        with self.lock, self.connect() as conn:
+            conn.execute(
+                "INSERT INTO jobs (id, kind, status, params, total, created, updated) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (job_id, kind, QUEUED, json.dumps(params), 0 if df is None else len(df), now, now),
+            )
+        cancel_event = threading.Event()
+        self.cancel_events[job_id] = cancel_event
+        self.executor.submit(self._run, job_id, kind, params, cancel_event)
+        return job_id
+
+    def cancel(self, job_id):
+        """Ask a job to stop; rows already in flight still finish."""
+        event = self.cancel_events.get(job_id)
+        if event is not None:
+            event.set()
+
+    def _run(self, job_id, kind, params, cancel_event):
+        if cancel_event.is_set():
+            self.update(job_id, status=CANCELLED, finished=time.time())
+            return
+        self.update(job_id, status=RUNNING, started=time.time())
+        status, error = DONE, None
+        try:
+            df = self.load_frame(job_id, "input")
+            ctx = JobContext(self, job_id, cancel_event, DisplayBuffer(pd.DataFrame() if df is None else df))
+            self.views[job_id] = ctx.view
+            result = JOB_KINDS[kind](ctx, df, **params)
+            if result is not None:
+                ctx.snapshot(result, force=True)
+            if cancel_event.is_set():
+                status = CANCELLED
+        except Exception as e:
+            logger.exception(f"Job {job_id} ({kind}) failed")
+            status, error = FAILED, str(e)
+        finally:
+            self.cancel_events.pop(job_id, None)
+            self.views.pop(job_id, None)
+            self.update(job_id, status=status, error=error, finished=time.time())
+
+
+_manager = None
+_manager_lock = threading.Lock()
+
+
+def get_job_manager():
+    """Process-wide manager; Streamlit reruns and sessions all share it."""
+    global _manager
+    with _manager_lock:
+        if _manager is None:
+            _manager = JobManager()
+        return _manager
+
+
+def set_job_manager(manager):
+    global _manager
+    with _manager_lock:
+        _manager = manager
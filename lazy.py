@@ -0,0 +1,94 @@
+# lazy.py
+"""
+Deferred imports for heavy dependencies.
+
+Importing the app (main -> ui -> processing -> scraper) used to import
+openai, selenium, playwright, cloudscraper, PIL, geotext, phonenumbers and
+webdriver_manager before the first page painted, and Streamlit paid for
+it on every cold start. Modules used in only one or two functions are now
+imported inside them. Modules used throughout a file are bound to a proxy
+that imports the real module the first time an attribute is used:
+
+    openai = lazy_import("openai")
+    openai.chat.completions.create(...)      # imports openai here
+
+lazy_import returns one proxy per module name, and first use is
+thread-safe (scrape workers may race to it). on_load hooks run once, after
+the import and before the module is handed out; config uses one to apply
+the OpenAI key and base URL. load_times() reports what each deferred
+import cost when it was paid; see import_profile.py for the startup side.
+"""
+
+import importlib
+import sys
+import threading
+import time
+
+_lock = threading.RLock()
+_proxies = {}
+_load_times = {}
+
+
+class LazyModule:
+    """Stands in for a module until one of its attributes is used."""
+
+    def __init__(self, name):
+        object.__setattr__(self, "_lazy_name", name)
+        object.__setattr__(self, "_lazy_module", None)
+        object.__setattr__(self, "_lazy_hooks", [])
+
+    def _load(self):
+        module = self._lazy_module
+        if module is None:
+            with _lock:
+                module = self._lazy_module
+                if module is None:
+                    started = time.perf_counter()
+                    module = importlib.import_module(self._lazy_name)
+                    for hook in self._lazy_hooks:
+                        hook(module)
+                    _load_times[self._lazy_name] = (time.perf_counter() - started) * 1000
+                    object.__setattr__(self, "_lazy_module", module)
+        return module
+
+    def __getattr__(self, attr):
+        return getattr(self._load(), attr)
+
+    def __setattr__(self, attr, value):
+        setattr(self._load(), attr, value)
+
+    def __dir__(self):
+        return dir(self._load())
+
+    def __repr__(self):
+        state = "loaded" if self._lazy_module is not None else "not loaded"
+        return f"<lazy module {self._lazy_name!r} ({state})>"
+
+
+def lazy_import(name, on_load=None):
+    """
+    Proxy for module `name`, imported on first attribute access. on_load(module)
+    runs once the module is imported (right away if the proxy is already loaded,
+    or if something else has imported the module).
+    """
+    with _lock:
+        proxy = _proxies.get(name)
+        if proxy is None:
+            proxy = _proxies[name] = LazyModule(name)
+        if on_load is not None:
+            proxy._lazy_hooks.append(on_load)
+            if proxy._lazy_module is not None:
+                on_load(proxy._lazy_module)
+            elif name in sys.modules:
+                proxy._load()
+    return proxy
+
+
+def is_loaded(name):
+    proxy = _proxies.get(name)
+    return proxy._lazy_module is not None if proxy is not None else name in sys.modules
+
+
+def load_times():
+    """{module: ms} for deferred imports that have happened so far."""
+    return {name: round(ms, 1) for name, ms in _load_times.items()}
@@ -1,12 +1,9 @@
 import streamlit as st
 from state_manager import StateManager
 from dotenv import load_dotenv
-import openai
-import os
 
-# Load environment variables first
+# Load environment variables first; config applies the OpenAI key when openai is first used
 load_dotenv()
-openai.api_key = os.getenv("OPENAI_API_KEY")
 
 # Initialize state before importing UI
 StateManager.init_state()
@@ -0,0 +1,311 @@
+# politeness.py
+"""
+Central rate limiting for outbound scraping traffic.
+
+Replaces the fixed time.sleep() calls that used to throttle every request
+the same way. Each host gets its own token bucket (plus any robots.txt
+Crawl-delay and adaptive backoff after 429/503), and a global semaphore caps
+how many requests are in flight at once. Requests to different hosts no
+longer wait on each other, so throughput grows with the number of distinct
+domains while each site still sees a polite request rate.
+
+Most callers never touch the scheduler directly: mount PoliteAdapter on a
+requests.Session and every request made through it is scheduled, retries
+included: the adapter makes them itself (per its max_retries policy)
+instead of letting urllib3 retry underneath the scheduler.
+
+Settings (environment):
+    SCRAPE_MAX_CONCURRENCY  global cap on in-flight requests (default 8)
+    HOST_RATE               steady requests/second per host (default 1.0)
+    HOST_BURST              requests a host may receive back-to-back (default 3)
+    RESPECT_CRAWL_DELAY     "0" to ignore robots.txt Crawl-delay (default on)
+    MAX_BACKOFF_SECONDS     ceiling for 429/503 backoff (default 120)
+"""
+
+import contextlib
+import logging
+import os
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlsplit
+from urllib.robotparser import RobotFileParser
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import MaxRetryError, ProtocolError
+from urllib3.util.retry import Retry
+
+logger = logging.getLogger(__name__)
+
+SCRAPE_MAX_CONCURRENCY = int(os.getenv("SCRAPE_MAX_CONCURRENCY", "8"))
+HOST_RATE = float(os.getenv("HOST_RATE", "1.0"))
+HOST_BURST = float(os.getenv("HOST_BURST", "3"))
+RESPECT_CRAWL_DELAY = os.getenv("RESPECT_CRAWL_DELAY", "1") != "0"
+MAX_BACKOFF_SECONDS = float(os.getenv("MAX_BACKOFF_SECONDS", "120"))
+
+BACKOFF_STATUSES = {429, 503}
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
+
+
+def host_key(url):
+    host = (urlsplit(url).hostname or "").lower()
+    return host[4:] if host.startswith("www.") else host
+
+
+def parse_retry_after(value):
+    """Retry-After is either delta-seconds or an HTTP date."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class TokenBucket:
+    """
+    Reservation-style token bucket: reserve() never blocks, it returns how
+    long the caller must wait for its token. Tokens may go negative, which
+    queues callers fairly behind each other.
+    """
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def reserve(self, interval_scale=1.0):
+        now = time.monotonic()
+        rate = self.rate / interval_scale
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * rate)
+        self.updated = now
+        self.tokens -= 1
+        return 0.0 if self.tokens >= 0 else -self.tokens / rate
+
+
+class HostState:
+    def __init__(self, rate, burst):
+        self.bucket = TokenBucket(rate, burst)
+        self.crawl_delay = None  # None = robots.txt not checked yet
+        self.robots_lock = threading.Lock()  # one robots.txt fetch per host
+        self.next_allowed = 0.0  # monotonic time; enforces crawl-delay spacing
+        self.blocked_until = 0.0
+        self.backoff_level = 0
+        self.requests = 0
+        self.throttled = 0
+
+
+class PolitenessScheduler:
+    def __init__(self, max_concurrency=SCRAPE_MAX_CONCURRENCY, host_rate=HOST_RATE,
+                 host_burst=HOST_BURST, respect_crawl_delay=RESPECT_CRAWL_DELAY,
+                 max_backoff=MAX_BACKOFF_SECONDS):
+        self.max_concurrency = max_concurrency
+        self.host_rate = host_rate
+        self.host_burst = host_burst
+        self.respect_crawl_delay = respect_crawl_delay
+        self.max_backoff = max_backoff
+        self.semaphore = threading.BoundedSemaphore(max_concurrency)
+        self.lock = threading.Lock()
+        self.hosts = {}
+        self.waited_seconds = 0.0
+
+    def host(self, key):
+        with self.lock:
+            state = self.hosts.get(key)
+            if state is None:
+                state = self.hosts[key] = HostState(self.host_rate, self.host_burst)
+            return state
+
+    def load_crawl_delay(self, url, fetch_robots):
+        """Look up robots.txt Crawl-delay once per host; concurrent first requests wait for that lookup."""
+        key = host_key(url)
+        state = self.host(key)
+        if state.crawl_delay is not None or not self.respect_crawl_delay or fetch_robots is None:
+            return
+        with state.robots_lock:
+            if state.crawl_delay is None:
+                self._fetch_crawl_delay(key, state, url, fetch_robots)
+
+    def _fetch_crawl_delay(self, key, state, url, fetch_robots):
+        delay = 0.0
+        try:
+            parts = urlsplit(url)
+            text = fetch_robots(f"{parts.scheme}://{parts.netloc}/robots.txt")
+            if text:
+                parser = RobotFileParser()
+                parser.parse(text.splitlines())
+                delay = float(parser.crawl_delay(USER_AGENT) or parser.crawl_delay("*") or 0)
+        except Exception as e:
+            logger.debug(f"robots.txt lookup failed for {key}: {e}")
+        with self.lock:
+            state.crawl_delay = min(delay, self.max_backoff)
+        if delay:
+            logger.info(f"{key}: honouring Crawl-delay of {delay}s")
+
+    def reserve(self, url):
+        """Book the next slot for this host and return how long to wait."""
+        state = self.host(host_key(url))
+        with self.lock:
+            now = time.monotonic()
+            wait = state.bucket.reserve(interval_scale=2 ** state.backoff_level)
+            start = max(now + wait, state.next_allowed, state.blocked_until)
+            if state.crawl_delay:
+                state.next_allowed = start + state.crawl_delay
+            state.requests += 1
+            if start > now:
+                state.throttled += 1
+                self.waited_seconds += start - now
+            return start - now
+
+    @contextlib.contextmanager
+    def slot(self, url, fetch_robots=None):
+        """Wait for the host's turn, then hold one of the global slots."""
+        self.load_crawl_delay(url, fetch_robots)
+        wait = self.reserve(url)
+        if wait > 0:
+            time.sleep(wait)
+        with self.semaphore:
+            yield
+
+    def record(self, url, status_code, retry_after=None):
+        """Feed a response back in: 429/503 back the host off, success relaxes it."""
+        state = self.host(host_key(url))
+        with self.lock:
+            if status_code in BACKOFF_STATUSES:
+                state.backoff_level += 1
+                delay = min(self.max_backoff, max(parse_retry_after(retry_after) or 0.0,
+                                                  2.0 ** state.backoff_level))
+                state.blocked_until = max(state.blocked_until, time.monotonic() + delay)
+                logger.warning(f"{host_key(url)} answered {status_code}; backing off {delay:.1f}s")
+            elif status_code and status_code < 400 and state.backoff_level:
+                state.backoff_level -= 1
+
+    def stats(self):
+        with self.lock:
+            return {
+                "hosts": len(self.hosts),
+                "requests": sum(s.requests for s in self.hosts.values()),
+                "throttled": sum(s.throttled for s in self.hosts.values()),
+                "waited_s": round(self.waited_seconds, 2),
+                "backed_off_hosts": sorted(k for k, s in self.hosts.items() if s.backoff_level),
+            }
+
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+def get_scheduler():
+    """Process-wide scheduler shared by every session and helper."""
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = PolitenessScheduler()
+        return _scheduler
+
+
+def set_scheduler(scheduler):
+    global _scheduler
+    with _scheduler_lock:
+        _scheduler = scheduler
+
+
+def transport_error(exc):
+    """Connection failures and timeouts raised by urllib3 (retryable, unlike errors from a custom transport)."""
+    if isinstance(exc, requests.Timeout):
+        return True
+    cause = exc.args[0] if exc.args else None
+    return isinstance(cause, (MaxRetryError, ProtocolError))
+
+
+class PoliteAdapter(HTTPAdapter):
+    """
+    HTTPAdapter that routes every request through the politeness scheduler.
+    Subclasses that need to change how bytes reach the wire override
+    transport_send() rather than send().
+
+    max_retries is applied here rather than by urllib3, so each retry waits
+    for the host's turn (and Crawl-delay) like any other request.
+    """
+
+    def __init__(self, scheduler=None, max_retries=0, **kwargs):
+        self.scheduler = scheduler
+        self.retry_policy = max_retries if isinstance(max_retries, Retry) else Retry.from_int(max_retries)
+        super().__init__(max_retries=Retry(0, read=False), **kwargs)
+
+    def retries_left(self, attempt, method):
+        total = self.retry_policy.total
+        limit = total if isinstance(total, int) else 0
+        methods = self.retry_policy.allowed_methods
+        return attempt < limit and (methods is None or method.upper() in methods)
+
+    def retry_delay(self, attempt):
+        return min(self.retry_policy.backoff_factor * (2 ** attempt), MAX_BACKOFF_SECONDS)
+
+    def transport_send(self, request, **kwargs):
+        return super().send(request, **kwargs)
+
+    def fetch_robots(self, robots_url):
+        # Goes straight to the transport so it isn't scheduled behind itself
+        request = requests.Request("GET", robots_url, headers={"User-Agent": USER_AGENT}).prepare()
+        resp = self.transport_send(request, timeout=5)
+        return resp.text if resp.status_code == 200 else ""
+
+    def send(self, request, **kwargs):
+        scheduler = self.scheduler or get_scheduler()
+        attempt = 0
+        while True:
+            try:
+                with scheduler.slot(request.url, fetch_robots=self.fetch_robots):
+                    resp = self.transport_send(request, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                if not (transport_error(e) and self.retries_left(attempt, request.method)):
+                    raise
+                logger.debug(f"Retrying {request.url} after {e}")
+            else:
+                scheduler.record(request.url, resp.status_code, resp.headers.get("Retry-After"))
+                if not (self.retries_left(attempt, request.method)
+                        and self.retry_policy.is_retry(request.method, resp.status_code)):
+                    return resp
+                resp.close()
+            time.sleep(self.retry_delay(attempt))
+            attempt += 1
+
+
+def mount_polite_adapter(session, scheduler=None, **adapter_kwargs):
+    adapter = PoliteAdapter(scheduler=scheduler, **adapter_kwargs)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def ensure_polite(session):
+    """Mount PoliteAdapter unless the session already schedules its traffic."""
+    if not isinstance(session.get_adapter("https://"), PoliteAdapter):
+        mount_polite_adapter(session, max_retries=1)
+    return session
+
+
+def polite_get(url, getter=None, **kwargs):
+    """
+    Scheduled GET for clients that bypass our sessions (cloudscraper, the
+    external proxy). `getter` defaults to requests.get.
+    """
+    scheduler = get_scheduler()
+    with scheduler.slot(url):
+        resp = (getter or requests.get)(url, **kwargs)
+    scheduler.record(url, resp.status_code, resp.headers.get("Retry-After"))
+    return resp
+
+
+@contextlib.contextmanager
+def polite(url):
+    """For traffic that doesn't go through a requests adapter (e.g. a browser)."""
+    with get_scheduler().slot(url):
+        yield
@@ -6,6 +6,7 @@ import pandas as pd
 from urllib.parse import urljoin
 from io import StringIO
 import os
+from concurrent.futures import ThreadPoolExecutor, as_completed
 import streamlit as st
 from bs4 import BeautifulSoup
 
@@ -24,11 +25,23 @@ from scraper import (
     build_absolute_url,
     extract_contact_info,  # Added this
     extract_footer_content,  # Added this
-    extract_address_fields_gpt  # Added this
+    extract_address_fields_gpt,  # Added this
+    EscalationStats,
+    get_job_stats,
+    set_job_stats
 )
+from render_pool import get_render_pool, needs_js_render
 from extraction import extract_contact_info
-from gpt_helpers import extract_address_fields_gpt
+from gpt_helpers import extract_address_fields_gpt, extract_city_country_gpt, fix_country_code, generate_gpt_description
 from duckduckgo import get_address_and_phone_from_duckduckgo
+from politeness import ensure_polite
+import dns_cache
+from text_store import resolve_text, store_text
+from config import SCRAPE_WORKERS
+from address_normalize import normalize_addresses
+from regex import get_patterns_for_country
+
+UK_PATTERNS = get_patterns_for_country("GB")
 
 # ---------------------------
 # Utility Functions
@@ -39,79 +52,8 @@ def auto_download_csv(df, prefix=""):
     return
 
 def cleanup_address_lines(df):
-    """Enhanced address cleanup that properly splits components"""
-    for i, row in df.iterrows():
-        full_address = str(row.get('Full address', '')).strip()
-        if not full_address:
-            continue
-
-        # 1. Ensure country is in full address
-        country = row.get('Country', '').strip()
-        if country and country.lower() not in full_address.lower():
-            if country.lower() in ['uk', 'gb']:
-                country = 'United Kingdom'
-            full_address = f"{full_address}, {country}"
-            df.at[i, 'Full address'] = full_address
-
-        # 2. Split components by comma
-        components = [comp.strip() for comp in full_address.split(',')]
-        if len(components) < 3:
-            continue  # Not enough components for valid address
-
-        # 3. Process components from end to start
-        for comp in reversed(components):
-            comp = comp.strip()
-            
-            # Check for postcode
-            if re.match(r'^[A-Z]{1,2}\d[A-Z\d]?\s*\d[A-Z]{2}$', comp, re.I):
-                df.at[i, 'Post code'] = comp
-                components.remove(comp)
-                continue
-                
-            # Check for country
-            if comp.lower() in ['united kingdom', 'uk', 'great britain', 'england']:
-                df.at[i, 'Country'] = 'United Kingdom'
-                components.remove(comp)
-                continue
-                
-            # Check for known cities
-            if any(city in comp.lower() for city in ['london', 'manchester', 'birmingham', 'leeds', 'letchworth']):
-                df.at[i, 'City'] = comp
-                components.remove(comp)
-                continue
-
-        # 4. Handle remaining components
-        if components:
-            # If 3 or more components remain, combine first two for Address line 1
-            if len(components) >= 3:
-                df.at[i, 'Address line 1'] = f"{components[0]}, {components[1]}"
-                if len(components) > 3:
-                    df.at[i, 'Address line 2'] = components[2]
-                # If city wasn't found earlier, use the last component
-                if not df.at[i, 'City']:
-                    df.at[i, 'City'] = components[-1]
-            # If 2 components remain
-            elif len(components) == 2:
-                df.at[i, 'Address line 1'] = components[0]
-                df.at[i, 'Address line 2'] = components[1]
-            # If only 1 component remains
-            elif len(components) == 1:
-                df.at[i, 'Address line 1'] = components[0]
-
-        # 5. Ensure Country and Country code are set correctly
-        if df.at[i, 'Country'] == 'United Kingdom':
-            df.at[i, 'Country code'] = 'GB'
-        
-        print(f"Cleaned address for row {i}:")
-        print(f"Full address: {df.at[i, 'Full address']}")
-        print(f"Address line 1: {df.at[i, 'Address line 1']}")
-        print(f"Address line 2: {df.at[i, 'Address line 2']}")
-        print(f"City: {df.at[i, 'City']}")
-        print(f"Post code: {df.at[i, 'Post code']}")
-        print(f"Country: {df.at[i, 'Country']}")
-        print("-" * 50)
-
-    return df
+    """Enhanced address cleanup that properly splits components (vectorized; see address_normalize.py)"""
+    return normalize_addresses(df)
 
 def ensure_string_format(value):
     # Minimal implementation: always return a string
@@ -164,12 +106,11 @@ def extract_postcode_from_text(text):
     if ch_match:
         return ch_match.group(1).strip()
     
-    # Then try general UK postcode pattern
-    uk_pattern = r"[A-Z]{1,2}\d[A-Z\d]?\s*\d[A-Z]{2}"
-    postcode_matches = re.findall(uk_pattern, text, re.IGNORECASE)
-    if postcode_matches:
-        postcode = re.sub(r'\s+', ' ', postcode_matches[0].strip())
-        if re.match(r'^[A-Z]{1,2}\d[A-Z\d]? \d[A-Z]{2}$', postcode, re.I):
+    # Then try the general UK postcode pattern (regex.PATTERN_REGISTRY)
+    postcode = UK_PATTERNS.find_postcode(text)
+    if postcode:
+        postcode = re.sub(r'\s+', ' ', postcode)
+        if UK_PATTERNS.is_postcode(postcode):
             return postcode
     return None
 
@@ -194,10 +135,20 @@ def process_row(i, row, df, s, final_type, gig_synonyms):
             
         # Parse content
         soup = BeautifulSoup(resp.text, "html.parser")
+        main_content = soup.get_text(separator=" ", strip=True)
+        
+        # Wix/Squarespace-style pages: render through the shared browser pool
+        if needs_js_render(resp.text, main_content):
+            pool = get_render_pool()
+            rendered = pool.render(final_url) if pool else None
+            if rendered:
+                print(f"Rendered {final_url} with JavaScript")
+                get_job_stats().bump("js_rendered")
+                soup = BeautifulSoup(rendered, "html.parser")
+                main_content = soup.get_text(separator=" ", strip=True)
         
         # Get footer and main content
         footer_content = extract_footer_content(soup)  # Now properly imported from scraper.py
-        main_content = soup.get_text(separator=" ", strip=True)
         combined_text = f"{main_content}\n{footer_content}"
         
         # Extract contact info from combined text
@@ -234,7 +185,7 @@ def process_row(i, row, df, s, final_type, gig_synonyms):
                 
                 if business_name:
                     print(f"Running DuckDuckGo search for: {business_name}")
-                    duck_address, duck_phones = get_address_and_phone_from_duckduckgo(business_name, country)
+                    duck_address, duck_phones = get_address_and_phone_from_duckduckgo(business_name, country, session=s)
                     
                     if duck_address:
                         # Update address fields
@@ -294,8 +245,8 @@ def process_row(i, row, df, s, final_type, gig_synonyms):
         df.at[i, "YoutubeURL"] = social["youtube_url"] or ""
         df.at[i, "TiktokURL"] = social["tiktok_url"] or ""
         
-        # Store raw text for later use
-        df.at[i, "ScrapedText"] = combined_text
+        # Store raw text for later use (compressed side store; the cell holds a reference)
+        df.at[i, "ScrapedText"] = store_text(combined_text)
         
         # Special handling for venues - look for gig listings
         if final_type.lower() == "venues":
@@ -311,8 +262,107 @@ def process_row(i, row, df, s, final_type, gig_synonyms):
     except Exception as e:
         df.at[i, "Error"] = f"Processing error: {str(e)}"
         print(f"⚠️ Error processing row {i + 1}: {e}")
-        
-    time.sleep(1)  # Rate limiting
+
+def process_rows(df, s, final_type, gig_synonyms, workers=SCRAPE_WORKERS, on_row_done=None, stop_event=None,
+                 skip=None):
+    """
+    Run process_row over every row with a pool of worker threads.
+
+    All domains are resolved up front (dns_cache.precheck); rows whose domain
+    does not exist are marked and skipped without any HTTP. Rows for
+    different sites run side by side; per-host pacing is left to the
+    politeness scheduler on the session, so nothing here sleeps. Each
+    worker fills a private one-row frame and results are copied back into
+    `df` on the calling thread, which is also where on_row_done(i, done, total)
+    runs, so Streamlit widgets can be updated from it.
+
+    Contact-page escalation counts for the job are left in
+    df.attrs["escalation"] (see scraper.EscalationStats).
+
+    Setting `stop_event` (a threading.Event) cancels the rows not yet
+    started; rows already in flight are finished and copied back. Rows whose
+    index is in `skip` are left as they are (but still reported done).
+    """
+    ensure_polite(s)
+    dns_cache.install()
+    total = len(df)
+    skip = skip or set()
+    dns_status = dns_cache.precheck(str(url) for i, url in df["URL"].items() if str(url).strip() and i not in skip)
+
+    escalation = EscalationStats()
+
+    def work(i, row):
+        row_df = df.loc[[i]].copy()
+        set_job_stats(escalation)
+        try:
+            process_row(i, row, row_df, s, final_type, gig_synonyms)
+        except Exception as e:
+            row_df.at[i, "Error"] = f"Processing error: {e}"
+        finally:
+            set_job_stats(None)
+        return i, row_df
+
+    done = 0
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        futures = []
+        for i, row in df.iterrows():
+            if i in skip:
+                done += 1
+                if on_row_done:
+                    on_row_done(i, done, total)
+                continue
+            if dns_status.get(dns_cache.bare_domain(row.get("URL", ""))) == dns_cache.NXDOMAIN:
+                df.at[i, "Error"] = dns_cache.DEAD_DOMAIN_ERROR
+                print(f"Skipping row {i + 1}: {row.get('URL')} does not resolve")
+                done += 1
+                if on_row_done:
+                    on_row_done(i, done, total)
+                continue
+            futures.append(pool.submit(work, i, row))
+        for future in as_completed(futures):
+            if stop_event is not None and stop_event.is_set():
+                for f in futures:
+                    f.cancel()
+            if future.cancelled():
+                continue
+            i, row_df = future.result()
+            for col in row_df.columns:
+                if col not in df.columns:
+                    df[col] = ""
+                df.at[i, col] = row_df.at[i, col]
+            done += 1
+            if on_row_done:
+                on_row_done(i, done, total)
+    df.attrs["escalation"] = escalation.summary()
+    return df
+
+def enrich_rows(df, on_row_done=None, stop_event=None):
+    """
+    GPT pass over scraped rows: a Description where there is none, and
+    City/Country (with the country code) where they are missing.
+    on_row_done(i, done, total) is called after every row.
+    """
+    total = len(df)
+    for done, (i, row) in enumerate(df.iterrows(), start=1):
+        if stop_event is not None and stop_event.is_set():
+            break
+        txt = resolve_text(row.get("ScrapedText", "")).strip()
+        if not str(row.get("Description", "")).strip() and txt:
+            df.at[i, "Description"] = generate_gpt_description(txt)
+
+        city_missing = not str(row.get("City", "")).strip()
+        country_missing = not str(row.get("Country", "")).strip()
+        if (city_missing or country_missing) and txt:
+            loc_info = extract_city_country_gpt(txt)
+            if loc_info:
+                if city_missing and loc_info.get("City", "").strip():
+                    df.at[i, "City"] = loc_info["City"].strip()
+                if country_missing and loc_info.get("Country", "").strip():
+                    df.at[i, "Country"] = loc_info["Country"].strip()
+                    df.at[i, "Country code"] = fix_country_code(df.loc[i])
+        if on_row_done:
+            on_row_done(i, done, total)
+    return df
 
 def validate_required_columns(df):
     """Check if DataFrame has minimum required columns"""
@@ -359,18 +409,12 @@ if __name__ == "__main__":
     # Optionally, define final_type and gig_synonyms as needed.
     final_type = "Services"
     gig_synonyms = []  # or list your synonyms here
-    # Create a requests session with default settings.
-    import requests
-    from requests.adapters import HTTPAdapter
-    session = requests.Session()
-    adapter = HTTPAdapter(max_retries=1)
-    session.mount("http://", adapter)
-    session.mount("https://", adapter)
+    # Shared pooled session, paced by the politeness scheduler
+    from http_client import shared_session
+    session = shared_session()
 
-    # Process each row in the DataFrame
-    for i, row in sample_df.iterrows():
-        process_row(i, row, sample_df, session, final_type, gig_synonyms)
-        time.sleep(1)
+    # Process the rows concurrently
+    process_rows(sample_df, session, final_type, gig_synonyms)
     
     # Cleanup address lines and print the final DataFrame
     sample_df = cleanup_address_lines(sample_df)
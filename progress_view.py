@@ -0,0 +1,97 @@
+# progress_view.py
+"""
+Live results table for running jobs.
+
+The old progress loop copied the whole frame after every row, re-stringified
+the list columns and pushed every row to the browser again: O(n^2) work and
+traffic over a run. A DisplayBuffer keeps a display-ready (all strings)
+copy instead, and a job updates only the row that just finished. The UI
+polls at a fixed interval and sends a single window of the buffer, either
+the most recently finished rows or one page, so each refresh costs the
+same however big the sheet is.
+
+    view = DisplayBuffer(df)
+    view.update(df, i)                 # after row i changes (any thread)
+    view.latest(50)                    # last 50 rows to finish, newest first
+    view.page(3, 50)                   # rows 100-149 in sheet order
+
+Settings (environment):
+    PROGRESS_PAGE_SIZE        rows per window (default 50)
+    PROGRESS_CELL_MAX_CHARS   long cells (ScrapedText) are cut to this (default 200)
+"""
+
+import math
+import os
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+
+from state_manager import StateManager
+
+PROGRESS_PAGE_SIZE = int(os.getenv("PROGRESS_PAGE_SIZE", "50"))
+PROGRESS_CELL_MAX_CHARS = int(os.getenv("PROGRESS_CELL_MAX_CHARS", "200"))
+
+
+def display_value(value, max_chars=PROGRESS_CELL_MAX_CHARS):
+    text = StateManager.ensure_string_format(value)
+    if max_chars and len(text) > max_chars:
+        return text[:max_chars - 1] + "…"
+    return text
+
+
+class DisplayBuffer:
+    """Stringified rows of a frame, kept in step with it one row at a time."""
+
+    def __init__(self, df, max_chars=PROGRESS_CELL_MAX_CHARS):
+        self.max_chars = max_chars
+        self.lock = threading.Lock()
+        self.version = 0
+        self.refresh(df)
+
+    def _row(self, df, i):
+        return [display_value(df.at[i, col], self.max_chars) for col in self.columns]
+
+    def refresh(self, df):
+        """Rebuild from scratch, for steps that touch every row at once."""
+        with self.lock:
+            self.columns = list(df.columns)
+            self.index = list(df.index)
+            self.rows = {i: self._row(df, i) for i in self.index}
+            self.finished = OrderedDict()
+            self.version += 1
+
+    def update(self, df, i):
+        """Re-stringify row i only."""
+        with self.lock:
+            new_columns = [col for col in df.columns if col not in self.columns]
+            if new_columns:
+                # A step added columns; pad the rows already stringified
+                self.columns.extend(new_columns)
+                for row in self.rows.values():
+                    row.extend([""] * len(new_columns))
+            if i not in self.rows:
+                self.index.append(i)
+            self.rows[i] = self._row(df, i)
+            self.finished.pop(i, None)
+            self.finished[i] = True
+            self.version += 1
+
+    def _frame(self, indices):
+        return pd.DataFrame([self.rows[i] for i in indices], index=indices, columns=self.columns)
+
+    def latest(self, size=PROGRESS_PAGE_SIZE):
+        """The rows finished most recently, newest first."""
+        with self.lock:
+            indices = list(self.finished)[-size:][::-1]
+            return self._frame(indices)
+
+    def page(self, number, size=PROGRESS_PAGE_SIZE):
+        """Page `number` (0-based) in sheet order."""
+        with self.lock:
+            start = max(0, number) * size
+            return self._frame(self.index[start:start + size])
+
+    def page_count(self, size=PROGRESS_PAGE_SIZE):
+        with self.lock:
+            return max(1, math.ceil(len(self.index) / size))
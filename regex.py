@@ -1,7 +1,25 @@
 # regex.py
+"""
+Postcode, phone and address-keyword patterns by country.
+
+PATTERN_REGISTRY is built once at import. It maps every alpha2 code to a
+CountryPatterns with compiled matchers: the country's own patterns where
+COUNTRY_REGEX has them, else its region's. get_patterns_for_country
+accepts a name, variant or code (see countries.py). Countries without
+patterns get OTHER_PATTERNS, whose matchers find nothing.
+
+    patterns = get_patterns_for_country("UK")
+    patterns.find_postcode(text)      # "LA2 9AN" or ""
+    patterns.is_postcode("LA2 9AN")   # full-match validation
+    patterns.has_postcode(page_text)  # strict: a real postcode appears in the text
+    patterns.find_phones(text)        # ["+44 1524 123456", ...]
+    patterns.has_keyword(line)        # street, road, ... for that country
+
+Extractors share these objects and do not compile patterns per call.
+"""
 
 import re
-from countries import get_country_code  # We import our helper that fetches alpha2 from a country name
+from countries import COUNTRY_NAMES, get_country_code  # We import our helper that fetches alpha2 from a country name
 
 ################################################################################
 # Base Regex Patterns for Specific Countries
@@ -19,10 +37,15 @@ CANADA_PHONE_REGEX = re.compile(
 
 # -- USA
 US_ZIPCODE_REGEX = re.compile(r"\b\d{5}(?:-\d{4})?\b")
+US_ZIPCODE_FULL_REGEX = re.compile(r"\d{5}(?:-\d{4})?")
 US_PHONE_REGEX = re.compile(r"\+?1?\s*\(?\d{3}\)?[-.\s]?\d{3}[-.\s]?\d{4}")
 
 # -- UK
-UK_POSTCODE_REGEX = re.compile(r"(?i)([A-Z]{1,2}\d[A-Z\d]? ?\d[A-Z]{2})")
+UK_POSTCODE_REGEX = re.compile(r"\b[A-Z]{1,2}\d[A-Z\d]?\s*\d[A-Z]{2}\b", re.IGNORECASE)
+# Validation: a full postcode with exactly one space (e.g. "LA2 9AN")
+UK_POSTCODE_FULL_REGEX = re.compile(r"[A-Z]{1,2}\d[A-Z\d]? \d[A-Z]{2}", re.IGNORECASE)
+# Detection: case-sensitive, so "2nd floor" or "mp3 4th" are not taken for postcodes
+UK_POSTCODE_STRICT_REGEX = re.compile(r"\b[A-Z]{1,2}\d[A-Z\d]?\s?\d[A-Z]{2}\b")
 UK_PHONE_REGEX = re.compile(
     r"((\+44\s?(\(0\))?)|0)\s?\(?\d{2,5}\)?[\s.-]?\d{2,5}[\s.-]?\d{2,6}",
     re.IGNORECASE
@@ -131,10 +154,6 @@ LATAM_PHONE_REGEX = re.compile(
     re.IGNORECASE | re.VERBOSE
 )
 
-# -- Fallback (truly anything)
-FALLBACK_POSTCODE_REGEX = re.compile(r".*")
-FALLBACK_PHONE_REGEX = re.compile(r".*")
-
 ################################################################################
 # Address Keywords (Optional usage)
 ################################################################################
@@ -157,13 +176,16 @@ COUNTRY_REGEX = {
     },
     "US": {
         "postcode": US_ZIPCODE_REGEX,
+        "postcode_full": US_ZIPCODE_FULL_REGEX,
         "phone": US_PHONE_REGEX,
         "address_keywords": DEFAULT_ADDRESS_KEYWORDS + ["zip code", "zipcode", "state", "highway"]
     },
     "GB": {
         "postcode": UK_POSTCODE_REGEX,
+        "postcode_full": UK_POSTCODE_FULL_REGEX,
+        "postcode_strict": UK_POSTCODE_STRICT_REGEX,
         "phone": UK_PHONE_REGEX,
-        "address_keywords": DEFAULT_ADDRESS_KEYWORDS + ["postcode", "post code", "house", "close"]
+        "address_keywords": DEFAULT_ADDRESS_KEYWORDS + ["postcode", "post code", "house", "close", "way", "court"]
     },
     "AU": {
         "postcode": AU_POSTCODE_REGEX,
@@ -260,85 +282,120 @@ LATAM_REGEX_DICT = {
 }
 
 OTHER_REGEX_DICT = {
-    "postcode": FALLBACK_POSTCODE_REGEX,
-    "phone": FALLBACK_PHONE_REGEX,
+    "postcode": None,
+    "phone": None,
     "address_keywords": []
 }
 
+REGION_REGEX = [
+    ("EU", EU_ALPHA2_CODES, EU_REGEX_DICT),
+    ("ASIA", ASIA_ALPHA2_CODES, ASIA_REGEX_DICT),
+    ("AFRICA", AFRICA_ALPHA2_CODES, AFRICA_REGEX_DICT),
+    ("MIDEAST", MIDDLE_EAST_ALPHA2_CODES, MIDEAST_REGEX_DICT),
+    ("LATAM", LATIN_AMERICA_ALPHA2_CODES, LATAM_REGEX_DICT),
+]
+
+################################################################################
+# Compiled Pattern Registry
+################################################################################
+
+def keyword_pattern(keywords):
+    """One compiled alternation matching any keyword as a whole word (None for no keywords)."""
+    if not keywords:
+        return None
+    alternation = "|".join(re.escape(k) for k in sorted(set(keywords), key=len, reverse=True))
+    return re.compile(rf"(?<!\w)(?:{alternation})(?!\w)", re.IGNORECASE)
+
+
+class CountryPatterns:
+    """Compiled matchers for one country; a missing pattern matches nothing."""
+
+    def __init__(self, alpha2, region, postcode=None, phone=None, keywords=(), postcode_full=None,
+                 postcode_strict=None):
+        self.alpha2 = alpha2
+        self.region = region
+        self.postcode = postcode
+        self.postcode_full = postcode_full or postcode
+        self.postcode_strict = postcode_strict or postcode
+        self.phone = phone
+        self.keywords = tuple(keywords)
+        self.keyword = keyword_pattern(self.keywords)
+
+    def find_postcode(self, text):
+        match = self.postcode.search(text or "") if self.postcode else None
+        return match.group(0).strip() if match else ""
+
+    def has_postcode(self, text):
+        """Whether text contains a postcode, by the strict pattern (for early-stop and sufficiency checks)."""
+        return bool(self.postcode_strict and self.postcode_strict.search(text or ""))
+
+    def is_postcode(self, value):
+        """Whether value is a whole postcode; any non-empty value when the country has no pattern."""
+        value = (value or "").strip()
+        if not value or self.postcode_full is None:
+            return bool(value)
+        return bool(self.postcode_full.fullmatch(value))
+
+    def find_phones(self, text):
+        if not self.phone:
+            return []
+        return [m.group(0).strip() for m in self.phone.finditer(text or "") if m.group(0).strip()]
+
+    def has_keyword(self, text):
+        return bool(self.keyword and self.keyword.search(text or ""))
+
+    def __repr__(self):
+        return f"<CountryPatterns {self.alpha2 or '--'} ({self.region})>"
+
+
+def _compile_patterns(alpha2, region, spec):
+    return CountryPatterns(alpha2, region, spec["postcode"], spec["phone"],
+                           spec["address_keywords"], spec.get("postcode_full"), spec.get("postcode_strict"))
+
+
+def _build_registry():
+    codes = set(COUNTRY_NAMES) | set(COUNTRY_REGEX)
+    for _, region_codes, _ in REGION_REGEX:
+        codes |= region_codes
+    registry = {}
+    for alpha2 in sorted(codes):
+        if alpha2 in COUNTRY_REGEX:
+            registry[alpha2] = _compile_patterns(alpha2, alpha2, COUNTRY_REGEX[alpha2])
+            continue
+        for region, region_codes, spec in REGION_REGEX:
+            if alpha2 in region_codes:
+                registry[alpha2] = _compile_patterns(alpha2, region, spec)
+                break
+        else:
+            registry[alpha2] = _compile_patterns(alpha2, "OTHER", OTHER_REGEX_DICT)
+    return registry
+
+
+PATTERN_REGISTRY = _build_registry()
+OTHER_PATTERNS = _compile_patterns("", "OTHER", OTHER_REGEX_DICT)
+
 ################################################################################
 # Main Function
 ################################################################################
 
-def get_patterns_for_country(user_selected_country: str):
+def get_patterns_for_country(user_selected_country: str) -> CountryPatterns:
     """
-    Given a user-selected country name (e.g. "Canada", "Germany", etc.),
-    this function:
-
-    1. Fetches the alpha2 code from countries.py (get_country_code).
-    2. Returns a dict with "postcode", "phone", and "address_keywords" 
-       for that country or a relevant region fallback.
-       If no region match, returns the 'OTHER' fallback.
+    Given a user-selected country (e.g. "Canada", "UK", "DE"), returns its
+    CountryPatterns from PATTERN_REGISTRY: the country's own patterns, its
+    region's, or OTHER_PATTERNS when neither exists.
 
     Example usage:
         patterns = get_patterns_for_country("New Zealand")
-        phone_regex = patterns["phone"]
+        phones = patterns.find_phones(text)
         ...
     """
-    alpha2 = get_country_code(user_selected_country)  # e.g., "CA", "US", "GB", etc.
-
-    # 1) If no alpha2 found at all, just do 'Other' fallback
-    if not alpha2:
-        return OTHER_REGEX_DICT
-
-    # 2) Check if alpha2 is specifically in our COUNTRY_REGEX
-    if alpha2 in COUNTRY_REGEX:
-        return COUNTRY_REGEX[alpha2]
-
-    # 3) Otherwise, see if alpha2 belongs to one of our region sets
-    if alpha2 in EU_ALPHA2_CODES:
-        return EU_REGEX_DICT
-    
-    if alpha2 in ASIA_ALPHA2_CODES:
-        return ASIA_REGEX_DICT
-
-    if alpha2 in AFRICA_ALPHA2_CODES:
-        return AFRICA_REGEX_DICT
-
-    if alpha2 in MIDDLE_EAST_ALPHA2_CODES:
-        return MIDEAST_REGEX_DICT
-
-    if alpha2 in LATIN_AMERICA_ALPHA2_CODES:
-        return LATAM_REGEX_DICT
-
-    # 4) If not recognized in any set, fallback to 'Other'
-    return OTHER_REGEX_DICT
-
-    if user_selected_country.lower() == "uk":
-        patterns["extra_address_pattern"] = r"((?:\d+(?:st|nd|rd|th)\s+Floor,\s+[A-Za-z']+\s+House,\s+\d+\s+Hay's\s+Lane.*))"
-    return patterns
+    alpha2 = get_country_code(user_selected_country or "")  # e.g., "CA", "US", "GB", etc.
+    return PATTERN_REGISTRY.get(alpha2, OTHER_PATTERNS)
 
 def get_postcode_regex(country):
-    """Returns the appropriate postcode regex pattern for the given country."""
-    patterns = {
-        "United Kingdom": r'[A-Z]{1,2}\d[A-Z\d]? \d[A-Z]{2}',
-        "GB": r'[A-Z]{1,2}\d[A-Z\d]? \d[A-Z]{2}',
-        "UK": r'[A-Z]{1,2}\d[A-Z\d]? \d[A-Z]{2}',
-        "United States": r'\d{5}(?:-\d{4})?',
-        "US": r'\d{5}(?:-\d{4})?',
-        # Add more country patterns as needed
-    }
-    return patterns.get(country, "")
+    """Returns the compiled postcode pattern for the given country (None if there is none)."""
+    return get_patterns_for_country(country).postcode
 
 def get_phone_regex(country):
-    """Returns the appropriate phone number regex pattern for the given country."""
-    patterns = {
-        "United Kingdom": r'(?:\+44|0)(?:\s*\(\s*0?\s*\))?[\s-]*([1-9][\d\s-]{8,})',
-        "GB": r'(?:\+44|0)(?:\s*\(\s*0?\s*\))?[\s-]*([1-9][\d\s-]{8,})',
-        "UK": r'(?:\+44|0)(?:\s*\(\s*0?\s*\))?[\s-]*([1-9][\d\s-]{8,})',
-        "United States": r'(?:\+1|1)?[\s-]?\(?([0-9]{3})\)?[\s-]?([0-9]{3})[\s-]?([0-9]{4})',
-        "US": r'(?:\+1|1)?[\s-]?\(?([0-9]{3})\)?[\s-]?([0-9]{3})[\s-]?([0-9]{4})',
-        # Add more country patterns as needed
-    }
-    return patterns.get(country, "")
-
-# Placeholder for regex helper functions if required by the application.
+    """Returns the compiled phone number pattern for the given country (None if there is none)."""
+    return get_patterns_for_country(country).phone
@@ -0,0 +1,325 @@
+# render_pool.py
+"""
+Shared JS rendering service for the processing engine.
+
+One Chromium runs on a background asyncio thread with a fixed number of
+browser contexts (RENDER_POOL_SIZE). Worker threads submit render jobs and
+get a concurrent.futures.Future back, so rows for Wix/Squarespace-style
+sites render side by side instead of each blocking on its own browser.
+
+    pool = get_render_pool()          # None if disabled or Chromium is missing
+    html = pool.render(url, timeout=30)
+
+Each job has its own timeout. A context is recycled (closed and replaced)
+after RENDER_CONTEXT_MAX_PAGES pages, when a page's JS heap goes over
+RENDER_CONTEXT_MAX_HEAP_MB, or when the browser's total RSS goes over
+RENDER_MAX_RSS_MB. metrics() reports queue depth, latencies, timeouts and
+recycles.
+
+The pool is the "browser.render" resource (resources.py): a pool whose
+browser thread has died is replaced on the next get_render_pool().
+
+Settings (environment):
+    RENDER_POOL_SIZE             browser contexts, 0 disables the pool (default 2)
+    RENDER_JOB_TIMEOUT           seconds per job, queueing excluded (default 30)
+    RENDER_CONTEXT_MAX_PAGES     pages per context before recycling (default 50)
+    RENDER_CONTEXT_MAX_HEAP_MB   JS heap that triggers recycling (default 256)
+    RENDER_MAX_RSS_MB            browser RSS that triggers recycling (default 1500)
+"""
+
+import asyncio
+import logging
+import os
+import threading
+import time
+from concurrent.futures import Future
+
+import renderer
+from resources import get_resource_registry, register_resource, resource
+
+logger = logging.getLogger(__name__)
+
+RENDER_POOL_SIZE = int(os.getenv("RENDER_POOL_SIZE", "2"))
+RENDER_JOB_TIMEOUT = float(os.getenv("RENDER_JOB_TIMEOUT", "30"))
+RENDER_CONTEXT_MAX_PAGES = int(os.getenv("RENDER_CONTEXT_MAX_PAGES", "50"))
+RENDER_CONTEXT_MAX_HEAP_MB = float(os.getenv("RENDER_CONTEXT_MAX_HEAP_MB", "256"))
+RENDER_MAX_RSS_MB = float(os.getenv("RENDER_MAX_RSS_MB", "1500"))
+
+# Markers of site builders whose content is rendered client-side
+JS_SITE_MARKERS = (
+    "static.parastorage.com", "static.wixstatic.com", "wix-thunderbolt",
+    "static1.squarespace.com", "squarespace-cdn.com",
+    "__next_data__", "ng-version=", "data-reactroot",
+    "you need to enable javascript", "please enable javascript",
+)
+
+
+class RenderTimeout(Exception):
+    """A render job ran past its timeout."""
+
+
+def needs_js_render(html, text=None):
+    """
+    True for pages whose content is built by JavaScript: known site-builder
+    markers, or almost no visible text despite a sizeable document.
+    """
+    if not html:
+        return False
+    lowered = html.lower()
+    if any(marker in lowered for marker in JS_SITE_MARKERS):
+        return True
+    if text is not None and len(html) > 20000 and len(text.split()) < 50:
+        return True
+    return False
+
+
+def browser_rss_mb(root_pid=None):
+    """RSS of our child processes (the browser tree) in MB; None off Linux."""
+    root_pid = root_pid or os.getpid()
+    try:
+        parents, rss = {}, {}
+        for entry in os.listdir("/proc"):
+            if not entry.isdigit():
+                continue
+            try:
+                with open(f"/proc/{entry}/status") as f:
+                    fields = dict(line.split(":", 1) for line in f if ":" in line)
+            except OSError:
+                continue
+            parents[int(entry)] = int(fields.get("PPid", "0").strip())
+            rss[int(entry)] = int(fields.get("VmRSS", "0 kB").split()[0])
+    except OSError:
+        return None
+    total = 0
+    for pid in rss:
+        p = pid
+        while p and p != root_pid:
+            p = parents.get(p)
+        if p == root_pid and pid != root_pid:
+            total += rss[pid]
+    return total / 1024
+
+
+class ContextSlot:
+    def __init__(self, context):
+        self.context = context
+        self.pages = 0
+        self.heap_mb = 0.0
+
+
+class RenderPool:
+    def __init__(self, size=RENDER_POOL_SIZE, job_timeout=RENDER_JOB_TIMEOUT,
+                 max_pages=RENDER_CONTEXT_MAX_PAGES, max_heap_mb=RENDER_CONTEXT_MAX_HEAP_MB,
+                 max_rss_mb=RENDER_MAX_RSS_MB):
+        self.size = max(1, size)
+        self.job_timeout = job_timeout
+        self.max_pages = max_pages
+        self.max_heap_mb = max_heap_mb
+        self.max_rss_mb = max_rss_mb
+        self.loop = None
+        self.queue = None
+        self.thread = None
+        self.ready = threading.Event()
+        self.start_error = None
+        self.stats_lock = threading.Lock()
+        self.latencies = []
+        self.counts = {"submitted": 0, "completed": 0, "failed": 0, "timeouts": 0,
+                       "recycled": 0, "in_flight": 0}
+
+    # -- lifecycle ------------------------------------------------------
+
+    def start(self, timeout=60):
+        """Launch the browser thread; raises if Chromium can't start."""
+        self.thread = threading.Thread(target=self._run, name="render-pool", daemon=True)
+        self.thread.start()
+        self.ready.wait(timeout)
+        if self.start_error is not None:
+            raise self.start_error
+        if not self.ready.is_set():
+            raise RuntimeError("Render pool did not start in time")
+        return self
+
+    def _run(self):
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        try:
+            self.loop.run_until_complete(self._serve())
+        except Exception as e:
+            self.start_error = e
+            self.ready.set()
+        finally:
+            self.loop.close()
+
+    async def _serve(self):
+        self.queue = asyncio.Queue()
+        async with renderer.playwright.async_playwright() as p:
+            browser = await p.chromium.launch()
+            try:
+                slots = [ContextSlot(await renderer.new_context(browser)) for _ in range(self.size)]
+                self.ready.set()
+                workers = [asyncio.ensure_future(self._worker(browser, slot)) for slot in slots]
+                await asyncio.gather(*workers)
+            finally:
+                await browser.close()
+
+    def alive(self):
+        return (self.thread is not None and self.thread.is_alive()
+                and self.loop is not None and not self.loop.is_closed())
+
+    def shutdown(self):
+        if self.loop is None or self.loop.is_closed():
+            return
+        for _ in range(self.size):
+            self.loop.call_soon_threadsafe(self.queue.put_nowait, None)
+        if self.thread:
+            self.thread.join(timeout=30)
+
+    # -- jobs -----------------------------------------------------------
+
+    def submit(self, url, wait_for=None, timeout=None):
+        """Queue a render; the Future resolves to the HTML."""
+        future = Future()
+        self._bump("submitted")
+        job = (url, wait_for, timeout or self.job_timeout, future)
+        self.loop.call_soon_threadsafe(self.queue.put_nowait, job)
+        return future
+
+    def render(self, url, wait_for=None, timeout=None):
+        """Blocking helper for worker threads; returns HTML or None."""
+        timeout = timeout or self.job_timeout
+        future = self.submit(url, wait_for, timeout)
+        try:
+            # Generous outer bound: the job timeout only starts once a context picks it up
+            return future.result(timeout=timeout * 4)
+        except Exception as e:
+            future.cancel()
+            print(f"Render failed for {url}: {e}")
+            return None
+
+    async def _worker(self, browser, slot):
+        while True:
+            job = await self.queue.get()
+            if job is None:
+                await slot.context.close()
+                return
+            url, wait_for, timeout, future = job
+            if not future.set_running_or_notify_cancel():
+                continue
+            self._bump("in_flight")
+            started = time.perf_counter()
+            try:
+                html = await asyncio.wait_for(self._render(slot, url, wait_for), timeout)
+                future.set_result(html)
+                self._record(time.perf_counter() - started)
+            except asyncio.TimeoutError:
+                self._bump("timeouts")
+                future.set_exception(RenderTimeout(f"{url} took longer than {timeout}s"))
+                # A page that hung may have left the context in a bad state
+                await self._recycle(browser, slot, "timeout")
+            except Exception as e:
+                self._bump("failed")
+                future.set_exception(e)
+            finally:
+                self._bump("in_flight", -1)
+            if self._should_recycle(slot):
+                await self._recycle(browser, slot, "memory/page limit")
+
+    async def _recycle(self, browser, slot, reason):
+        try:
+            await self._replace_context(browser, slot, reason)
+        except Exception as e:
+            # Keep serving with the old context rather than losing the worker
+            logger.warning(f"Could not recycle render context: {e}")
+
+    async def _render(self, slot, url, wait_for):
+        page = await slot.context.new_page()
+        try:
+            await page.goto(url, wait_until="domcontentloaded", timeout=renderer.RENDER_TIMEOUT_MS)
+            await renderer.wait_until_ready(page, wait_for)
+            html = await page.content()
+            try:
+                heap = await page.evaluate("() => (performance.memory && performance.memory.usedJSHeapSize) || 0")
+                slot.heap_mb = max(slot.heap_mb, heap / 1048576)
+            except renderer.playwright.Error:
+                pass
+            return html
+        finally:
+            slot.pages += 1
+            await page.close()
+
+    def _should_recycle(self, slot):
+        if slot.pages >= self.max_pages or slot.heap_mb >= self.max_heap_mb:
+            return True
+        rss = browser_rss_mb()
+        return rss is not None and rss >= self.max_rss_mb
+
+    async def _replace_context(self, browser, slot, reason):
+        logger.info(f"Recycling render context after {slot.pages} pages ({reason})")
+        context = await renderer.new_context(browser)
+        try:
+            await slot.context.close()
+        except renderer.playwright.Error:
+            pass
+        slot.context = context
+        slot.pages = 0
+        slot.heap_mb = 0.0
+        self._bump("recycled")
+
+    # -- metrics --------------------------------------------------------
+
+    def _bump(self, key, n=1):
+        with self.stats_lock:
+            self.counts[key] += n
+
+    def _record(self, seconds):
+        with self.stats_lock:
+            self.counts["completed"] += 1
+            self.latencies.append(seconds)
+            del self.latencies[:-1000]  # keep the recent window
+
+    def metrics(self):
+        with self.stats_lock:
+            out = dict(self.counts)
+            latencies = sorted(self.latencies)
+        out["contexts"] = self.size
+        out["queued"] = self.queue.qsize() if self.queue is not None else 0
+        if latencies:
+            out["mean_ms"] = round(1000 * sum(latencies) / len(latencies), 1)
+            out["p95_ms"] = round(1000 * latencies[int(0.95 * (len(latencies) - 1))], 1)
+        rss = browser_rss_mb()
+        if rss is not None:
+            out["browser_rss_mb"] = round(rss, 1)
+        return out
+
+
+_pool_failed = False
+
+
+def start_render_pool():
+    """None when the pool is disabled or Chromium could not be launched (not retried)."""
+    global _pool_failed
+    if _pool_failed or RENDER_POOL_SIZE <= 0:
+        return None
+    try:
+        return RenderPool().start()
+    except Exception as e:
+        _pool_failed = True
+        logger.warning(f"JS rendering unavailable: {e}")
+        return None
+
+
+register_resource("browser.render", start_render_pool, check=RenderPool.alive, close=RenderPool.shutdown)
+
+
+def get_render_pool():
+    """
+    Process-wide pool, started on first use. Returns None when the pool is
+    disabled (RENDER_POOL_SIZE=0) or Chromium could not be launched.
+    """
+    return resource("browser.render")
+
+
+def set_render_pool(pool):
+    global _pool_failed
+    _pool_failed = False
+    get_resource_registry().provide("browser.render", pool)
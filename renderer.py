@@ -0,0 +1,151 @@
+# renderer.py
+"""
+Fast headless rendering with async Playwright.
+
+Compared to the old get_dynamic_page_content (full page load, then a fixed
+3 second sleep), pages here:
+- never download images, fonts, media or known tracker scripts (they are
+  aborted by request interception)
+- are considered ready as soon as the network goes idle or an optional DOM
+  predicate holds, whichever comes first
+- share one browser, so render_many() renders several pages concurrently
+
+    html = render("https://example.com/contact")
+    pages = render_many(urls, wait_for=CONTACT_READY)
+
+Settings (environment):
+    RENDER_TIMEOUT_MS       navigation timeout (default 20000)
+    RENDER_IDLE_TIMEOUT_MS  max wait for network idle / predicate (default 5000)
+    RENDER_CONCURRENCY      pages rendered at once by render_many (default 4)
+"""
+
+import asyncio
+import logging
+import os
+from urllib.parse import urlsplit
+
+from lazy import lazy_import
+
+# Imported on first render, not at app startup (see lazy.py)
+playwright = lazy_import("playwright.async_api")
+
+logger = logging.getLogger(__name__)
+
+RENDER_TIMEOUT_MS = int(os.getenv("RENDER_TIMEOUT_MS", "20000"))
+RENDER_IDLE_TIMEOUT_MS = int(os.getenv("RENDER_IDLE_TIMEOUT_MS", "5000"))
+RENDER_CONCURRENCY = int(os.getenv("RENDER_CONCURRENCY", "4"))
+
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
+
+BLOCKED_RESOURCE_TYPES = {"image", "font", "media"}
+TRACKER_DOMAINS = (
+    "google-analytics.com", "googletagmanager.com", "doubleclick.net",
+    "googlesyndication.com", "facebook.net", "connect.facebook.com",
+    "hotjar.com", "clarity.ms", "segment.io", "segment.com", "mixpanel.com",
+    "newrelic.com", "nr-data.net", "fullstory.com", "tiktok.com/i18n/pixel",
+    "analytics.twitter.com", "snap.licdn.com", "bat.bing.com",
+)
+
+# DOM predicate: the page text contains a UK postcode
+CONTACT_READY = (
+    "() => /\\b[A-Z]{1,2}\\d[A-Z\\d]?\\s*\\d[A-Z]{2}\\b/i"
+    ".test((document.body && document.body.innerText) || '')"
+)
+
+
+def is_tracker(url):
+    parts = urlsplit(url)
+    host = (parts.hostname or "").lower()
+    target = host + parts.path
+    return any(host == d or host.endswith("." + d) or target.startswith(d) for d in TRACKER_DOMAINS)
+
+
+async def block_heavy_resources(route):
+    request = route.request
+    if request.resource_type in BLOCKED_RESOURCE_TYPES or is_tracker(request.url):
+        await route.abort()
+    else:
+        await route.continue_()
+
+
+async def new_context(browser):
+    """Browser context with the resource blocking installed."""
+    context = await browser.new_context(user_agent=USER_AGENT)
+    await context.route("**/*", block_heavy_resources)
+    return context
+
+
+async def wait_until_ready(page, wait_for=None, idle_timeout_ms=RENDER_IDLE_TIMEOUT_MS):
+    """
+    Return once the network is idle or `wait_for` holds. `wait_for` is a CSS
+    selector, or a JS function ("() => ...") for page.wait_for_function.
+    Timing out is not an error; the page is used as it stands.
+    """
+    waits = [page.wait_for_load_state("networkidle", timeout=idle_timeout_ms)]
+    if wait_for:
+        if "=>" in wait_for or wait_for.lstrip().startswith("function"):
+            waits.append(page.wait_for_function(wait_for, timeout=idle_timeout_ms))
+        else:
+            waits.append(page.wait_for_selector(wait_for, timeout=idle_timeout_ms))
+    tasks = [asyncio.ensure_future(w) for w in waits]
+    try:
+        pending = set(tasks)
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            if any(not t.exception() for t in done):
+                return
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+async def render_page(context, url, wait_for=None, timeout_ms=RENDER_TIMEOUT_MS,
+                      idle_timeout_ms=RENDER_IDLE_TIMEOUT_MS):
+    page = await context.new_page()
+    try:
+        print(f"Loading dynamic content from: {url}")
+        await page.goto(url, wait_until="domcontentloaded", timeout=timeout_ms)
+        await wait_until_ready(page, wait_for, idle_timeout_ms)
+        return await page.content()
+    finally:
+        await page.close()
+
+
+async def render_many_async(urls, wait_for=None, concurrency=RENDER_CONCURRENCY):
+    results = {}
+    async with playwright.async_playwright() as p:
+        browser = await p.chromium.launch()
+        try:
+            context = await new_context(browser)
+            semaphore = asyncio.Semaphore(max(1, concurrency))
+
+            async def one(url):
+                async with semaphore:
+                    try:
+                        results[url] = await render_page(context, url, wait_for)
+                    except playwright.Error as e:
+                        print(f"Error getting dynamic content: {e}")
+                        results[url] = None
+
+            await asyncio.gather(*(one(url) for url in dict.fromkeys(urls)))
+        finally:
+            await browser.close()
+    return results
+
+
+def render_many(urls, wait_for=None, concurrency=RENDER_CONCURRENCY):
+    """Render several pages concurrently in one browser. Returns {url: html or None}."""
+    urls = list(urls)
+    if not urls:
+        return {}
+    return asyncio.run(render_many_async(urls, wait_for, concurrency))
+
+
+def render(url, wait_for=None):
+    """Rendered HTML of one page, or None."""
+    try:
+        return render_many([url], wait_for).get(url)
+    except Exception as e:
+        print(f"Error getting dynamic content: {e}")
+        return None
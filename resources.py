@@ -0,0 +1,158 @@
+# resources.py
+"""
+Registry of process-wide resources: HTTP sessions, browser pools, GeoText.
+
+These used to be module globals, each with its own lock, lifecycle and
+atexit hook. Nothing checked that a cached browser was still alive, and
+nothing could release them on demand. Modules now register a factory with
+an optional health check and teardown, and fetch the instance by name:
+
+    register_resource("http.scrape", lambda: build_session(True))
+    session = resource("http.scrape")      # built once, then reused
+
+get() re-runs a resource's health check at most every
+RESOURCE_CHECK_SECONDS. A resource that fails its check, or raises, is
+torn down and rebuilt. close(name) and close_all() tear resources down
+explicitly. close_all() also runs at exit. The next get() rebuilds a
+closed resource.
+
+ui.app_resources() wraps the registry in st.cache_resource. Streamlit
+reruns, and consecutive jobs, then reuse warm connections and browsers.
+status() feeds the Resources panel in the app.
+
+Settings (environment):
+    RESOURCE_CHECK_SECONDS   minimum seconds between health checks (default 30)
+"""
+
+import atexit
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+RESOURCE_CHECK_SECONDS = float(os.getenv("RESOURCE_CHECK_SECONDS", "30"))
+
+
+class Resource:
+    def __init__(self, name, factory, check=None, close=None):
+        self.name = name
+        self.factory = factory
+        self.check = check
+        self.close = close
+        self.lock = threading.Lock()
+        self.value = None
+        self.created = None
+        self.checked = 0.0
+        self.uses = 0
+        self.rebuilds = 0
+
+
+class ResourceRegistry:
+    def __init__(self, check_seconds=RESOURCE_CHECK_SECONDS):
+        self.check_seconds = check_seconds
+        self.resources = {}
+        self.lock = threading.Lock()
+
+    def register(self, name, factory, check=None, close=None):
+        """
+        factory() builds the resource (it may return None when unavailable);
+        check(value) -> bool says whether it is still usable; close(value)
+        releases it. Registering a name again replaces its hooks.
+        """
+        with self.lock:
+            existing = self.resources.get(name)
+            if existing is not None:
+                existing.factory, existing.check, existing.close = factory, check, close
+            else:
+                self.resources[name] = Resource(name, factory, check, close)
+
+    def _resource(self, name):
+        try:
+            return self.resources[name]
+        except KeyError:
+            raise KeyError(f"Unknown resource {name!r}") from None
+
+    def get(self, name):
+        res = self._resource(name)
+        with res.lock:
+            now = time.monotonic()
+            if res.value is not None and res.check is not None and now - res.checked >= self.check_seconds:
+                res.checked = now
+                if not self._healthy(res):
+                    logger.warning(f"Resource {name} failed its health check; rebuilding it")
+                    self._teardown(res)
+                    res.rebuilds += 1
+            if res.value is None:
+                res.value = res.factory()
+                res.created = time.time() if res.value is not None else None
+                res.checked = now
+            res.uses += 1
+            return res.value
+
+    def provide(self, name, value):
+        """Use `value` for a resource instead of building one (tests, benchmarks). None resets it."""
+        res = self._resource(name)
+        with res.lock:
+            res.value = value
+            res.created = time.time() if value is not None else None
+            res.checked = time.monotonic()
+
+    def _healthy(self, res):
+        try:
+            return bool(res.check(res.value))
+        except Exception as e:
+            logger.warning(f"Health check for {res.name} raised: {e}")
+            return False
+
+    def _teardown(self, res):
+        value, res.value, res.created = res.value, None, None
+        if value is not None and res.close is not None:
+            try:
+                res.close(value)
+            except Exception as e:
+                logger.warning(f"Error closing {res.name}: {e}")
+
+    def close(self, name):
+        res = self._resource(name)
+        with res.lock:
+            self._teardown(res)
+
+    def close_all(self, prefix=""):
+        """Tear down every live resource (or those whose name starts with prefix)."""
+        for name in list(self.resources):
+            if name.startswith(prefix):
+                self.close(name)
+
+    def warm(self, names):
+        for name in names:
+            self.get(name)
+
+    def status(self):
+        now = time.time()
+        out = {}
+        for name, res in sorted(self.resources.items()):
+            out[name] = {
+                "live": res.value is not None,
+                "age_s": round(now - res.created) if res.created else None,
+                "uses": res.uses,
+                "rebuilds": res.rebuilds,
+            }
+        return out
+
+
+_registry = ResourceRegistry()
+atexit.register(_registry.close_all)
+
+
+def get_resource_registry():
+    return _registry
+
+
+def register_resource(name, factory, check=None, close=None):
+    _registry.register(name, factory, check, close)
+
+
+def resource(name):
+    return _registry.get(name)
@@ -0,0 +1,169 @@
+# results_store.py
+"""
+Columnar results store (Parquet via pyarrow).
+
+Round-tripping results through CSV turned the list columns into strings
+that had to be split again with "||"/"," guesses, and a sheet's ScrapedText
+made the files huge. Results are stored as Parquet instead:
+
+- AllImages, EmailContacts and PhoneContacts are list<string> columns and
+  come back as Python lists, exactly as written
+- Type, Sub Type, Country and Country code are dictionary-encoded
+- everything is zstd-compressed; ScrapedText gets a higher level
+  (RESULTS_TEXT_COMPRESSION_LEVEL) for frames that still hold the text
+  inline rather than a text_store reference
+
+    write_results(df, "final_data.parquet")
+    df = read_results("final_data.parquet")
+
+    with ResultsWriter(path) as writer:    # streaming, one row group per chunk
+        writer.write(chunk)
+
+CSV is only an export format (export_csv).
+
+Settings (environment):
+    RESULTS_COMPRESSION_LEVEL        zstd level for most columns (default 3)
+    RESULTS_TEXT_COMPRESSION_LEVEL   zstd level for ScrapedText (default 9)
+"""
+
+import os
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+RESULTS_COMPRESSION_LEVEL = int(os.getenv("RESULTS_COMPRESSION_LEVEL", "3"))
+RESULTS_TEXT_COMPRESSION_LEVEL = int(os.getenv("RESULTS_TEXT_COMPRESSION_LEVEL", "9"))
+
+LIST_COLUMNS = ["AllImages", "EmailContacts", "PhoneContacts"]
+CATEGORY_COLUMNS = ["Type", "Sub Type", "Country", "Country code"]
+TEXT_COLUMNS = ["ScrapedText"]
+
+LIST_TYPE = pa.list_(pa.string())
+CATEGORY_TYPE = pa.dictionary(pa.int32(), pa.string())
+
+
+def as_list(value):
+    """A list cell as a list of strings; legacy CSV strings are split on "||" or ","."""
+    if isinstance(value, (list, tuple, np.ndarray)):
+        return [str(v) for v in value]
+    if value is None or (isinstance(value, float) and np.isnan(value)):
+        return []
+    value = str(value).strip()
+    if not value:
+        return []
+    if "||" in value:
+        return value.split("||")
+    if "," in value:
+        return [v.strip() for v in value.split(",")]
+    return [value]
+
+
+def as_text(value):
+    if value is None or (isinstance(value, float) and np.isnan(value)):
+        return ""
+    return str(value)
+
+
+def column_type(name):
+    if name in LIST_COLUMNS:
+        return LIST_TYPE
+    if name in CATEGORY_COLUMNS:
+        return CATEGORY_TYPE
+    return pa.string()
+
+
+def schema_for(columns):
+    return pa.schema([pa.field(str(col), column_type(col)) for col in columns])
+
+
+def to_table(df, schema=None):
+    """Arrow table of a results frame; every non-list column is stored as text."""
+    schema = schema or schema_for(df.columns)
+    arrays = []
+    for field in schema:
+        values = df[field.name] if field.name in df.columns else pd.Series([None] * len(df), index=df.index)
+        if field.type == LIST_TYPE:
+            arrays.append(pa.array([as_list(v) for v in values], type=LIST_TYPE))
+        else:
+            text = pa.array([as_text(v) for v in values], type=pa.string())
+            arrays.append(text.dictionary_encode() if field.type == CATEGORY_TYPE else text)
+    return pa.Table.from_arrays(arrays, schema=schema)
+
+
+def writer_options(schema):
+    return {
+        "compression": "zstd",
+        "compression_level": {f.name: RESULTS_TEXT_COMPRESSION_LEVEL if f.name in TEXT_COLUMNS
+                              else RESULTS_COMPRESSION_LEVEL for f in schema},
+        "use_dictionary": [f.name for f in schema if f.name in CATEGORY_COLUMNS],
+    }
+
+
+def write_results(df, path):
+    """Write a results frame to Parquet (atomically)."""
+    table = to_table(df)
+    pq.write_table(table, path + ".tmp", **writer_options(table.schema))
+    os.replace(path + ".tmp", path)
+
+
+def from_table(table):
+    df = table.to_pandas()
+    for col in df.columns:
+        if col in LIST_COLUMNS:
+            df[col] = [list(v) if v is not None else [] for v in df[col]]
+        elif isinstance(df[col].dtype, pd.CategoricalDtype):
+            # The pipeline assigns new values into these cells, which a Categorical would reject
+            df[col] = df[col].astype(object)
+    return df
+
+
+def read_results(path, columns=None):
+    """Load a results file; list columns come back as lists."""
+    return from_table(pq.read_table(path, columns=columns))
+
+
+class ResultsWriter:
+    """
+    Appends chunks to one Parquet file as row groups. The first chunk fixes
+    the columns; later chunks are aligned to them.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.rows = 0
+        self.writer = None
+
+    def write(self, chunk):
+        if self.writer is None:
+            schema = schema_for(chunk.columns)
+            self.writer = pq.ParquetWriter(self.path, schema, **writer_options(schema))
+        self.writer.write_table(to_table(chunk, self.writer.schema))
+        self.rows += len(chunk)
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def export_csv(path, csv_path, batch_rows=5000):
+    """Stream a results file out as CSV (list columns "||"-joined)."""
+    parquet = pq.ParquetFile(path)
+    first = True
+    for batch in parquet.iter_batches(batch_size=batch_rows):
+        df = from_table(pa.Table.from_batches([batch]))
+        for col in LIST_COLUMNS:
+            if col in df.columns:
+                df[col] = df[col].apply("||".join)
+        df.to_csv(csv_path, mode="w" if first else "a", header=first, index=False)
+        first = False
+    if first:
+        pd.DataFrame(columns=parquet.schema_arrow.names).to_csv(csv_path, index=False)
+    return csv_path
@@ -2,27 +2,33 @@
 
 import time
 import re
+import os
+import queue
 import socket
+import threading
+import contextlib
 import requests
 import traceback
 from urllib.parse import urljoin
 from bs4 import BeautifulSoup
-import cloudscraper
-from selenium import webdriver
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.webdriver.common.by import By
-from playwright.sync_api import sync_playwright
-from PIL import Image
+import renderer
+import render_pool
 import json
-import phonenumbers
-from geotext import GeoText
 import pandas as pd
-import openai  # Ensure openai is imported
 from io import BytesIO
-from regex import get_patterns_for_country   # new import
+from config import openai  # lazy, like phonenumbers; selenium/PIL/geotext are imported where used
+from lazy import lazy_import
+from resources import register_resource, resource
+from gpt_helpers import geotext_places
+from regex import PATTERN_REGISTRY, get_patterns_for_country   # new import
+from countries import fix_country_code
 from fallback import extensive_fallback_scrape  # new import
+from politeness import polite_get
+from http_client import mount_adapters, shared_session
+from extraction import first_live_url
+from fetch_strategy import get_strategy_store
+
+phonenumbers = lazy_import("phonenumbers")
 
 ########################################################################
 # Global Constants / Prompts
@@ -92,12 +98,28 @@ def build_absolute_url(relative_url, base_url):
         return relative_url
     return urljoin(base_url, relative_url)
 
-def try_url_variants(session, base_domain, wait_time=3):
-    """Enhanced URL fetching with more robust fallbacks"""
+FETCH_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
+    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,*/*;q=0.8",
+    "Accept-Language": "en-US,en;q=0.5",
+    # Accept-Encoding comes from the session (br only when brotli is installed)
+    "DNT": "1",
+    "Connection": "keep-alive",
+    "Upgrade-Insecure-Requests": "1",
+    "Sec-Fetch-Dest": "document",
+    "Sec-Fetch-Mode": "navigate",
+    "Sec-Fetch-Site": "none",
+    "Sec-Fetch-User": "?1",
+    "Cache-Control": "no-cache",
+    "Pragma": "no-cache"
+}
+
+PROXY_URL = "https://proxyapp-hjeqhbg2h2c2baay.uksouth-01.azurewebsites.net/proxy"
+
+def url_variants(base_domain):
     if base_domain.lower().startswith("www."):
         base_domain = base_domain[4:]
-        
-    variants = [
+    return [
         f"https://www.{base_domain}",
         f"https://{base_domain}",
         f"http://www.{base_domain}",
@@ -106,31 +128,14 @@ def try_url_variants(session, base_domain, wait_time=3):
         f"https://{base_domain}/index",
         f"https://www.{base_domain}/en"     # Language-specific
     ]
-    
-    headers = {
-        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
-        "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,*/*;q=0.8",
-        "Accept-Language": "en-US,en;q=0.5",
-        "Accept-Encoding": "gzip, deflate, br",
-        "DNT": "1",
-        "Connection": "keep-alive",
-        "Upgrade-Insecure-Requests": "1",
-        "Sec-Fetch-Dest": "document",
-        "Sec-Fetch-Mode": "navigate",
-        "Sec-Fetch-Site": "none",
-        "Sec-Fetch-User": "?1",
-        "Cache-Control": "no-cache",
-        "Pragma": "no-cache"
-    }
-    
+
+def fetch_tier_requests(session, variants):
+    """Plain requests over every URL variant."""
     last_err = ""
-    
-    # Regular request attempts
     for variant in variants:
         try:
             print(f"Trying URL: {variant}")
-            time.sleep(wait_time)
-            resp = session.get(variant, headers=headers, timeout=15, verify=False, allow_redirects=True)
+            resp = session.get(variant, headers=FETCH_HEADERS, timeout=15, verify=False, allow_redirects=True)
             if resp.status_code in [200, 301, 302]:
                 print(f"Success with status {resp.status_code} for URL: {variant}")
                 return resp, variant, ""
@@ -138,11 +143,14 @@ def try_url_variants(session, base_domain, wait_time=3):
         except requests.exceptions.RequestException as e:
             last_err = str(e)
             continue
-    
-    # Cloudscraper attempt with custom browser config
+    return None, "", last_err
+
+def fetch_tier_cloudscraper(session, variants):
+    """Cloudscraper attempt with custom browser config"""
     try:
+        import cloudscraper
         print(f"Attempting with cloudscraper for: {variants[0]}")
-        scraper = cloudscraper.create_scraper(
+        scraper = mount_adapters(cloudscraper.create_scraper(
             browser={
                 'browser': 'chrome',
                 'platform': 'windows',
@@ -150,26 +158,67 @@ def try_url_variants(session, base_domain, wait_time=3):
                 'desktop': True
             },
             delay=10
-        )
-        resp = scraper.get(variants[0], timeout=20)
+        ), polite=False)
+        resp = polite_get(variants[0], getter=scraper.get, timeout=20)
         if resp.status_code == 200:
             return resp, variants[0], ""
+        return None, "", f"HTTP {resp.status_code}"
     except Exception as e:
-        last_err = str(e)
-    
-    # External proxy attempt with retry
+        return None, "", str(e)
+
+def fetch_tier_proxy(session, variants):
+    """External proxy attempt with retry"""
+    last_err = ""
     for _ in range(2):  # Try proxy twice
         try:
-            proxy_url = f"https://proxyapp-hjeqhbg2h2c2baay.uksouth-01.azurewebsites.net/proxy?url={variants[0]}"
-            resp = requests.get(proxy_url, headers=headers, timeout=15, verify=False)
+            proxy_url = f"{PROXY_URL}?url={variants[0]}"
+            resp = shared_session().get(proxy_url, headers=FETCH_HEADERS, timeout=15, verify=False)
             if resp.status_code == 200:
                 return DummyResponse(resp.text), variants[0], ""
+            last_err = f"Proxy HTTP {resp.status_code}"
         except Exception as e:
             print(f"External Proxy Exception: {e}")
             traceback.print_exc()
             last_err = str(e)
-            time.sleep(2)  # Wait before retry
             continue
+    return None, "", last_err
+
+# Cheapest first; fetch_strategy remembers which one each domain needs
+FETCH_TIERS = {
+    "requests": fetch_tier_requests,
+    "cloudscraper": fetch_tier_cloudscraper,
+    "proxy": fetch_tier_proxy,
+}
+
+def try_url_variants(session, base_domain):
+    """
+    Enhanced URL fetching with more robust fallbacks.
+    Tiers are tried in the order fetch_strategy has learned for the domain
+    (cheapest first for new domains), starting from the URL variant that
+    worked last time. Pacing comes from the politeness scheduler (see
+    politeness.py); `session` should have PoliteAdapter mounted.
+    """
+    variants = url_variants(base_domain)
+    store = get_strategy_store()
+    plan, remembered_url = store.plan(base_domain, list(FETCH_TIERS))
+    if remembered_url in variants:
+        variants.remove(remembered_url)
+        variants.insert(0, remembered_url)
+    
+    last_err = ""
+    tried = []
+    for tier in plan:
+        started = time.perf_counter()
+        resp, final_url, err = FETCH_TIERS[tier](session, variants)
+        if resp is not None:
+            latency_ms = (time.perf_counter() - started) * 1000
+            cheaper = list(FETCH_TIERS)[:list(FETCH_TIERS).index(tier)]
+            store.record_success(base_domain, tier, final_url, latency_ms,
+                                 probed=all(t in tried for t in cheaper))
+            return resp, final_url, ""
+        store.record_failure(base_domain, tier)
+        tried.append(tier)
+        last_err = err or last_err
     
     return None, "", last_err if last_err else "All attempts failed"
 
@@ -177,61 +226,146 @@ def try_url_variants(session, base_domain, wait_time=3):
 # Dynamic Content and Selenium Extraction
 ########################################################################
 
-def get_dynamic_page_content(url):
+def get_dynamic_page_content(url, wait_for=None):
     """
     Use Playwright to get content from dynamic pages.
-    Returns the full HTML content.
+    Returns the full HTML content. Images, fonts, media and trackers are
+    blocked and the page is read once the network is idle (or `wait_for`
+    holds) rather than after a fixed delay; see renderer.py.
     """
-    try:
-        with sync_playwright() as p:
-            browser = p.chromium.launch()
-            page = browser.new_page()
-            print(f"Loading dynamic content from: {url}")
-            page.goto(url)
-            page.wait_for_timeout(3000)  # Wait 3 seconds for animations
-            content = page.content()
-            browser.close()
-            return content
-    except Exception as e:
-        print(f"Error getting dynamic content: {e}")
-        return None
+    return renderer.render(url, wait_for)
 
-def get_contact_text_selenium(url):
-    """
-    Use Selenium to extract contact information from a page.
-    Waits for common elements (contact, address, footer) and returns the combined text.
-    """
+BROWSER_POOL_SIZE = int(os.getenv("BROWSER_POOL_SIZE", "2"))
+
+def new_headless_driver():
+    from selenium import webdriver
+    from selenium.webdriver.chrome.options import Options
     chrome_options = Options()
     chrome_options.add_argument("--headless")
     chrome_options.add_argument("--disable-gpu")
     chrome_options.add_argument("--no-sandbox")
     chrome_options.add_argument("--disable-dev-shm-usage")
-    try:
-        driver = webdriver.Chrome(options=chrome_options)
-        driver.get(url)
-        wait = WebDriverWait(driver, 10)
-        selectors = [
-            "//div[contains(@class, 'contact')]",
-            "//address",
-            "//footer",
-            "//*[contains(text(), '+44') or contains(text(), '(0)')]"
-        ]
-        text_parts = []
-        for selector in selectors:
+    return webdriver.Chrome(options=chrome_options)
+
+class DriverPool:
+    """
+    Keeps up to `size` headless Chrome instances alive between contact pages,
+    so an escalation costs a page load rather than a browser start.
+    """
+
+    def __init__(self, size=BROWSER_POOL_SIZE, factory=new_headless_driver):
+        self.size = size
+        self.factory = factory
+        self.idle = queue.Queue()
+        self.created = 0
+        self.lock = threading.Lock()
+
+    @contextlib.contextmanager
+    def driver(self, timeout=120):
+        driver = None
+        try:
+            driver = self.idle.get_nowait()
+        except queue.Empty:
+            with self.lock:
+                can_create = self.created < self.size
+                if can_create:
+                    self.created += 1
+            if can_create:
+                try:
+                    driver = self.factory()
+                except Exception:
+                    with self.lock:
+                        self.created -= 1
+                    raise
+            else:
+                driver = self.idle.get(timeout=timeout)
+        try:
+            yield driver
+        except Exception:
+            # A driver that errored may be wedged; replace it next time
+            self.discard(driver)
+            raise
+        else:
+            self.idle.put(driver)
+
+    def discard(self, driver):
+        with self.lock:
+            self.created -= 1
+        try:
+            driver.quit()
+        except Exception:
+            pass
+
+    def close_all(self):
+        while True:
             try:
-                elements = wait.until(EC.presence_of_all_elements_located((By.XPATH, selector)))
-                for element in elements:
-                    text_parts.append(element.text.strip())
+                self.discard(self.idle.get_nowait())
+            except queue.Empty:
+                return
+
+    def prune(self):
+        """Health check: quit idle drivers whose browser has died. Always healthy afterwards."""
+        alive = []
+        while True:
+            try:
+                driver = self.idle.get_nowait()
+            except queue.Empty:
+                break
+            try:
+                driver.title
+                alive.append(driver)
             except Exception:
-                continue
-        page_text = driver.find_element(By.TAG_NAME, "body").text
-        text_parts.append(page_text)
-        driver.quit()
-        return "\n=====\n".join(text_parts)
+                self.discard(driver)
+        for driver in alive:
+            self.idle.put(driver)
+        return True
+
+# A resource, so reruns and consecutive jobs reuse warm browsers (see resources.py)
+register_resource("browser.selenium", DriverPool, check=DriverPool.prune, close=DriverPool.close_all)
+
+def get_contact_text_browser(url):
+    """
+    Rendered contact page text from the shared render pool, falling back to
+    pooled Selenium when JS rendering via Playwright isn't available.
+    """
+    pool = render_pool.get_render_pool()
+    if pool is None:
+        return get_contact_text_selenium(url)
+    html = pool.render(url, wait_for=renderer.CONTACT_READY)
+    if not html:
+        return None
+    soup = BeautifulSoup(html, "html.parser")
+    parts = [el.get_text(separator=" ", strip=True) for el in soup.select("address, footer, [class*=contact]")]
+    parts.append(soup.get_text(separator=" ", strip=True))
+    return "\n=====\n".join(p for p in parts if p)
+
+def get_contact_text_selenium(url):
+    """
+    Use a pooled headless Chrome to extract contact information from a page.
+    Waits for the body once, then collects common elements (contact,
+    address, footer, phone numbers) and returns the combined text.
+    """
+    try:
+        from selenium.webdriver.common.by import By
+        from selenium.webdriver.support import expected_conditions as EC
+        from selenium.webdriver.support.ui import WebDriverWait
+        with resource("browser.selenium").driver() as driver:
+            driver.get(url)
+            WebDriverWait(driver, 10).until(EC.presence_of_element_located((By.TAG_NAME, "body")))
+            selectors = [
+                "//div[contains(@class, 'contact')]",
+                "//address",
+                "//footer",
+                "//*[contains(text(), '+44') or contains(text(), '(0)')]"
+            ]
+            text_parts = []
+            for selector in selectors:
+                for element in driver.find_elements(By.XPATH, selector):
+                    text_parts.append(element.text.strip())
+            text_parts.append(driver.find_element(By.TAG_NAME, "body").text)
+            return "\n=====\n".join(text_parts)
     except Exception as e:
         print(f"Selenium error: {e}")
-        if 'driver' in locals():
-            driver.quit()
         return None
 
 ########################################################################
@@ -269,7 +403,7 @@ def try_fetch_image(session, url, proxy_url=None, verify=False):
             content_type = r.headers.get('content-type', '').lower()
             content_length = len(r.content)
             if ('image' in content_type and content_length > 100000) or (content_length > 200000):
-                from io import BytesIO
+                from PIL import Image
                 try:
                     with Image.open(BytesIO(r.content)) as im:
                         im.load()
@@ -483,27 +617,15 @@ def quick_extract_address(text, country="UK"):
     # Split text into segments
     segments = text.splitlines()
     
-    # Retrieve regex patterns for the given country
+    # Compiled patterns for the given country, shared via the registry in regex.py
     patterns = get_patterns_for_country(country)
-    phone_pattern = patterns.get("phone", "")
-    postcode_pattern = patterns.get("postcode", "")
-    extra_address_pattern = patterns.get("extra_address_pattern", "")
-    print(f"Debug: For country '{country}', phone_pattern: {phone_pattern}, postcode_pattern: {postcode_pattern}")
-
-    if extra_address_pattern:
-        match = re.search(extra_address_pattern, text, re.IGNORECASE)
-        if match:
-            return match.group(1).strip()
-
-    # Compile regex for postcode and keywords
-    postcode_regex = re.compile(postcode_pattern, re.IGNORECASE)
-    address_keyword_regex = re.compile(patterns.get("address_keywords", ""), re.IGNORECASE)
+    print(f"Debug: For country '{country}', using {patterns}")
     
     candidate_blocks = []
     
     # Iterate segments for a candidate address containing a valid postcode
     for i, segment in enumerate(segments):
-        if postcode_regex.search(segment):
+        if patterns.find_postcode(segment):
             block_segments = []
             # Collect prior segments if needed
             for j in range(max(0, i - 2), i):
@@ -524,8 +646,7 @@ def quick_extract_address(text, country="UK"):
         candidate_lower = candidate.lower()
         has_digit = bool(re.search(r'\d+', candidate))
         if ctry.upper() in ("UK", "GB"):
-            has_keyword = bool(address_keyword_regex.search(candidate_lower))
-            return has_digit and has_keyword
+            return has_digit and patterns.has_keyword(candidate_lower)
         elif ctry.upper() in ("US", "USA", "UNITED STATES"):
             return has_digit and ("," in candidate)
         else:
@@ -601,32 +722,16 @@ def find_contact_page_url(soup, base_url):
         text = a_tag.get_text(separator=' ', strip=True).lower()
         if any(keyword in href.lower() or keyword in text for keyword in contact_keywords):
             return urljoin(base_url, href)
+    # Fallback paths are probed concurrently; the first live one in this order wins
+    fallback_paths = []
     if "prsformusic.com" in base_url or "prsmusic.com" in base_url:
-        fallback_paths = [
-            '/help/contact-us', '/contact', '/about/contact'
-        ]
-        for path in fallback_paths:
-            candidate = urljoin(base_url, path)
-            try:
-                r = requests.get(candidate, timeout=5)
-                if r.status_code == 200:
-                    return candidate
-            except Exception:
-                continue
-    domain = base_url.rstrip('/')
-    fallback_paths = [
+        fallback_paths += ['/help/contact-us', '/contact', '/about/contact']
+    fallback_paths += [
         '/contact', '/contact-us', '/contactus', '/help/contact-us',
         '/help/contact', '/about/contact', '/get-in-touch'
     ]
-    for path in fallback_paths:
-        candidate = urljoin(domain, path)
-        try:
-            r = requests.get(candidate, timeout=5)
-            if r.status_code == 200:
-                return candidate
-        except Exception:
-            continue
-    return None
+    domain = base_url.rstrip('/')
+    return first_live_url([urljoin(domain, path) for path in fallback_paths])
 
 def get_about_page_text(session, url):
     try:
@@ -638,26 +743,70 @@ def get_about_page_text(session, url):
         pass
     return ""
 
-def get_contact_page_text(session, url, base_url):
-    """
-    Enhanced contact page text extraction using Selenium first,
-    then falling back to regular requests and common subpage paths.
-    """
-    print(f"\nProcessing contact page: {url}")
-    selenium_text = get_contact_text_selenium(url)
-    if selenium_text and is_valid_contact_text(selenium_text):
-        return selenium_text
+class EscalationStats:
+    """Per-job counts of contact pages served statically vs. by the browser,
+    and of homepages that needed JS rendering."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counts = {"contact_pages": 0, "static": 0, "escalated": 0, "browser_used": 0, "js_rendered": 0}
+
+    def bump(self, key):
+        with self.lock:
+            self.counts[key] += 1
+
+    def summary(self):
+        with self.lock:
+            counts = dict(self.counts)
+        pages = counts["contact_pages"]
+        counts["escalation_rate"] = round(counts["escalated"] / pages, 3) if pages else 0.0
+        return counts
+
+_job_stats = threading.local()
+_default_stats = EscalationStats()
+
+def set_job_stats(stats):
+    """Attach an EscalationStats to the current worker thread (None to detach)."""
+    _job_stats.current = stats
+
+def get_job_stats():
+    return getattr(_job_stats, "current", None) or _default_stats
+
+def fetch_static_text(session, url):
     try:
         r = session.get(url, timeout=10, verify=False)
         if r.status_code == 200:
-            request_text = r.text
-            if is_valid_contact_text(request_text):
-                return request_text
+            return r.text
     except Exception as e:
         print(f"Request error: {e}")
+    return None
+
+def get_contact_page_text(session, url, base_url):
+    """
+    Contact page text, static HTML first. The browser is only started when
+    the static page doesn't score as sufficient (see contact_sufficiency),
+    e.g. when the details are rendered by JavaScript.
+    """
+    print(f"\nProcessing contact page: {url}")
+    stats = get_job_stats()
+    stats.bump("contact_pages")
+    static_text = fetch_static_text(session, url)
+    if is_sufficient_contact_text(static_text):
+        stats.bump("static")
+        return static_text
+    stats.bump("escalated")
+    print(f"Static contact page scored {contact_sufficiency(static_text)[0]:.2f}; escalating to browser")
+    browser_text = get_contact_text_browser(url)
+    if browser_text and is_valid_contact_text(browser_text):
+        stats.bump("browser_used")
+        return browser_text
+    if static_text and is_valid_contact_text(static_text):
+        return static_text
     if "prsformusic.com" in base_url:
         forced_url = urljoin(base_url, "/help/contact-us")
-        forced_text = get_contact_text_selenium(forced_url)
+        forced_text = fetch_static_text(session, forced_url)
+        if not is_sufficient_contact_text(forced_text):
+            forced_text = get_contact_text_browser(forced_url)
         extracted_address = quick_extract_address(forced_text or "")
         if extracted_address:
             return extracted_address
@@ -665,14 +814,9 @@ def get_contact_page_text(session, url, base_url):
     for path in fallback_paths:
         fallback_url = base_url.rstrip('/') + path
         print(f"Attempting fallback URL: {fallback_url}")
-        try:
-            r = session.get(fallback_url, timeout=10, verify=False)
-            if r.status_code == 200:
-                fallback_text = r.text
-                if is_valid_contact_text(fallback_text):
-                    return fallback_text
-        except Exception as e:
-            print(f"Fallback URL error: {e}")
+        fallback_text = fetch_static_text(session, fallback_url)
+        if fallback_text and is_valid_contact_text(fallback_text):
+            return fallback_text
     print("No valid contact text found; attempting extended fallback search.")
     fallback_text = extensive_fallback_scrape(session, url)
     return fallback_text
@@ -687,6 +831,32 @@ def is_valid_contact_text(text):
         return True
     return False
 
+# Weights for contact_sufficiency; an address alone is enough by default
+CONTACT_SIGNAL_WEIGHTS = {"address": 0.5, "phone": 0.25, "email": 0.25}
+CONTACT_SUFFICIENCY_THRESHOLD = float(os.getenv("CONTACT_SUFFICIENCY_THRESHOLD", "0.5"))
+_POSTCODE_SIGNAL = PATTERN_REGISTRY["GB"].postcode_strict  # case-sensitive: "2nd floor" is not a postcode
+_STREET_SIGNAL = re.compile(r'\b\d+[A-Za-z]?(?:-\d+)?\s+(?:[A-Z][\w\']*\s+){0,3}(?:street|st|road|rd|lane|avenue|ave|square|place|way|drive|court|terrace|hill|row|high street)\b', re.I)
+_PHONE_SIGNAL = re.compile(r'(?:\+44\s?\(?0?\)?\s?|\b0)\d{2,4}[\s-]?\d{3,4}[\s-]?\d{3,4}\b|tel:')
+_EMAIL_SIGNAL = re.compile(r'[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}')
+
+def contact_sufficiency(text):
+    """
+    Score 0..1 for how much contact information a page carries, from
+    address (postcode or street line), phone and email signals.
+    Returns (score, {signal: bool}).
+    """
+    text = text or ""
+    signals = {
+        "address": bool(_POSTCODE_SIGNAL.search(text) or _STREET_SIGNAL.search(text)),
+        "phone": bool(_PHONE_SIGNAL.search(text)),
+        "email": bool(_EMAIL_SIGNAL.search(text)),
+    }
+    score = sum(CONTACT_SIGNAL_WEIGHTS[k] for k, found in signals.items() if found)
+    return score, signals
+
+def is_sufficient_contact_text(text):
+    return bool(text) and contact_sufficiency(text)[0] >= CONTACT_SUFFICIENCY_THRESHOLD
+
 def extract_contact_info(text):
     """Enhanced contact info extraction with improved UK patterns"""
     emails = set()
@@ -970,7 +1140,7 @@ Return JSON with keys: "City", "Country". If you cannot find them, leave them em
 
 Text:
 """
-    places = GeoText(text)
+    places = geotext_places(text)
     city = places.cities[0] if places.cities else ""
     country = places.countries[0] if places.countries else ""
     if city or country:
@@ -996,31 +1166,6 @@ Text:
     except:
         return {}
 
-def fix_country_code(row):
-    """
-    If 'Country code' is missing or incorrect in a row, attempts to fix it based on the 'Country' field.
-    """
-    country_str = (row['Country'] if pd.notnull(row['Country']) else "").strip().lower()
-    ccode_str = (row['Country code'] if pd.notnull(row['Country code']) else "").strip().upper()
-    if ccode_str and ccode_str != "UK":
-        return ccode_str
-    if country_str in ("united kingdom", "uk", "great britain", "england", "scotland", "wales"):
-        return "GB"
-    elif country_str in ("united states", "usa", "us", "america"):
-        return "US"
-    return ccode_str or ""
-
-def combine_into_single_address(row):
-    """
-    Combines address subfields into a single 'Full address' string.
-    """
-    parts = []
-    for field in ["Address line 1", "Address line 2", "City", "County", "Post code", "Country"]:
-        val = str(row.get(field, "")).strip()
-        if val:
-            parts.append(val)
-    return ", ".join(parts)
-
 # Add DummyResponse class for proxy fallback
 class DummyResponse:
     def __init__(self, text):
@@ -0,0 +1,170 @@
+# search_cache.py
+"""
+Persistent cache and in-flight deduplication for search_client queries.
+
+Results are stored in SQLite keyed by the normalized query, so
+"The Lexington  United Kingdom address contact" and
+"the lexington united kingdom address contact" share one entry.
+Empty result lists are cached too (negative caching) but expire sooner.
+Concurrent callers asking for the same query share a single search.
+Expired entries are deleted when the cache is opened and every
+PURGE_EVERY_WRITES writes after that, so the file does not grow without bound.
+
+Settings (environment):
+    SEARCH_CACHE_TTL_HOURS           lifetime of a cached hit (default 720 = 30 days)
+    SEARCH_CACHE_NEGATIVE_TTL_HOURS  lifetime of a cached "no results" (default 24)
+"""
+
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future
+
+import search_client
+from config import CACHE_DIR
+
+logger = logging.getLogger(__name__)
+
+SEARCH_CACHE_TTL = float(os.getenv("SEARCH_CACHE_TTL_HOURS", "720")) * 3600
+SEARCH_CACHE_NEGATIVE_TTL = float(os.getenv("SEARCH_CACHE_NEGATIVE_TTL_HOURS", "24")) * 3600
+
+PURGE_EVERY_WRITES = 500
+
+
+def normalize_query(query):
+    """Lowercase, drop punctuation and collapse whitespace."""
+    return " ".join(re.findall(r"[\w&']+", (query or "").lower()))
+
+
+class SearchCache:
+    def __init__(self, path=None, ttl=SEARCH_CACHE_TTL, negative_ttl=SEARCH_CACHE_NEGATIVE_TTL):
+        self.path = path or os.path.join(CACHE_DIR, "search_cache.sqlite3")
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.lock = threading.Lock()
+        self.stats = {"hits": 0, "negative_hits": 0, "misses": 0, "shared": 0}
+        self.writes = 0
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        with self.connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS search_cache ("
+                " query_key TEXT PRIMARY KEY, query TEXT, results TEXT, created REAL)"
+            )
+        self.purge_expired()
+
+    def connect(self):
+        return sqlite3.connect(self.path, timeout=30)
+
+    def get(self, query):
+        """Return (hit, results). Expired entries count as misses."""
+        key = normalize_query(query)
+        with self.connect() as conn:
+            row = conn.execute(
+                "SELECT results, created FROM search_cache WHERE query_key = ?", (key,)
+            ).fetchone()
+        if row is None:
+            return False, None
+        results = json.loads(row[0])
+        ttl = self.ttl if results else self.negative_ttl
+        if time.time() - row[1] > ttl:
+            return False, None
+        return True, results
+
+    def put(self, query, results):
+        with self.connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO search_cache (query_key, query, results, created) VALUES (?, ?, ?, ?)",
+                (normalize_query(query), query, json.dumps(results), time.time()),
+            )
+        with self.lock:
+            self.writes += 1
+            purge = self.writes % PURGE_EVERY_WRITES == 0
+        if purge:
+            self.purge_expired()
+
+    def purge_expired(self):
+        """Delete entries past their TTL; returns how many were removed."""
+        cutoff_hit = time.time() - self.ttl
+        cutoff_neg = time.time() - self.negative_ttl
+        with self.connect() as conn:
+            removed = conn.execute(
+                "DELETE FROM search_cache WHERE (results = '[]' AND created < ?) OR created < ?",
+                (cutoff_neg, cutoff_hit),
+            ).rowcount
+        if removed:
+            logger.info(f"Purged {removed} expired search cache entries")
+        return removed
+
+    def bump(self, key):
+        with self.lock:
+            self.stats[key] += 1
+
+
+_cache = None
+_cache_lock = threading.Lock()
+_inflight = {}
+_inflight_lock = threading.Lock()
+
+
+def get_search_cache():
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = SearchCache()
+        return _cache
+
+
+def set_search_cache(cache):
+    """Swap the process-wide cache (e.g. a throwaway one for benchmarks)."""
+    global _cache
+    with _cache_lock:
+        _cache = cache
+
+
+def cached_search(query, session=None, providers=None):
+    """
+    search_client.search with a persistent cache in front of it.
+    If another thread is already running the same (normalized) query, wait
+    for its result instead of searching again. Provider outages
+    (SearchUnavailable) propagate and are never cached.
+    """
+    cache = get_search_cache()
+    hit, results = cache.get(query)
+    if hit:
+        cache.bump("hits" if results else "negative_hits")
+        logger.info(f"Search cache hit for {query!r}")
+        return results
+
+    key = normalize_query(query)
+    with _inflight_lock:
+        future = _inflight.get(key)
+        owner = future is None
+        if owner:
+            future = _inflight[key] = Future()
+
+    if not owner:
+        cache.bump("shared")
+        return future.result()
+
+    try:
+        # The previous owner may have finished between our cache check and the claim
+        hit, results = cache.get(query)
+        if hit:
+            cache.bump("hits" if results else "negative_hits")
+            future.set_result(results)
+            return results
+        cache.bump("misses")
+        results = search_client.search(query, session=session, providers=providers)
+        cache.put(query, results)
+        future.set_result(results)
+        return results
+    except Exception as e:
+        future.set_exception(e)
+        raise
+    finally:
+        with _inflight_lock:
+            _inflight.pop(key, None)
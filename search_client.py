@@ -0,0 +1,177 @@
+# search_client.py
+"""
+Lightweight HTTP search backend used by the DuckDuckGo address fallback.
+
+Providers fetch a plain-HTML results page and parse it with lxml; no browser
+is involved. The Selenium path in duckduckgo.py is only used when
+SEARCH_BROWSER_FALLBACK=1 and the HTTP providers come back empty.
+
+Providers are registered by name:
+
+    @register_provider("my_engine")
+    class MyEngine(SearchProvider):
+        def search(self, query, session): ...
+
+Settings (environment):
+    SEARCH_PROVIDERS          comma-separated provider order (default "duckduckgo_html,duckduckgo_lite")
+    DDG_HTML_URL / DDG_LITE_URL   endpoints, override to point at a local fixture server
+    SEARCH_TIMEOUT            per-request timeout in seconds (default 8)
+    SEARCH_BROWSER_FALLBACK   "1" to allow the Selenium fallback
+"""
+
+import os
+import logging
+from urllib.parse import parse_qs, unquote, urlsplit
+
+import requests
+
+from http_client import shared_session
+
+try:
+    from lxml import html as lxml_html
+except ImportError:  # pragma: no cover - lxml is in requirements.txt
+    lxml_html = None
+
+logger = logging.getLogger(__name__)
+
+DDG_HTML_URL = os.getenv("DDG_HTML_URL", "https://html.duckduckgo.com/html/")
+DDG_LITE_URL = os.getenv("DDG_LITE_URL", "https://lite.duckduckgo.com/lite/")
+SEARCH_PROVIDERS = [p.strip() for p in os.getenv("SEARCH_PROVIDERS", "duckduckgo_html,duckduckgo_lite").split(",") if p.strip()]
+SEARCH_TIMEOUT = float(os.getenv("SEARCH_TIMEOUT", "8"))
+SEARCH_BROWSER_FALLBACK = os.getenv("SEARCH_BROWSER_FALLBACK", "0") == "1"
+
+SEARCH_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
+    "Accept": "text/html,application/xhtml+xml",
+    "Accept-Language": "en-GB,en;q=0.8",
+}
+
+PROVIDERS = {}
+
+
+class SearchUnavailable(Exception):
+    """Raised when no provider could be reached (as opposed to zero results)."""
+
+
+def register_provider(name):
+    """Class decorator that makes a provider available under `name`."""
+    def decorator(cls):
+        cls.name = name
+        PROVIDERS[name] = cls
+        return cls
+    return decorator
+
+
+class SearchProvider:
+    name = ""
+
+    def search(self, query, session):
+        """Return a list of {"title", "url", "snippet"} dicts."""
+        raise NotImplementedError
+
+
+def _text(node):
+    return " ".join(node.text_content().split()) if node is not None else ""
+
+
+def _unwrap_ddg_link(href):
+    """DuckDuckGo wraps result links as //duckduckgo.com/l/?uddg=<url>."""
+    if href and "uddg=" in href:
+        target = parse_qs(urlsplit(href).query).get("uddg")
+        if target:
+            return unquote(target[0])
+    return href or ""
+
+
+@register_provider("duckduckgo_html")
+class DuckDuckGoHTMLProvider(SearchProvider):
+    """html.duckduckgo.com: one div.result per hit."""
+
+    def search(self, query, session):
+        r = session.get(DDG_HTML_URL, params={"q": query}, headers=SEARCH_HEADERS, timeout=SEARCH_TIMEOUT)
+        if r.status_code != 200:
+            raise SearchUnavailable(f"DuckDuckGo HTML returned {r.status_code}")
+        return self.parse(r.text)
+
+    @staticmethod
+    def parse(page):
+        results = []
+        if lxml_html is None or not page.strip():
+            return results
+        doc = lxml_html.fromstring(page)
+        for node in doc.xpath('//div[contains(concat(" ", normalize-space(@class), " "), " result ")]'):
+            link = node.xpath('.//a[contains(@class, "result__a")]')
+            snippet = node.xpath('.//*[contains(@class, "result__snippet")]')
+            if not link:
+                continue
+            results.append({
+                "title": _text(link[0]),
+                "url": _unwrap_ddg_link(link[0].get("href")),
+                "snippet": _text(snippet[0]) if snippet else "",
+            })
+        return results
+
+
+@register_provider("duckduckgo_lite")
+class DuckDuckGoLiteProvider(SearchProvider):
+    """lite.duckduckgo.com: a table with result-link / result-snippet rows."""
+
+    def search(self, query, session):
+        r = session.get(DDG_LITE_URL, params={"q": query}, headers=SEARCH_HEADERS, timeout=SEARCH_TIMEOUT)
+        if r.status_code != 200:
+            raise SearchUnavailable(f"DuckDuckGo Lite returned {r.status_code}")
+        return self.parse(r.text)
+
+    @staticmethod
+    def parse(page):
+        results = []
+        if lxml_html is None or not page.strip():
+            return results
+        doc = lxml_html.fromstring(page)
+        links = doc.xpath('//a[contains(@class, "result-link")]')
+        snippets = doc.xpath('//td[contains(@class, "result-snippet")]')
+        for i, link in enumerate(links):
+            results.append({
+                "title": _text(link),
+                "url": _unwrap_ddg_link(link.get("href")),
+                "snippet": _text(snippets[i]) if i < len(snippets) else "",
+            })
+        return results
+
+
+def search(query, session=None, providers=None):
+    """
+    Run `query` through the configured providers in order and return the
+    first non-empty result list. Raises SearchUnavailable if every provider
+    failed, so callers can tell an outage from a genuine "no results".
+    """
+    session = session or shared_session()
+    answered = False
+    for name in providers or SEARCH_PROVIDERS:
+        provider_cls = PROVIDERS.get(name)
+        if provider_cls is None:
+            logger.warning(f"Unknown search provider: {name}")
+            continue
+        try:
+            results = provider_cls().search(query, session)
+        except (requests.RequestException, SearchUnavailable) as e:
+            logger.warning(f"Search provider {name} failed: {e}")
+            continue
+        answered = True
+        if results:
+            logger.info(f"{name}: {len(results)} results for {query!r}")
+            return results
+    if not answered:
+        raise SearchUnavailable(f"No search provider answered for {query!r}")
+    return []
+
+
+def results_to_text(results):
+    """
+    Flatten results the way the old Selenium path did (one block of lines per
+    result) so the address/phone parsing in duckduckgo.py works unchanged.
+    """
+    return "\n".join(
+        "\n".join(part for part in (r["title"], r["snippet"], r["url"]) if part)
+        for r in results
+    )
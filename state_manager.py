@@ -1,5 +1,6 @@
 import streamlit as st
 import pandas as pd
+from results_store import read_results, write_results
 
 class StateManager:
     EXPECTED_COLUMNS = {
@@ -211,8 +212,8 @@ class StateManager:
             st.session_state.df = df
             st.session_state.processing_complete = True
             
-            # Save to CSV
-            df.to_csv('updated_venues.csv', index=False)
+            # Save to Parquet
+            write_results(df, 'updated_venues.parquet')
             print("DataFrame updated with new descriptions")
             
             # Force cache clear for the dataframe
@@ -220,9 +221,9 @@ class StateManager:
             
     @staticmethod
     def refresh_data():
-        """Refresh the DataFrame from CSV"""
+        """Refresh the DataFrame from the saved Parquet file"""
         try:
-            df = pd.read_csv('updated_venues.csv')
+            df = read_results('updated_venues.parquet')
             st.session_state.df = df
             return True
         except Exception as e:
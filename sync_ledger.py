@@ -0,0 +1,229 @@
+# sync_ledger.py
+"""
+Delta-only Bubble sync.
+
+Each autopilot run used to send every row to Bubble, changed or not, and
+every row costs workflow units. The sync ledger stores, per target URL and
+record, a hash of the outbound payload and when it was last sent. Before
+an upload the records are split into:
+
+    inserts     never sent to this URL
+    updates     sent before, but the payload has changed
+    unchanged   identical to what was last sent; not sent again
+
+    plan = get_sync_ledger().plan(records, BUBBLE_URL)
+    describe_plan(plan)          # the dry-run report
+    upload_records(plan.changed, url, on_sent=lambda rows: ledger.mark_sent(rows, url, plan.keys))
+
+Records are marked sent only once their chunk is acknowledged, so a failed
+upload leaves them as pending for the next run. A record is identified by
+its website domain, name and postcode (name and postcode without a
+website, else its payload). Records that share all of these, such as
+several rooms of one venue, are numbered in sheet order. The plan never
+drops a row. A job that syncs chunk by chunk passes one `seen` dict to
+every plan(), so the numbering runs on across chunks as if the whole
+sheet were planned at once:
+
+    seen = {}
+    for chunk in chunks:
+        plan = ledger.plan(bubble_records(chunk), url, seen)
+
+The ledger shares CACHE_DIR/bubble_sync.sqlite3 with bubble_upload's ack
+ledger. Dry-run report for a results file:
+
+    python sync_ledger.py report final_data.parquet
+
+Settings (environment):
+    BUBBLE_SYNC_DRY_RUN   "1" reports what would be sent instead of sending (default "0")
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from config import CACHE_DIR
+from fetch_strategy import domain_key
+from venue_repository import name_key, postcode_key
+
+BUBBLE_SYNC_DRY_RUN = os.getenv("BUBBLE_SYNC_DRY_RUN", "0") == "1"
+
+LOOKUP_BATCH = 500
+
+
+def payload_hash(record):
+    blob = json.dumps(record, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+
+def record_key(record, digest=None):
+    domain = domain_key(record.get("URL", "") or "")
+    name = name_key(record.get("Name"))
+    postcode = postcode_key(record.get("Post code"))
+    if domain:
+        return f"{domain}|{name}|{postcode}"
+    if name:
+        return f"name:{name}|{postcode}"
+    return f"payload:{digest or payload_hash(record)}"
+
+
+def record_keys(records, digests, seen=None):
+    """
+    Keys in order; repeats of a key get "#2", "#3", ... so no two records
+    share one. `seen` (key -> count) carries the numbering over from earlier calls.
+    """
+    seen = {} if seen is None else seen
+    keys = []
+    for record, digest in zip(records, digests):
+        key = record_key(record, digest)
+        seen[key] = seen.get(key, 0) + 1
+        keys.append(key if seen[key] == 1 else f"{key}#{seen[key]}")
+    return keys
+
+
+class SyncPlan:
+    def __init__(self, url):
+        self.url = url
+        self.inserts = []
+        self.updates = []
+        self.unchanged = 0
+        self.keys = {}  # id(record) -> ledger key, for mark_sent
+
+    @property
+    def changed(self):
+        return self.inserts + self.updates
+
+    def counts(self):
+        return {"inserts": len(self.inserts), "updates": len(self.updates), "unchanged": self.unchanged}
+
+
+class SyncLedger:
+    def __init__(self, path=None):
+        self.path = path or os.path.join(CACHE_DIR, "bubble_sync.sqlite3")
+        self.lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        with self.connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS sent_records ("
+                " url TEXT, key TEXT, hash TEXT, sent REAL, PRIMARY KEY (url, key))"
+            )
+
+    def connect(self):
+        return sqlite3.connect(self.path, timeout=30)
+
+    def sent_hashes(self, url, keys):
+        keys = sorted(set(keys))
+        found = {}
+        with self.connect() as conn:
+            for start in range(0, len(keys), LOOKUP_BATCH):
+                batch = keys[start:start + LOOKUP_BATCH]
+                marks = ",".join("?" * len(batch))
+                found.update(conn.execute(
+                    f"SELECT key, hash FROM sent_records WHERE url = ? AND key IN ({marks})", (url, *batch)
+                ).fetchall())
+        return found
+
+    def plan(self, records, url, seen=None):
+        """
+        Split records into inserts, updates and unchanged for url. Every record
+        lands in one of them. Pass the same `seen` dict for consecutive chunks of one sheet.
+        """
+        records = list(records)
+        digests = [payload_hash(record) for record in records]
+        keys = record_keys(records, digests, seen)
+        sent = self.sent_hashes(url, keys)
+        plan = SyncPlan(url)
+        for record, digest, key in zip(records, digests, keys):
+            plan.keys[id(record)] = key
+            if key not in sent:
+                plan.inserts.append(record)
+            elif sent[key] != digest:
+                plan.updates.append(record)
+            else:
+                plan.unchanged += 1
+        return plan
+
+    def mark_sent(self, records, url, keys=None):
+        """Record records as sent; `keys` is plan.keys, so repeated records keep their numbered keys."""
+        now = time.time()
+        rows = []
+        for record in records:
+            digest = payload_hash(record)
+            key = keys.get(id(record)) if keys else None
+            rows.append((url, key or record_key(record, digest), digest, now))
+        with self.lock, self.connect() as conn:
+            conn.executemany("INSERT OR REPLACE INTO sent_records (url, key, hash, sent) VALUES (?, ?, ?, ?)", rows)
+
+    def forget(self, url=None):
+        """Drop the ledger (for one URL, or all), so every record counts as new."""
+        with self.connect() as conn:
+            if url:
+                conn.execute("DELETE FROM sent_records WHERE url = ?", (url,))
+            else:
+                conn.execute("DELETE FROM sent_records")
+
+    def stats(self, url=None):
+        where, params = (" WHERE url = ?", (url,)) if url else ("", ())
+        with self.connect() as conn:
+            total, latest = conn.execute(f"SELECT COUNT(*), MAX(sent) FROM sent_records{where}", params).fetchone()
+        return {"records": total, "last_sent": latest}
+
+
+_ledger = None
+_ledger_lock = threading.Lock()
+
+
+def get_sync_ledger():
+    global _ledger
+    with _ledger_lock:
+        if _ledger is None:
+            _ledger = SyncLedger()
+        return _ledger
+
+
+def set_sync_ledger(ledger):
+    """Swap the process-wide ledger (e.g. a throwaway one for tests)."""
+    global _ledger
+    with _ledger_lock:
+        _ledger = ledger
+
+
+def describe_plan(plan, dry_run=False):
+    counts = plan.counts()
+    prefix = "Dry run: would send" if dry_run else "Sending"
+    return (f"{prefix} {counts['inserts']} new and {counts['updates']} changed records to Bubble; "
+            f"{counts['unchanged']} unchanged since the last send")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bubble sync ledger")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p = sub.add_parser("report", help="Dry run: what a results file would send")
+    p.add_argument("path", help="Results file (.parquet or .csv)")
+    p.add_argument("--url", default=None, help="Target workflow URL (default BUBBLE_URL)")
+    p.add_argument("--show", type=int, default=10, help="Keys to list per category")
+    sub.add_parser("stats")
+    args = parser.parse_args()
+
+    if args.command == "stats":
+        print(json.dumps(get_sync_ledger().stats(), indent=2))
+        return
+
+    import pandas as pd
+    from bubble import BUBBLE_URL, bubble_records
+    from results_store import read_results
+    df = read_results(args.path) if args.path.endswith(".parquet") else pd.read_csv(args.path, keep_default_na=False)
+    url = args.url or BUBBLE_URL
+    plan = get_sync_ledger().plan(bubble_records(df), url)
+    report = {"url": url, **plan.counts(),
+              "insert_keys": [plan.keys[id(r)] for r in plan.inserts[:args.show]],
+              "update_keys": [plan.keys[id(r)] for r in plan.updates[:args.show]]}
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+# text_store.py
+"""
+Out-of-frame storage for ScrapedText.
+
+A row's combined page text can be tens of kilobytes. It used to sit in the
+ScrapedText cell, where it was held in memory, copied on every progress
+update, written to every file and posted to Bubble in full. Now it is
+compressed into a side store keyed by content hash, and the cell holds a
+short reference:
+
+    ref = store_text(text)        # "text:1f3a...", or "" for empty text
+    text = resolve_text(ref)      # the original text; plain strings pass through
+
+GPT enrichment resolves the reference only when it needs the text.
+Identical pages (mirrors, repeated imports) are stored once.
+
+Blobs go in SQLite (CACHE_DIR/texts.sqlite3). They are zstd-compressed when
+the zstandard package is installed, otherwise zlib; each blob records its
+codec, so either can be read back.
+
+Settings (environment):
+    TEXT_COMPRESSION_LEVEL   compression level (default 6)
+"""
+
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+import zlib
+
+try:
+    import zstandard
+except ImportError:  # optional; zlib is used instead
+    zstandard = None
+
+from config import CACHE_DIR
+
+logger = logging.getLogger(__name__)
+
+TEXT_COMPRESSION_LEVEL = int(os.getenv("TEXT_COMPRESSION_LEVEL", "6"))
+
+REF_PREFIX = "text:"
+
+
+def is_ref(value):
+    return isinstance(value, str) and value.startswith(REF_PREFIX)
+
+
+def text_hash(text):
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()[:32]
+
+
+def compress(data, level=TEXT_COMPRESSION_LEVEL):
+    if zstandard is not None:
+        return "zstd", zstandard.ZstdCompressor(level=level).compress(data)
+    return "zlib", zlib.compress(data, level)
+
+
+def decompress(codec, blob):
+    if codec == "zstd":
+        if zstandard is None:
+            raise RuntimeError("This text was stored with zstd; install the zstandard package to read it")
+        return zstandard.ZstdDecompressor().decompress(blob)
+    return zlib.decompress(blob)
+
+
+class TextStore:
+    def __init__(self, path=None):
+        self.path = path or os.path.join(CACHE_DIR, "texts.sqlite3")
+        self.lock = threading.Lock()
+        self.stats = {"stored": 0, "deduplicated": 0, "bytes_in": 0, "bytes_stored": 0}
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        with self.connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS texts ("
+                " hash TEXT PRIMARY KEY, codec TEXT, size INTEGER, data BLOB, created REAL)"
+            )
+
+    def connect(self):
+        return sqlite3.connect(self.path, timeout=30)
+
+    def put(self, text):
+        """Store text and return its reference ("" for empty text)."""
+        if not text:
+            return ""
+        key = text_hash(text)
+        raw = text.encode("utf-8")
+        codec, blob = compress(raw)
+        with self.connect() as conn:
+            cur = conn.execute(
+                "INSERT OR IGNORE INTO texts (hash, codec, size, data, created) VALUES (?, ?, ?, ?, ?)",
+                (key, codec, len(raw), blob, time.time()),
+            )
+        with self.lock:
+            if cur.rowcount:
+                self.stats["stored"] += 1
+                self.stats["bytes_in"] += len(raw)
+                self.stats["bytes_stored"] += len(blob)
+            else:
+                self.stats["deduplicated"] += 1
+        return REF_PREFIX + key
+
+    def get(self, ref):
+        """Text for a reference; "" when it is unknown."""
+        key = ref[len(REF_PREFIX):] if is_ref(ref) else ref
+        with self.connect() as conn:
+            row = conn.execute("SELECT codec, data FROM texts WHERE hash = ?", (key,)).fetchone()
+        if row is None:
+            logger.warning(f"Missing stored text {key}")
+            return ""
+        return decompress(*row).decode("utf-8")
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_text_store():
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = TextStore()
+        return _store
+
+
+def set_text_store(store):
+    """Swap the process-wide store (e.g. a throwaway one for benchmarks)."""
+    global _store
+    with _store_lock:
+        _store = store
+
+
+def store_text(text):
+    return get_text_store().put(text or "")
+
+
+def resolve_text(value):
+    """ScrapedText cell -> text. Frames from before the store hold the text itself."""
+    if is_ref(value):
+        return get_text_store().get(value)
+    if value is None or (isinstance(value, float) and value != value):
+        return ""
+    return str(value)
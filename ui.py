@@ -7,14 +7,11 @@ import time
 import os
 import re
 from dotenv import load_dotenv
-import openai
-from PIL import Image
 from urllib.parse import urljoin
-from requests.adapters import HTTPAdapter
 
 # Import your helper functions from your modular files.
 # (Make sure these modules are created and contain the corresponding functions.)
-from processing import auto_download_csv, cleanup_address_lines, ensure_string_format, process_row, initialize_dataframe, EXPECTED_COLUMNS
+from processing import auto_download_csv, cleanup_address_lines, ensure_string_format, process_row, process_rows, initialize_dataframe, EXPECTED_COLUMNS
 from gpt_helpers import generate_gpt_description, extract_address_fields_gpt, extract_city_country_gpt, extract_name_gpt, fix_country_code
 from scraper import (
     quick_extract_images, find_all_images_500, try_fetch_image, build_absolute_url, try_url_variants, find_social_links, get_contact_page_text, find_contact_page_url, quick_extract_contact_info, quick_extract_address
@@ -23,6 +20,11 @@ from bubble import bubble_initialize_button, bubble_send_final_button
 from state_manager import StateManager
 from countries import COUNTRY_DATA, get_country_code   # new import
 from finalsave import finalize_data  # Add this import
+from jobs import ACTIVE_STATUSES, get_job_manager
+from resources import get_resource_registry
+from progress_view import PROGRESS_PAGE_SIZE
+from ingest import INGEST_LOAD_MAX_ROWS, read_columns, spool_upload
+from venue_repository import VENUE_FRESH_DAYS
 
 # Constants for dropdown options
 SERVICES_SUBTYPES = [
@@ -320,6 +322,122 @@ def create_header():
     """
     st.markdown(header_html, unsafe_allow_html=True)
 
+JOB_POLL_SECONDS = 2
+
+@st.fragment(run_every=JOB_POLL_SECONDS)
+def job_progress(job_id):
+    """Polls a background job; only this fragment reruns while it works."""
+    manager = get_job_manager()
+    job = manager.get(job_id)
+    if job is None or job["status"] not in ACTIVE_STATUSES:
+        st.rerun()  # let the full script apply the result
+    st.info("Grab a cup of tea ☕ because this might take a while...")
+    total = max(job["total"], 1)
+    stage = "Enhancing with GPT" if job["stage"] == "enrich" else "Processed"
+    st.progress(min(job["done"] / total, 1.0))
+    st.text(f"{stage} {job['done']}/{job['total']} rows..." if job["status"] == "running" else "Queued...")
+    for level, text in job["messages"]:
+        if level == "error":
+            st.error(text)
+    view = manager.display_buffer(job_id)
+    if view is not None:
+        # Only one window of the pre-stringified rows goes to the browser per refresh
+        mode = st.radio("Show", ["Latest rows", "Page"], horizontal=True, key=f"view_mode_{job_id}")
+        if mode == "Page":
+            pages = view.page_count(PROGRESS_PAGE_SIZE)
+            number = st.number_input(f"Page (of {pages})", min_value=1, max_value=pages, value=1,
+                                     key=f"view_page_{job_id}")
+            st.dataframe(view.page(number - 1, PROGRESS_PAGE_SIZE), use_container_width=True)
+        else:
+            st.dataframe(view.latest(PROGRESS_PAGE_SIZE), use_container_width=True)
+    if st.button("Cancel job", key=f"cancel_{job_id}"):
+        manager.cancel(job_id)
+
+def show_job(state_key):
+    """
+    Show the job whose id is in st.session_state[state_key]. Returns True
+    while it is still running; once it has finished its results are loaded
+    into st.session_state["df"] and the key is cleared.
+    """
+    manager = get_job_manager()
+    job = manager.get(st.session_state.get(state_key))
+    if job is None:
+        st.session_state.pop(state_key, None)
+        return False
+    if job["status"] in ACTIVE_STATUSES:
+        job_progress(job["id"])
+        return True
+
+    st.session_state.pop(state_key, None)
+    for level, text in job["messages"]:
+        getattr(st, level, st.info)(text)
+    if job["status"] != "done":
+        st.warning(f"Job {job['status']}" + (f": {job['error']}" if job["error"] else ""))
+    df = load_job_result(job)
+    if df is not None:
+        if job["kind"] == "enrich" or job["params"].get("autopilot"):
+            finalize_data(df)  # This will update display and save CSV
+        else:
+            st.session_state.df_container.dataframe(df, use_container_width=True)
+            auto_download_csv(df, "scraped_")
+    return False
+
+def load_job_result(job):
+    """
+    Put a finished job's results in st.session_state["df"]. Results bigger
+    than INGEST_LOAD_MAX_ROWS stay on disk and are offered as a download.
+    """
+    manager = get_job_manager()
+    csv_path = manager.result_csv(job["id"]) if job["total"] > INGEST_LOAD_MAX_ROWS else None
+    if csv_path:
+        with open(csv_path, "rb") as f:
+            st.download_button(
+                label=f"⬇️ Download results ({job['total']} rows)",
+                data=f,
+                file_name="beat_n_track_data.csv",
+                mime="text/csv",
+                key=f"download_{job['id']}"
+            )
+        return None
+    df = manager.load_result(job["id"])
+    if df is not None:
+        st.session_state["df"] = df
+    return df
+
+@st.cache_resource
+def app_resources():
+    """
+    The process-wide resource registry, cached across reruns (and module
+    reloads). The HTTP sessions are built up front; browsers start on first use.
+    """
+    registry = get_resource_registry()
+    registry.warm(["http.scrape", "http.api"])
+    return registry
+
+def resources_panel(registry):
+    """Live sessions/browsers, with a button to release them (rebuilt on next use)"""
+    with st.expander("🔌 Resources", expanded=False):
+        status = registry.status()
+        st.dataframe(pd.DataFrame.from_dict(status, orient="index"), use_container_width=True)
+        busy = any(job["status"] in ACTIVE_STATUSES for job in get_job_manager().list(limit=20))
+        if st.button("Release connections and browsers", disabled=busy,
+                     help="Not available while a job is running"):
+            registry.close_all()
+            st.rerun()
+
+def recent_jobs():
+    """Jobs from every session, so results survive a closed tab"""
+    jobs = get_job_manager().list(limit=10)
+    if not jobs:
+        return
+    with st.expander("🗂️ Recent Jobs", expanded=False):
+        for job in jobs:
+            started = time.strftime("%d %b %H:%M", time.localtime(job["created"]))
+            st.write(f"**{job['kind'].title()}** · {started} · {job['status']} ({job['done']}/{job['total']})")
+            if job["status"] not in ACTIVE_STATUSES and st.button("Load results", key=f"load_{job['id']}"):
+                if load_job_result(job) is not None:
+                    st.rerun()
+
 def main():
     """Main UI function with improved layout"""
     try:
@@ -338,6 +456,7 @@ def main():
 
         # Initialize the state manager
         StateManager.init_state()
+        resources = app_resources()
 
         # Wrap main content in container
         st.markdown('<div class="main-content">', unsafe_allow_html=True)
@@ -458,6 +577,9 @@ def main():
                 StateManager.update_form_data("type", selected_type)
                 StateManager.update_form_data("sub_type", final_sub_type)
 
+            recent_jobs()
+            resources_panel(resources)
+
             # Add download button right after Type Settings expander
             if "df" in st.session_state and isinstance(st.session_state.df, pd.DataFrame) and not st.session_state.df.empty:
                 buf = StringIO()
@@ -523,8 +645,9 @@ def main():
 
             # --- Column Mapping and CSV Processing ---
             if uploaded_file is not None:
-                file_text = uploaded_file.read().decode("utf-8", errors="replace")
-                df_original = pd.read_csv(StringIO(file_text))
+                # Spooled to disk; only the header is read here, rows are streamed by the job
+                upload_path = spool_upload(uploaded_file)
+                upload_columns = read_columns(upload_path)
                 
                 if not st.session_state.get("column_mapping_accepted", False):
                     # Clear any existing mapping when new file is uploaded
@@ -534,7 +657,7 @@ def main():
                     
                     # Initialize column mapping if not exists
                     if "column_mapping" not in st.session_state or st.session_state["column_mapping"] is None:
-                        st.session_state.column_mapping = StateManager.guess_column_mapping(df_original.columns)
+                        st.session_state.column_mapping = StateManager.guess_column_mapping(upload_columns)
                         if st.session_state.column_mapping:
                             st.success("✅ Automatically detected column mappings!")
                             for k, v in st.session_state.column_mapping.items():
@@ -547,7 +670,7 @@ def main():
                             st.error("URL field mapping is required")
                         else:
                             st.session_state.column_mapping_accepted = True
-                            st.session_state.df_original = df_original
+                            st.session_state.upload_path = upload_path
                             st.rerun()  # replaced st.experimental_rerun() with st.rerun()
 
                     st.write("Please verify or correct the detected mappings:")
@@ -556,7 +679,7 @@ def main():
                     with col1:
                         st.write("##### Required Fields")
                         url_col = st.session_state.column_mapping.get("URL", "")
-                        url_options = [""] + list(df_original.columns)
+                        url_options = [""] + upload_columns
                         url_index = max(0, url_options.index(url_col) if url_col in url_options else 0)
                         url_selected = st.selectbox(
                             "URL field",
@@ -572,7 +695,7 @@ def main():
                         for expected_col in EXPECTED_COLUMNS.keys():
                             if expected_col != "URL":
                                 current_value = st.session_state.column_mapping.get(expected_col, "")
-                                options = [""] + list(df_original.columns)
+                                options = [""] + upload_columns
                                 index = max(0, options.index(current_value) if current_value in options else 0)
                                 selected = st.selectbox(
                                     f"{expected_col} field",
@@ -586,204 +709,62 @@ def main():
                 # Process CSV only after mapping is accepted
                 if st.session_state.column_mapping_accepted:
                     if not st.session_state.get("processing_csv", False):
+                        skip_known = st.checkbox(
+                            f"Skip sites scraped in the last {VENUE_FRESH_DAYS:g} days",
+                            value=False,
+                            help="Off by default. When on, known sites and repeated URLs are not scraped; "
+                                 "their empty cells are filled from the venue repository"
+                        )
                         if st.button("Process CSV"):
                             st.session_state["processing_csv"] = True
+                            st.session_state["skip_known"] = skip_known
                             st.rerun()  # replaced st.experimental_rerun() with st.rerun()
                     else:
-                        st.info("Grab a cup of tea ☕ because this might take a while...")
-                        # ...existing CSV processing logic...
-                        df = pd.DataFrame()
-                        for expected_col, source_col in st.session_state.column_mapping.items():
-                            if source_col in st.session_state.df_original.columns:
-                                df[expected_col] = st.session_state.df_original[source_col]
-                        # ...rest of processing logic remains unchanged...
-                        # Initialize any missing required columns
-                        required_cols = [
-                            "AllImages", "InstagramURL", "FacebookURL", "TwitterURL",
-                            "LinkedInURL", "YoutubeURL", "TiktokURL", "EmailContacts",
-                            "PhoneContacts", "ScrapedText", "Description", "Error",
-                            "Type", "Sub Type", "GigListingURL",
-                            "Full address", "Address line 1", "Address line 2",
-                            "City", "County", "Country", "Post code", "Country code",
-                            "Name", "State"
-                        ]
-                        for col in required_cols:
-                            if col not in df.columns:
-                                df[col] = ""
-                        
-                        # Set Type / Sub Type for all rows
-                        final_type = selected_type if selected_type != "Other" else custom_type.strip()
-                        if selected_type == "Other" and not final_type:
-                            st.error("You selected 'Other' but did not provide a custom type.")
-                            st.stop()
-                        
-                        # Use final_sub_type that was set in the Type Settings form
-                        for i in range(len(df)):
-                            df.at[i, "Type"] = final_type
-                            df.at[i, "Sub Type"] = final_sub_type  # Changed from sub_type_input to final_sub_type
-                            df.at[i, "GigListingURL"] = ""
-                        
-                        # Apply optional country/city/state to all rows
-                        if selected_country.strip():
-                            alpha_code = get_country_code(selected_country)
-                            print(f"Debug: Selected Country: {selected_country}, Alpha Code: {alpha_code}")
-                            for i in range(len(df)):
-                                df.at[i, "Country"] = selected_country
-                                if not df.at[i, "Country code"]:
-                                    df.at[i, "Country code"] = alpha_code
-                            if selected_country == "United States" and selected_state.strip():
-                                for i in range(len(df)):
-                                    df.at[i, "State"] = selected_state.strip()
-                        if selected_city.strip():
-                            for i in range(len(df)):
-                                df.at[i, "City"] = selected_city.strip()
-                        
-                        # Set up requests session
-                        s = requests.Session()
-                        adapt = HTTPAdapter(max_retries=1)
-                        s.mount("http://", adapt)
-                        s.mount("https://", adapt)
-                        
-                        total = len(df)
-                        pbar = st.progress(0)
-                        stat_area = st.empty()
-                        
-                        # Process each row using your process_row function
-                        for i, row in df.iterrows():
-                            try:
-                                process_row(i, row, df, s, final_type, gig_synonyms)
-                            except Exception as e:
-                                df.at[i, "Error"] = f"Processing error: {e}"
-                                st.error(f"Error processing row {i+1}: {e}")
-                            time.sleep(1)
-                            # Update progress and display table
-                            display_df = df.copy()
-                            for col in ["AllImages", "EmailContacts", "PhoneContacts"]:
-                                if col in display_df.columns:
-                                    display_df[col] = display_df[col].apply(StateManager.ensure_string_format)
-                            pbar.progress(int(((i + 1) / total) * 100))
-                            stat_area.text(f"Processing row {i+1}/{total}...")
-                            st.session_state.table_area.dataframe(display_df, use_container_width=True)
-                        
-                        # Final cleanup
-                        df = cleanup_address_lines(df)
-                        st.session_state["df"] = df
-                        st.success("Processing complete!")
-                        # Update DataFrame display
-                        st.session_state.df_container.dataframe(df, use_container_width=True)
-                        
-                        # Remove download buttons section and keep only auto_download
-                        auto_download_csv(df, "scraped_")
-
-                        # Autopilot mode actions
-                        if autopilot and "df" in st.session_state:
-                            # Run GPT enhancement
-                            st.info("Autopilot: Enhancing data with GPT...")
-                            df = st.session_state["df"].copy()
-                            length = len(df)
-                            bar = st.progress(0)
-                            
-                            for i, row in df.iterrows():
-                                txt = str(row.get("ScrapedText", "")).strip()  # ensure txt is defined every iteration
-                                if not row.get("Description", "").strip() and txt:
-                                    desc = generate_gpt_description(txt)
-                                    df.at[i, "Description"] = desc
-
-                                city_missing = not row.get("City", "").strip()
-                                country_missing = not row.get("Country", "").strip()
-                                if (city_missing or country_missing) and txt:
-                                    loc_info = extract_city_country_gpt(txt)
-                                    if loc_info:
-                                        if city_missing and loc_info.get("City", "").strip():
-                                            df.at[i, "City"] = loc_info["City"].strip()
-                                        if country_missing and loc_info.get("Country", "").strip():
-                                            df.at[i, "Country"] = loc_info["Country"].strip()
-                                            df.at[i, "Country code"] = fix_country_code(df.loc[i])
-                            
-                                bar.progress(int(((i + 1) / length) * 100))
-                            
-                            st.session_state["df"] = df
-                            st.success("GPT enhancement complete!")
-                            
-                            # Update state and save with single display
-                            finalize_data(df)  # This will update display and save CSV
-                            
-                            # Send Data to Bubble
-                            
-                            # a. Format AllImages column
-                            for i, row in df.iterrows():
-                                images = row.get("AllImages", "")
-                                if isinstance(images, str):
-                                    if "||" in images:
-                                        df.at[i, "AllImages"] = images.split("||")
-                                    elif "," in images:
-                                        df.at[i, "AllImages"] = [x.strip() for x in images.split(",")]
-                                    else:
-                                        df.at[i, "AllImages"] = [images] if images else []
-                                if not isinstance(row["AllImages"], list):
-                                    df.at[i, "AllImages"] = []
-                            
-                            records = df.to_dict(orient="records")
-                            bubble_url = "https://beatntrack.world/api/1.1/wf/bntdata"
-                            init_url = "https://majorlabl.bubbleapps.io/version-test/api/1.1/wf/bntdata/initialize"
-                            
-                            try:
-                                # Send all rows to production endpoint
-                                resp = requests.post(bubble_url, json=records, timeout=20)
-                                if resp.status_code == 200:
-                                    st.success("Data successfully sent to Bubble production endpoint!")
-                                else:
-                                    st.error(f"Bubble production endpoint returned {resp.status_code}: {resp.text}")
-                                
-                                # Send sample to initialization endpoint
-                                sample = df.head(5).to_dict(orient="records")
-                                resp = requests.post(init_url, json=sample, timeout=10)
-                                if resp.status_code == 200:
-                                    st.success("Bubble initialization success! Check your Bubble workflow to confirm.")
-                                else:
-                                    st.error(f"Bubble initialization endpoint returned {resp.status_code}: {resp.text}")
-                                    
-                            except requests.RequestException as e:
-                                st.error(f"Error contacting Bubble: {e}")
+                        if "scrape_job_id" not in st.session_state:
+                            # Set Type / Sub Type for all rows
+                            final_type = selected_type if selected_type != "Other" else custom_type.strip()
+                            if selected_type == "Other" and not final_type:
+                                st.error("You selected 'Other' but did not provide a custom type.")
+                                st.stop()
+
+                            # Use final_sub_type that was set in the Type Settings form
+                            overwrite = {"Type": final_type, "Sub Type": final_sub_type, "GigListingURL": ""}
+                            fill = {}
+
+                            # Apply optional country/city/state to all rows
+                            if selected_country.strip():
+                                alpha_code = get_country_code(selected_country)
+                                print(f"Debug: Selected Country: {selected_country}, Alpha Code: {alpha_code}")
+                                overwrite["Country"] = selected_country
+                                fill["Country code"] = alpha_code
+                                if selected_country == "United States" and selected_state.strip():
+                                    overwrite["State"] = selected_state.strip()
+                            if selected_city.strip():
+                                overwrite["City"] = selected_city.strip()
+
+                            # Runs in the background so reruns and disconnects don't kill it;
+                            # the job reads the upload in chunks and appends results to a CSV
+                            st.session_state["scrape_job_id"] = get_job_manager().submit(
+                                "scrape", source=st.session_state.upload_path,
+                                mapping=st.session_state.column_mapping, overwrite=overwrite, fill=fill,
+                                final_type=final_type, gig_synonyms=list(gig_synonyms), autopilot=autopilot,
+                                skip_known=st.session_state.get("skip_known", False)
+                            )
+                        if not show_job("scrape_job_id"):
+                            st.session_state["processing_csv"] = False
 
             # --- GPT Summaries Button ---
             # Only show these buttons if autopilot is OFF
             if not autopilot:
-                if st.button("Add Descriptions"):
+                if "enrich_job_id" in st.session_state:
+                    show_job("enrich_job_id")
+                elif st.button("Add Descriptions"):
                     if st.session_state.get("df") is None:
                         st.warning("No data to summarize or fill. Please scrape first.")
                     else:
                         st.info("Generating GPT summaries + filling City/Country from ScrapedText if missing...")
-                        df = st.session_state["df"].copy()
-                        length = len(df)
-                        bar = st.progress(0)
-                        
-                        for i, row in df.iterrows():
-                            txt = str(row.get("ScrapedText", "")).strip()
-                            
-                            # Add GPT description if missing
-                            if not row.get("Description", "").strip() and txt:
-                                desc = generate_gpt_description(txt)
-                                df.at[i, "Description"] = desc
-
-                            # Add missing city/country data if possible
-                            city_missing = not row.get("City", "").strip()
-                            country_missing = not row.get("Country", "").strip()
-                            if (city_missing or country_missing) and txt:
-                                loc_info = extract_city_country_gpt(txt)
-                                if loc_info:
-                                    if city_missing and loc_info.get("City", "").strip():
-                                        df.at[i, "City"] = loc_info["City"].strip()
-                                    if country_missing and loc_info.get("Country", "").strip():
-                                        df.at[i, "Country"] = loc_info["Country"].strip()
-                                        df.at[i, "Country code"] = fix_country_code(df.loc[i])
-                            
-                            bar.progress(int(((i + 1) / length) * 100))
-                        
-                        # Update state and display
-                        st.session_state["df"] = df
-                        st.success("GPT enhancement complete!")
-                        finalize_data(df)
+                        st.session_state["enrich_job_id"] = get_job_manager().submit("enrich", st.session_state["df"])
+                        st.rerun()
 
         st.markdown('</div>', unsafe_allow_html=True)
 
@@ -0,0 +1,198 @@
+# venue_repository.py
+"""
+Persistent repository of scraped entities (venues, services, artists).
+
+Results used to exist only as DataFrames and CSVs, so "have we scraped this
+site before?" meant loading every old file. Every scraped row is now
+upserted into SQLite (CACHE_DIR/venues.sqlite3), keyed by normalised domain,
+with indexes on normalised postcode, name and country code:
+
+    repo = get_venue_repository()
+    repo.upsert_frame(df)                        # after each scraped chunk
+    repo.lookup(["example.com"])                 # {domain: row} for known sites
+    repo.find(postcode="NW1 7JE")                # indexed lookups
+    for chunk in repo.export_since(last_export): # incremental export
+        ...
+
+The database runs in WAL mode, so concurrent jobs can write while others
+read. Scrape jobs with skip_known fill rows for known domains from here
+instead of scraping them again; see jobs.scrape_chunks.
+
+ScrapedText is stored as its text_store reference, not the text itself.
+
+Settings (environment):
+    VENUE_DB           database path (default CACHE_DIR/venues.sqlite3)
+    VENUE_FRESH_DAYS   known entities older than this are scraped again (default 30)
+"""
+
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from config import CACHE_DIR
+from fetch_strategy import domain_key
+
+logger = logging.getLogger(__name__)
+
+VENUE_DB = os.getenv("VENUE_DB") or os.path.join(CACHE_DIR, "venues.sqlite3")
+VENUE_FRESH_DAYS = float(os.getenv("VENUE_FRESH_DAYS", "30"))
+
+LOOKUP_BATCH = 500
+
+
+def postcode_key(postcode):
+    return re.sub(r"\s+", "", str(postcode or "")).upper()
+
+
+def name_key(name):
+    name = re.sub(r"[^\w\s]", " ", str(name or "").lower())
+    name = re.sub(r"\s+", " ", name).strip()
+    return name[4:] if name.startswith("the ") else name
+
+
+def is_scraped(row):
+    """Rows worth keeping: the site was fetched, not a DNS/HTTP/processing failure."""
+    return bool(str(row.get("ScrapedText", "") or "").strip())
+
+
+def plain(value):
+    """JSON-safe cell value."""
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, (list, tuple)):
+        return list(value)
+    if value is None or (isinstance(value, float) and np.isnan(value)):
+        return ""
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
+
+
+class VenueRepository:
+    def __init__(self, path=VENUE_DB, fresh_days=VENUE_FRESH_DAYS):
+        self.path = path
+        self.fresh_age = fresh_days * 86400
+        self.lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        with self.connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")  # persistent; readers don't block writers
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS entities ("
+                " domain TEXT PRIMARY KEY, name TEXT, name_key TEXT, postcode_key TEXT,"
+                " country_code TEXT, type TEXT, data TEXT, scrape_count INTEGER DEFAULT 1,"
+                " first_seen REAL, updated REAL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_entities_postcode ON entities (postcode_key)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_entities_name ON entities (name_key)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_entities_country ON entities (country_code)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_entities_updated ON entities (updated)")
+
+    def connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    # -- writes ---------------------------------------------------------
+
+    def upsert_frame(self, df):
+        """Insert or update every scraped row of df; returns how many were written."""
+        now = time.time()
+        records = []
+        for _, row in df.iterrows():
+            domain = domain_key(row.get("URL", ""))
+            if not domain or not is_scraped(row):
+                continue
+            data = {col: plain(row[col]) for col in df.columns}
+            records.append((
+                domain, str(data.get("Name", "")), name_key(data.get("Name")),
+                postcode_key(data.get("Post code")), str(data.get("Country code", "")).upper(),
+                str(data.get("Type", "")), json.dumps(data), now, now,
+            ))
+        if not records:
+            return 0
+        with self.lock, self.connect() as conn:
+            conn.executemany(
+                "INSERT INTO entities (domain, name, name_key, postcode_key, country_code, type, data,"
+                " first_seen, updated) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)"
+                " ON CONFLICT(domain) DO UPDATE SET name = excluded.name, name_key = excluded.name_key,"
+                " postcode_key = excluded.postcode_key, country_code = excluded.country_code,"
+                " type = excluded.type, data = excluded.data, scrape_count = scrape_count + 1,"
+                " updated = excluded.updated",
+                records,
+            )
+        return len(records)
+
+    # -- reads ----------------------------------------------------------
+
+    def lookup(self, urls, fresh_only=True):
+        """{domain: row dict} for the given URLs/domains already in the repository."""
+        domains = sorted({domain_key(u) for u in urls} - {""})
+        cutoff = time.time() - self.fresh_age if fresh_only else 0
+        found = {}
+        with self.connect() as conn:
+            for start in range(0, len(domains), LOOKUP_BATCH):
+                batch = domains[start:start + LOOKUP_BATCH]
+                marks = ",".join("?" * len(batch))
+                rows = conn.execute(
+                    f"SELECT domain, data FROM entities WHERE domain IN ({marks}) AND updated >= ?",
+                    (*batch, cutoff),
+                ).fetchall()
+                found.update((domain, json.loads(data)) for domain, data in rows)
+        return found
+
+    def find(self, domain=None, postcode=None, name=None, country_code=None, limit=50):
+        """Entities matching every given field (normalised, index-backed)."""
+        clauses, params = [], []
+        for column, value in (("domain", domain_key(domain) if domain else None),
+                              ("postcode_key", postcode_key(postcode) if postcode else None),
+                              ("name_key", name_key(name) if name else None),
+                              ("country_code", country_code.upper() if country_code else None)):
+            if value:
+                clauses.append(f"{column} = ?")
+                params.append(value)
+        where = " WHERE " + " AND ".join(clauses) if clauses else ""
+        with self.connect() as conn:
+            rows = conn.execute(f"SELECT data FROM entities{where} ORDER BY updated DESC LIMIT ?",
+                                (*params, limit)).fetchall()
+        return [json.loads(data) for (data,) in rows]
+
+    def export_since(self, since=0, chunk_rows=5000):
+        """Entities updated after `since` (epoch seconds), as DataFrames of up to chunk_rows."""
+        with self.connect() as conn:
+            cursor = conn.execute("SELECT data FROM entities WHERE updated > ? ORDER BY updated", (since,))
+            while True:
+                rows = cursor.fetchmany(chunk_rows)
+                if not rows:
+                    return
+                yield pd.DataFrame([json.loads(data) for (data,) in rows])
+
+    def stats(self):
+        with self.connect() as conn:
+            total, latest = conn.execute("SELECT COUNT(*), MAX(updated) FROM entities").fetchone()
+        return {"entities": total, "last_update": latest}
+
+
+_repository = None
+_repository_lock = threading.Lock()
+
+
+def get_venue_repository():
+    global _repository
+    with _repository_lock:
+        if _repository is None:
+            _repository = VenueRepository()
+        return _repository
+
+
+def set_venue_repository(repository):
+    """Swap the process-wide repository (e.g. a throwaway one for benchmarks)."""
+    global _repository
+    with _repository_lock:
+        _repository = repository